@@ -0,0 +1,138 @@
+"""
+Fecho de semestre: cálculo automático dos Acertos Semestrais a partir dos registos diários.
+
+Para cada funcionário com registos no semestre:
+  - TotalHorasNormais: horas trabalhadas em ocorrências que não são de horas extra;
+  - TotalHorasExtraAcumuladas: horas extra diárias, mais as horas trabalhadas em ocorrências
+    marcadas como EhHorasExtra;
+  - TotalFOTSDisponiveis: dias de ocorrências EhFOTS menos dias de folga compensatória
+    (EhFolgaCompensatoria) já gozados.
+
+O cálculo é feito no servidor numa só consulta sobre RegistosMensais (o resumo por mês e tipo
+de ocorrência de RegistosDiarios) e TiposOcorrencia, e gravado com um único MERGE.
+"""
+import numpy as np
+import pandas as pd
+
+from base_dados import dialeto
+
+COLUNAS_VALORES_ACERTO = ['TotalHorasNormais', 'TotalHorasExtraAcumuladas', 'TotalFOTSDisponiveis']
+
+
+def meses_semestre(semestre):
+    """Primeiro e último mês do semestre (1 ou 2)."""
+    if semestre not in (1, 2):
+        raise ValueError(f"Semestre inválido: {semestre} (deve ser 1 ou 2).")
+    return (1, 6) if semestre == 1 else (7, 12)
+
+
+def consulta_acertos_calculados(ano, semestre):
+    """Devolve (query, params) que calcula os valores do acerto de cada funcionário no semestre."""
+    mes_inicio, mes_fim = meses_semestre(semestre)
+    query = """
+    SELECT rm.FuncionarioID,
+           SUM(CASE WHEN t.EhHorasExtra = 1 THEN 0 ELSE rm.HorasTrabalhadas END) AS TotalHorasNormais,
+           SUM(rm.HorasExtraDiarias + CASE WHEN t.EhHorasExtra = 1 THEN rm.HorasTrabalhadas ELSE 0 END) AS TotalHorasExtraAcumuladas,
+           SUM(CASE WHEN t.EhFOTS = 1 THEN rm.NumRegistos ELSE 0 END)
+             - SUM(CASE WHEN t.EhFolgaCompensatoria = 1 THEN rm.NumRegistos ELSE 0 END) AS TotalFOTSDisponiveis
+    FROM dbo.RegistosMensais rm
+    LEFT JOIN dbo.TiposOcorrencia t ON t.TipoID = rm.TipoOcorrenciaID
+    WHERE rm.Ano = ? AND rm.Mes BETWEEN ? AND ?
+    GROUP BY rm.FuncionarioID
+    """
+    return query, (ano, mes_inicio, mes_fim)
+
+
+def aplicar_acertos(cursor, ano, semestre):
+    """
+    Grava os acertos calculados do semestre em AcertosSemestrais com um único MERGE: insere os
+    que faltam e atualiza os que mudaram. Não faz commit. Devolve (inseridos, atualizados).
+    """
+    calculo, params_calculo = consulta_acertos_calculados(ano, semestre)
+    if dialeto(cursor) == 'sqlite':
+        return _aplicar_acertos_sqlite(cursor, ano, semestre, calculo, params_calculo)
+    cursor.execute(f"""
+        SET NOCOUNT ON;
+        DECLARE @acoes TABLE (Acao NVARCHAR(10));
+
+        MERGE dbo.AcertosSemestrais WITH (HOLDLOCK) AS destino
+        USING ({calculo}) AS origem
+            ON destino.FuncionarioID = origem.FuncionarioID AND destino.Ano = ? AND destino.Semestre = ?
+        WHEN MATCHED AND (destino.TotalHorasNormais <> origem.TotalHorasNormais
+                          OR destino.TotalHorasExtraAcumuladas <> origem.TotalHorasExtraAcumuladas
+                          OR destino.TotalFOTSDisponiveis <> origem.TotalFOTSDisponiveis) THEN
+            UPDATE SET
+                TotalHorasNormais = origem.TotalHorasNormais,
+                TotalHorasExtraAcumuladas = origem.TotalHorasExtraAcumuladas,
+                TotalFOTSDisponiveis = origem.TotalFOTSDisponiveis
+        WHEN NOT MATCHED BY TARGET THEN
+            INSERT (FuncionarioID, Ano, Semestre, TotalHorasNormais, TotalHorasExtraAcumuladas, TotalFOTSDisponiveis)
+            VALUES (origem.FuncionarioID, ?, ?, origem.TotalHorasNormais, origem.TotalHorasExtraAcumuladas, origem.TotalFOTSDisponiveis)
+        OUTPUT $action INTO @acoes;
+
+        SELECT
+            COALESCE(SUM(CASE WHEN Acao = 'INSERT' THEN 1 ELSE 0 END), 0) AS Inseridos,
+            COALESCE(SUM(CASE WHEN Acao = 'UPDATE' THEN 1 ELSE 0 END), 0) AS Atualizados
+        FROM @acoes;
+    """, params_calculo + (ano, semestre, ano, semestre))
+    inseridos, atualizados = cursor.fetchone()
+    return inseridos, atualizados
+
+
+def _aplicar_acertos_sqlite(cursor, ano, semestre, calculo, params_calculo):
+    # Sem MERGE/OUTPUT: o cálculo vai para uma tabela temporária e as contagens vêm do rowcount
+    cursor.execute("DROP TABLE IF EXISTS temp.AcertosCalculados")
+    cursor.execute(f"CREATE TEMP TABLE AcertosCalculados AS {calculo}", params_calculo)
+    try:
+        cursor.execute("""
+            UPDATE dbo.AcertosSemestrais
+            SET TotalHorasNormais = origem.TotalHorasNormais,
+                TotalHorasExtraAcumuladas = origem.TotalHorasExtraAcumuladas,
+                TotalFOTSDisponiveis = origem.TotalFOTSDisponiveis
+            FROM temp.AcertosCalculados AS origem
+            WHERE AcertosSemestrais.FuncionarioID = origem.FuncionarioID
+              AND AcertosSemestrais.Ano = ? AND AcertosSemestrais.Semestre = ?
+              AND (AcertosSemestrais.TotalHorasNormais <> origem.TotalHorasNormais
+                   OR AcertosSemestrais.TotalHorasExtraAcumuladas <> origem.TotalHorasExtraAcumuladas
+                   OR AcertosSemestrais.TotalFOTSDisponiveis <> origem.TotalFOTSDisponiveis)
+        """, (ano, semestre))
+        atualizados = cursor.rowcount
+        cursor.execute("""
+            INSERT INTO dbo.AcertosSemestrais (FuncionarioID, Ano, Semestre, TotalHorasNormais, TotalHorasExtraAcumuladas, TotalFOTSDisponiveis)
+            SELECT origem.FuncionarioID, ?, ?, origem.TotalHorasNormais, origem.TotalHorasExtraAcumuladas, origem.TotalFOTSDisponiveis
+            FROM temp.AcertosCalculados AS origem
+            WHERE NOT EXISTS (SELECT 1 FROM dbo.AcertosSemestrais a
+                              WHERE a.FuncionarioID = origem.FuncionarioID AND a.Ano = ? AND a.Semestre = ?)
+        """, (ano, semestre, ano, semestre))
+        inseridos = cursor.rowcount
+    finally:
+        cursor.execute("DROP TABLE temp.AcertosCalculados")
+    return inseridos, atualizados
+
+
+def comparar_acertos(calculados_df, existentes_df, semestre):
+    """
+    Pré-visualização do fecho: junta os valores calculados aos que já estão gravados para o
+    semestre. Devolve uma linha por funcionário calculado, com as colunas "<valor> Atual" e
+    "<valor> Novo" e o Estado ('Novo', 'Alterado' ou 'Sem alterações').
+    """
+    colunas = ['FuncionarioID'] + COLUNAS_VALORES_ACERTO
+    if calculados_df.empty:
+        return pd.DataFrame(columns=['FuncionarioID', 'Estado'])
+    if existentes_df.empty:
+        existentes = pd.DataFrame(columns=colunas)
+    else:
+        existentes = existentes_df[existentes_df['Semestre'] == semestre][colunas] \
+            .drop_duplicates(subset='FuncionarioID', keep='first')
+
+    comparacao = calculados_df[colunas].merge(existentes, on='FuncionarioID', how='left', suffixes=(' Novo', ' Atual'))
+    sem_acerto = comparacao[f'{COLUNAS_VALORES_ACERTO[0]} Atual'].isna().to_numpy()
+    alterado = np.zeros(len(comparacao), dtype=bool)
+    for coluna in COLUNAS_VALORES_ACERTO:
+        novo = comparacao[f'{coluna} Novo'].to_numpy(dtype=float)
+        atual = comparacao[f'{coluna} Atual'].to_numpy(dtype=float)
+        # Os valores são gravados com 2 casas decimais
+        alterado |= ~np.isclose(novo, atual, atol=0.005, rtol=0)
+    comparacao['Estado'] = np.where(sem_acerto, 'Novo', np.where(alterado, 'Alterado', 'Sem alterações'))
+    ordem = ['FuncionarioID'] + [f'{coluna} {sufixo}' for coluna in COLUNAS_VALORES_ACERTO for sufixo in ('Atual', 'Novo')] + ['Estado']
+    return comparacao[ordem]
@@ -0,0 +1,825 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import os
+import threading
+import calendar
+from contextlib import contextmanager
+from datetime import date
+from decimal import Decimal
+
+import base_dados
+import instrumentacao
+from base_dados import conectar
+from pool_conexoes import PoolConexoes, PoolEsgotadoError
+from registos_mensais import COLUNAS_REGISTOS_MENSAIS, meses_afetados, recalcular_meses
+from acertos_semestrais import aplicar_acertos, consulta_acertos_calculados
+
+# Número máximo de conexões simultâneas à base de dados (por processo Streamlit)
+DB_POOL_SIZE = int(os.environ.get("GESTAO_HORAS_DB_POOL_SIZE", "20"))
+DB_POOL_TIMEOUT = int(os.environ.get("GESTAO_HORAS_DB_POOL_TIMEOUT", "30"))
+
+# Tabelas de referência mudam raramente e podem ficar em cache durante horas;
+# as restantes usam um TTL mais curto, que serve apenas de rede de segurança para
+# escritas feitas fora da aplicação (ex.: processar_excel.py).
+TABELAS_REFERENCIA = frozenset({'Funcionarios', 'TiposOcorrencia'})
+TTL_REFERENCIA = 6 * 60 * 60
+# As escritas feitas fora da aplicação também acrescentam linhas às tabelas de referência
+# (o processar_excel.py cria funcionários): a contagem e o maior ID de cada uma, relidos a
+# cada TTL_IMPRESSAO segundos, entram na chave da cache dessas tabelas.
+CONSULTAS_IMPRESSAO = {
+    'Funcionarios': "SELECT COUNT(*), MAX(FuncionarioID) FROM dbo.Funcionarios",
+    'TiposOcorrencia': "SELECT COUNT(*), MAX(TipoID) FROM dbo.TiposOcorrencia",
+}
+TTL_IMPRESSAO = 60
+TTL_MOVIMENTOS = 10 * 60
+TTL_SEM_TABELAS = 60
+
+# Linhas pedidas ao cursor de cada vez (fetchmany); cada lote é convertido logo em colunas
+# tipadas, pelo que nunca ficam em memória mais do que estas linhas do cursor
+TAMANHO_LOTE_LEITURA = int(os.environ.get("GESTAO_HORAS_TAMANHO_LOTE_LEITURA", "20000"))
+
+ERROS_BASE_DADOS = base_dados.ERROS_BASE_DADOS + (PoolEsgotadoError,)
+
+@st.cache_resource
+def get_db_pool():
+    # O backend (SQL Server ou SQLite) é escolhido em base_dados.py
+    return PoolConexoes(conectar, tamanho=DB_POOL_SIZE, tempo_espera=DB_POOL_TIMEOUT)
+
+@contextmanager
+def db_connection():
+    """Empresta uma conexão do pool a este pedido; é devolvida no fim do bloco `with`."""
+    with get_db_pool().conexao() as conn:
+        yield conn
+
+def check_db_connection():
+    try:
+        with db_connection():
+            return True
+    except base_dados.ERROS_BASE_DADOS as ex:
+        if base_dados.BACKEND == 'sqlite':
+            st.error(f"Erro ao abrir a base de dados {base_dados.descricao()}: {ex}")
+            return False
+        sqlstate = ex.args[0]
+        st.error(f"Erro de Conexão à Base de Dados (SQLSTATE: {sqlstate}): {ex}")
+        st.info("Por favor, verifique se o SQL Server está configurado para permitir a Autenticação do Windows e se o utilizador atual do Windows tem permissões na base de dados.")
+        return False
+    except PoolEsgotadoError as ex:
+        st.error(f"Erro de Conexão à Base de Dados: {ex}")
+        return False
+
+_versoes_lock = threading.Lock()
+
+@st.cache_resource
+def _get_versoes_tabelas():
+    """Versão de cada tabela, partilhada por todas as sessões do processo."""
+    return {}
+
+@st.cache_data(ttl=TTL_IMPRESSAO, max_entries=50, show_spinner=False)
+def _impressao_tabela(tabela, versao):
+    query = CONSULTAS_IMPRESSAO[tabela]
+    with instrumentacao.consulta(query) as medicao, instrumentacao.acesso_base_dados(), db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query)
+        impressao = tuple(cursor.fetchone())
+        medicao['linhas'] = 1
+    return impressao
+
+def get_table_versions(tabelas):
+    """
+    Chave de cache das tabelas indicadas: a versão de cada uma (ver invalidate_tables) e, nas
+    tabelas de CONSULTAS_IMPRESSAO, a sua contagem e maior ID, para que as linhas inseridas ou
+    apagadas fora da aplicação apareçam ao fim de TTL_IMPRESSAO segundos.
+    """
+    versoes = _get_versoes_tabelas()
+    with _versoes_lock:
+        atuais = tuple((tabela, versoes.get(tabela, 0)) for tabela in sorted(set(tabelas)))
+    return tuple(
+        (tabela, (versao, _impressao_tabela(tabela, versao)) if tabela in CONSULTAS_IMPRESSAO else versao)
+        for tabela, versao in atuais
+    )
+
+def invalidate_tables(*tabelas):
+    """
+    Marca as tabelas indicadas como alteradas. As entradas de cache que dependem
+    delas deixam de ser usadas (a versão faz parte da chave) e expiram pelo TTL;
+    as entradas de outras tabelas mantêm-se válidas.
+    """
+    versoes = _get_versoes_tabelas()
+    with _versoes_lock:
+        for tabela in tabelas:
+            versoes[tabela] = versoes.get(tabela, 0) + 1
+
+def recarregar_dados():
+    """
+    Invalida a cache de todas as tabelas, para a próxima leitura ir à base de dados. Para
+    alterações feitas fora da aplicação a linhas existentes, que get_table_versions não deteta.
+    """
+    invalidate_tables(*TIPOS_COLUNAS)
+
+def execute_query(query, params=None, tabelas=()):
+    try:
+        with instrumentacao.consulta(query, params, escrita=True) as medicao, db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params if params else ())
+            medicao['linhas'] = cursor.rowcount
+            conn.commit()
+    except ERROS_BASE_DADOS as ex:
+        st.error(f"Erro ao executar query: {ex}")
+        return False
+    invalidate_tables(*tabelas)
+    return True
+
+# Tipo de cada coluna das tabelas nos DataFrames devolvidos por fetch_data. As colunas que não
+# estão aqui (texto livre, agregados das consultas) seguem a conversão genérica de _coluna_generica.
+#   int32     identificadores e contagens (com NULL ficam em float64)
+#   float64   valores DECIMAL: horas, euros e taxas
+#   bool      colunas BIT (com NULL ficam em float64)
+#   date      datas (date32 do Arrow: 4 bytes por valor; comparam com datetime.date)
+#   category  texto com poucos valores distintos
+TIPOS_COLUNAS = {
+    'Funcionarios': {
+        'FuncionarioID': 'int32', 'DataNascimento': 'date', 'CategoriaProfissional': 'category', 'Departamento': 'category',
+        'SalarioBaseMensal': 'float64', 'ValorSubsidioAlimentacaoDiario': 'float64', 'TaxaIRS': 'float64',
+        'TaxaSegurancaSocialFuncionario': 'float64', 'HorasTrabalhoMensalPadrao': 'float64',
+        'TaxaHoraExtra50': 'float64', 'TaxaHoraExtra100': 'float64', 'DiasFeriasAnuais': 'int32',
+    },
+    'TiposOcorrencia': {
+        'TipoID': 'int32', 'Codigo': 'category', 'HorasPadrao': 'float64', 'EhTurno': 'bool', 'EhHorasExtra': 'bool',
+        'EhAusencia': 'bool', 'EhFOTS': 'bool', 'EhFolgaCompensatoria': 'bool', 'Sigla': 'category',
+    },
+    'RegistosDiarios': {
+        'RegistoID': 'int32', 'FuncionarioID': 'int32', 'DataRegisto': 'date', 'TipoOcorrenciaID': 'int32',
+        'HorasTrabalhadas': 'float64', 'HorasExtraDiarias': 'float64', 'HorasAusencia': 'float64',
+    },
+    'Ferias': {'FeriasID': 'int32', 'FuncionarioID': 'int32', 'DataInicio': 'date', 'DataFim': 'date', 'Aprovado': 'bool'},
+    'Faltas': {
+        'FaltaID': 'int32', 'FuncionarioID': 'int32', 'DataFalta': 'date', 'Justificada': 'bool',
+        'HorasAusenciaFalta': 'float64', 'Aprovado': 'bool',
+    },
+    'Licencas': {'LicencaID': 'int32', 'FuncionarioID': 'int32', 'DataInicio': 'date', 'DataFim': 'date', 'Aprovado': 'bool'},
+    'RegistosMensais': {
+        'FuncionarioID': 'int32', 'Ano': 'int32', 'Mes': 'int32', 'TipoOcorrenciaID': 'int32', 'NumRegistos': 'int32',
+        'HorasTrabalhadas': 'float64', 'HorasExtraDiarias': 'float64', 'HorasAusencia': 'float64',
+    },
+    'AcertosSemestrais': {
+        'AcertoID': 'int32', 'FuncionarioID': 'int32', 'Ano': 'int32', 'Semestre': 'int32',
+        'TotalHorasNormais': 'float64', 'TotalHorasExtraAcumuladas': 'float64', 'TotalFOTSDisponiveis': 'float64',
+    },
+}
+
+def tipos_colunas(tabelas):
+    """Tipos (TIPOS_COLUNAS) das colunas das tabelas indicadas."""
+    tipos = {}
+    for tabela in tabelas:
+        tipos.update(TIPOS_COLUNAS.get(tabela, {}))
+    return tipos
+
+def _coluna_tipada(valores, tipo):
+    if tipo == 'date':
+        try:
+            datas = pa.array(valores, type=pa.date32())
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Datas em texto ou com hora (ex.: resultados de expressões no SQLite)
+            datas = pa.array(pd.to_datetime(pd.Series(valores, dtype=object)).dt.date, type=pa.date32(), from_pandas=True)
+        return pd.arrays.ArrowExtensionArray(datas)
+    if tipo == 'category':
+        return pd.Categorical(valores)
+    if tipo in ('int32', 'bool') and None not in valores:
+        return np.array(valores, dtype=tipo)
+    # float64, e inteiros ou booleanos com NULL (None passa a NaN)
+    return np.array(valores, dtype=np.float64)
+
+def _coluna_generica(valores):
+    coluna = pd.Series(valores)
+    if not coluna.empty:
+        if isinstance(coluna.iloc[0], Decimal):
+            return coluna.astype(float)
+        if pd.api.types.is_numeric_dtype(coluna) and not pd.api.types.is_float_dtype(coluna):
+            try:
+                return coluna.astype(float)
+            except Exception:
+                pass
+    return coluna
+
+def criar_dataframe(colunas, linhas, tipos):
+    """
+    DataFrame de um resultado (nomes das colunas e linhas do cursor), construído coluna a coluna:
+    cada coluna com tipo em `tipos` é convertida de uma só vez para esse tipo; as outras seguem
+    a conversão genérica (Decimal e inteiros para float).
+    """
+    valores_colunas = list(zip(*linhas)) if linhas else [()] * len(colunas)
+    df = pd.DataFrame({
+        posicao: _coluna_tipada(valores, tipos[coluna]) if coluna in tipos else _coluna_generica(valores)
+        for posicao, (coluna, valores) in enumerate(zip(colunas, valores_colunas))
+    })
+    df.columns = colunas
+    return df
+
+def _lotes_cursor(cursor, colunas, tipos, tamanho_lote):
+    # O primeiro lote existe sempre (vazio se não houver linhas), para os consumidores terem as colunas
+    linhas = cursor.fetchmany(tamanho_lote)
+    yield criar_dataframe(colunas, linhas, tipos)
+    while len(linhas) == tamanho_lote:
+        linhas = cursor.fetchmany(tamanho_lote)
+        if not linhas:
+            return
+        yield criar_dataframe(colunas, linhas, tipos)
+
+def _juntar_coluna(partes, tipo):
+    if len({str(parte.dtype) for parte in partes}) > 1:
+        if tipo in ('int32', 'bool'):
+            # Um lote com NULL ficou em float64
+            partes = [parte.astype(np.float64) for parte in partes]
+        elif tipo is None and any(pd.api.types.is_float_dtype(parte) for parte in partes):
+            # Um lote começado por NULL não passou pela conversão genérica para float
+            try:
+                partes = [parte.astype(float) for parte in partes]
+            except (TypeError, ValueError):
+                pass
+    if tipo == 'category':
+        # Cada lote tem as suas categorias; concat sem as unir devolveria object
+        return pd.api.types.union_categoricals(partes, sort_categories=True)
+    return pd.concat(partes, ignore_index=True)
+
+def juntar_lotes(lotes, tipos):
+    """Um só DataFrame a partir dos lotes de _lotes_cursor, coluna a coluna, mantendo os tipos de `tipos`."""
+    if len(lotes) == 1:
+        return lotes[0]
+    colunas = list(lotes[0].columns)
+    df = pd.DataFrame({
+        posicao: _juntar_coluna([lote.iloc[:, posicao] for lote in lotes], tipos.get(coluna))
+        for posicao, coluna in enumerate(colunas)
+    })
+    df.columns = colunas
+    return df
+
+def _run_query(query, params, tabelas=()):
+    # Só corre quando a consulta não está em cache
+    tipos = tipos_colunas(tabelas)
+    with instrumentacao.acesso_base_dados(), db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(query, params if params else ())
+        columns = [column[0] for column in cursor.description]
+        lotes = list(_lotes_cursor(cursor, columns, tipos, TAMANHO_LOTE_LEITURA))
+    return juntar_lotes(lotes, tipos)
+
+@st.cache_data(ttl=TTL_REFERENCIA, max_entries=200, show_spinner=False)
+def _fetch_referencia(query, params, versoes):
+    return _run_query(query, params, [tabela for tabela, _ in versoes])
+
+@st.cache_data(ttl=TTL_MOVIMENTOS, max_entries=500, show_spinner=False)
+def _fetch_movimentos(query, params, versoes):
+    return _run_query(query, params, [tabela for tabela, _ in versoes])
+
+@st.cache_data(ttl=TTL_SEM_TABELAS, show_spinner=False)
+def _fetch_sem_tabelas(query, params):
+    return _run_query(query, params)
+
+def fetch_data(query, params=None, tabelas=()):
+    """
+    Executa uma consulta e devolve um DataFrame, em cache.
+
+    `tabelas` indica as tabelas lidas pela consulta: a versão atual de cada uma entra na
+    chave da cache, pelo que uma escrita nessas tabelas (ver invalidate_tables) faz com
+    que a próxima leitura vá à base de dados. Consultas sem tabelas declaradas mantêm o
+    comportamento antigo (cache de 60 s).
+    """
+    try:
+        # Antes da medição da consulta: a leitura das impressões é medida à parte
+        versoes = get_table_versions(tabelas)
+        with instrumentacao.consulta(query, params) as medicao:
+            if not tabelas:
+                df = _fetch_sem_tabelas(query, params)
+            elif TABELAS_REFERENCIA.issuperset(tabelas):
+                df = _fetch_referencia(query, params, versoes)
+            else:
+                df = _fetch_movimentos(query, params, versoes)
+            medicao['linhas'] = len(df)
+        return df
+    except ERROS_BASE_DADOS as ex:
+        st.error(f"Erro ao buscar dados: {ex}")
+        return pd.DataFrame()
+
+def ler_em_lotes(query, params=None, tabelas=(), tamanho_lote=TAMANHO_LOTE_LEITURA):
+    """
+    Executa uma consulta e devolve o resultado em DataFrames de até `tamanho_lote` linhas, com
+    os tipos de fetch_data, à medida que são lidos do cursor. Para consumidores que processam
+    o resultado por partes (ex.: exportar uma listagem completa): a memória usada não cresce
+    com o número de linhas. O primeiro lote existe sempre, vazio se não houver linhas.
+
+    Não passa pela cache e os erros da base de dados são propagados. A conexão fica emprestada
+    do pool até o gerador terminar ou ser fechado, pelo que os lotes devem ser consumidos de seguida.
+    """
+    tipos = tipos_colunas(tabelas)
+    with instrumentacao.consulta(query, params) as medicao, db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            with instrumentacao.acesso_base_dados():
+                cursor.execute(query, params if params else ())
+            columns = [column[0] for column in cursor.description]
+            lotes = _lotes_cursor(cursor, columns, tipos, tamanho_lote)
+            medicao['linhas'] = 0
+            while True:
+                # Só o tempo da leitura conta como tempo na base de dados, não o do consumidor
+                with instrumentacao.acesso_base_dados():
+                    lote = next(lotes, None)
+                if lote is None:
+                    return
+                medicao['linhas'] += len(lote)
+                yield lote
+        finally:
+            # Um gerador abandonado a meio não deixa linhas por ler na conexão devolvida ao pool
+            cursor.close()
+
+COLUNAS_FUNCIONARIOS = (
+    "FuncionarioID, NomeCompleto, NumeroFuncionario, DataNascimento, NIF, NISS, Telefone, Email, CategoriaProfissional, Departamento, "
+    "SalarioBaseMensal, ValorSubsidioAlimentacaoDiario, TaxaIRS, TaxaSegurancaSocialFuncionario, HorasTrabalhoMensalPadrao, "
+    "TaxaHoraExtra50, TaxaHoraExtra100, DiasFeriasAnuais"
+)
+COLUNAS_REGISTOS_DIARIOS = "RegistoID, FuncionarioID, DataRegisto, TipoOcorrenciaID, HorasTrabalhadas, HorasExtraDiarias, HorasAusencia, Observacoes"
+COLUNAS_FERIAS = "FeriasID, FuncionarioID, DataInicio, DataFim, Observacoes, Aprovado"
+COLUNAS_FALTAS = "FaltaID, FuncionarioID, DataFalta, Motivo, Justificada, HorasAusenciaFalta, Aprovado"
+COLUNAS_LICENCAS = "LicencaID, FuncionarioID, DataInicio, DataFim, Motivo, Observacoes, Aprovado"
+COLUNAS_TIPOS_OCORRENCIA = "TipoID, Codigo, Descricao, HorasPadrao, EhTurno, EhHorasExtra, EhAusencia, EhFOTS, EhFolgaCompensatoria, Sigla"
+COLUNAS_ACERTOS_SEMESTRAIS = "AcertoID, FuncionarioID, Ano, Semestre, TotalHorasNormais, TotalHorasExtraAcumuladas, TotalFOTSDisponiveis"
+
+def _build_where(coluna_inicio=None, coluna_fim=None, data_inicio=None, data_fim=None,
+                 funcionario_id=None, departamento=None):
+    """
+    Monta a cláusula WHERE (e respetivos parâmetros) para os loaders com janela de datas.
+
+    Para tabelas de intervalos (Férias, Licenças) devolve os eventos que se sobrepõem a
+    [data_inicio, data_fim]; para tabelas de um só dia basta usar a mesma coluna em
+    coluna_inicio e coluna_fim.
+    """
+    condicoes = []
+    params = []
+    if data_fim is not None:
+        condicoes.append(f"{coluna_inicio} <= ?")
+        params.append(data_fim)
+    if data_inicio is not None:
+        condicoes.append(f"{coluna_fim} >= ?")
+        params.append(data_inicio)
+    if funcionario_id is not None:
+        condicoes.append("FuncionarioID = ?")
+        params.append(funcionario_id)
+    if departamento:
+        condicoes.append("FuncionarioID IN (SELECT FuncionarioID FROM dbo.Funcionarios WHERE Departamento = ?)")
+        params.append(departamento)
+    where = " WHERE " + " AND ".join(condicoes) if condicoes else ""
+    return where, tuple(params)
+
+def _tabelas_lidas(tabela, departamento=None):
+    # O filtro por departamento consulta também a tabela Funcionarios
+    return (tabela, 'Funcionarios') if departamento else (tabela,)
+
+# Listagens paginadas do separador de registos, das mais recentes para as mais antigas:
+# tabela -> (colunas, coluna de ordenação, chave primária, coluna de início, coluna de fim, coluna do filtro por tipo)
+LISTAGENS_PAGINADAS = {
+    'RegistosDiarios': (COLUNAS_REGISTOS_DIARIOS, 'DataRegisto', 'RegistoID', 'DataRegisto', 'DataRegisto', 'TipoOcorrenciaID'),
+    'Faltas': (COLUNAS_FALTAS, 'DataFalta', 'FaltaID', 'DataFalta', 'DataFalta', 'Justificada'),
+    # Ordenadas por DataFim para aproveitar os índices em DataFim
+    'Ferias': (COLUNAS_FERIAS, 'DataFim', 'FeriasID', 'DataInicio', 'DataFim', None),
+    'Licencas': (COLUNAS_LICENCAS, 'DataFim', 'LicencaID', 'DataInicio', 'DataFim', None),
+}
+
+def _where_listagem(tabela, data_inicio=None, data_fim=None, funcionario_id=None, tipo=None):
+    _, _, _, coluna_inicio, coluna_fim, coluna_tipo = LISTAGENS_PAGINADAS[tabela]
+    where, params = _build_where(coluna_inicio, coluna_fim, data_inicio, data_fim, funcionario_id)
+    if tipo is not None and coluna_tipo:
+        where += (" AND " if where else " WHERE ") + f"{coluna_tipo} = ?"
+        params += (tipo,)
+    return where, params
+
+def contar_listagem(tabela, data_inicio=None, data_fim=None, funcionario_id=None, tipo=None):
+    """Número de linhas da listagem com os filtros indicados."""
+    where, params = _where_listagem(tabela, data_inicio, data_fim, funcionario_id, tipo)
+    df = fetch_data(f"SELECT COUNT(*) AS Total FROM dbo.{tabela}{where}", params, tabelas=(tabela,))
+    return int(df['Total'].iloc[0]) if not df.empty else 0
+
+def get_pagina_listagem(tabela, data_inicio=None, data_fim=None, funcionario_id=None, tipo=None,
+                        tamanho_pagina=50, deslocamento=0, apos=None):
+    """
+    Uma página de uma das LISTAGENS_PAGINADAS, calculada no servidor (OFFSET/FETCH).
+
+    Com `apos` (a chave devolvida por chave_ultima_linha para a página anterior) a página começa
+    logo a seguir a essa linha (keyset) e `deslocamento` é ignorado; sem ela, salta `deslocamento`
+    linhas desde o início.
+    """
+    colunas, coluna_ordem, chave, _, _, _ = LISTAGENS_PAGINADAS[tabela]
+    where, params = _where_listagem(tabela, data_inicio, data_fim, funcionario_id, tipo)
+    if apos is not None:
+        data_apos, id_apos = apos
+        # Equivale a (data < ? OR (data = ? AND id < ?)), mas com um intervalo em data que os índices podem usar
+        where += (" AND " if where else " WHERE ") + f"{coluna_ordem} <= ? AND ({coluna_ordem} < ? OR {chave} < ?)"
+        params += (data_apos, data_apos, id_apos)
+        deslocamento = 0
+    query = (f"SELECT {colunas} FROM dbo.{tabela}{where} "
+             f"ORDER BY {coluna_ordem} DESC, {chave} DESC OFFSET ? ROWS FETCH NEXT ? ROWS ONLY")
+    return fetch_data(query, params + (int(deslocamento), int(tamanho_pagina)), tabelas=(tabela,))
+
+def listagem_em_lotes(tabela, data_inicio=None, data_fim=None, funcionario_id=None, tipo=None,
+                      tamanho_lote=TAMANHO_LOTE_LEITURA):
+    """Todas as linhas de uma das LISTAGENS_PAGINADAS com os filtros indicados, pela ordem da listagem, lidas por lotes (ler_em_lotes)."""
+    colunas, coluna_ordem, chave, _, _, _ = LISTAGENS_PAGINADAS[tabela]
+    where, params = _where_listagem(tabela, data_inicio, data_fim, funcionario_id, tipo)
+    query = f"SELECT {colunas} FROM dbo.{tabela}{where} ORDER BY {coluna_ordem} DESC, {chave} DESC"
+    return ler_em_lotes(query, params, tabelas=(tabela,), tamanho_lote=tamanho_lote)
+
+def chave_ultima_linha(tabela, pagina_df):
+    """Chave (data, ID) da última linha de uma página, para pedir a seguinte com get_pagina_listagem(apos=...)."""
+    if pagina_df.empty:
+        return None
+    _, coluna_ordem, chave, _, _, _ = LISTAGENS_PAGINADAS[tabela]
+    ultima = pagina_df.iloc[-1]
+    return pd.Timestamp(ultima[coluna_ordem]).date(), int(ultima[chave])
+
+def get_funcionarios():
+    return fetch_data(f"SELECT {COLUNAS_FUNCIONARIOS} FROM dbo.Funcionarios", tabelas=('Funcionarios',))
+
+CONSULTA_MAPAS_FUNCIONARIOS = "SELECT FuncionarioID, NomeCompleto, Departamento FROM dbo.Funcionarios ORDER BY FuncionarioID"
+
+@st.cache_data(ttl=TTL_REFERENCIA, max_entries=20, show_spinner=False)
+def _mapas_funcionarios(versoes):
+    df = _run_query(CONSULTA_MAPAS_FUNCIONARIOS, None, ('Funcionarios',))
+    nomes = df['NomeCompleto'].tolist()
+    # IDs como int do Python, para servirem de parâmetros nas consultas (o pyodbc não aceita tipos do numpy)
+    id_map = dict(zip(df['NomeCompleto'], df['FuncionarioID'].tolist()))
+    departamentos = ['Todos'] + sorted(df['Departamento'].dropna().unique().tolist())
+    return nomes, id_map, departamentos
+
+def get_mapas_funcionarios():
+    """
+    (nomes, nome -> FuncionarioID, ['Todos'] + departamentos) para as caixas de seleção.
+    Calculados uma vez por versão da tabela Funcionarios (ver get_table_versions).
+    """
+    try:
+        versoes = get_table_versions(('Funcionarios',))
+        with instrumentacao.consulta(CONSULTA_MAPAS_FUNCIONARIOS) as medicao:
+            mapas = _mapas_funcionarios(versoes)
+            medicao['linhas'] = len(mapas[0])
+        return mapas
+    except ERROS_BASE_DADOS as ex:
+        st.error(f"Erro ao buscar dados: {ex}")
+        return [], {}, ['Todos']
+
+def add_funcionario(data):
+    query = """
+    INSERT INTO dbo.Funcionarios (NomeCompleto, NumeroFuncionario, DataNascimento, NIF, NISS, Telefone, Email, CategoriaProfissional, Departamento,
+                                  SalarioBaseMensal, ValorSubsidioAlimentacaoDiario, TaxaIRS, TaxaSegurancaSocialFuncionario,
+                                  HorasTrabalhoMensalPadrao, TaxaHoraExtra50, TaxaHoraExtra100, DiasFeriasAnuais)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+    params = (
+        data['NomeCompleto'], data['NumeroFuncionario'], data['DataNascimento'], data['NIF'], data['NISS'],
+        data['Telefone'], data['Email'], data['CategoriaProfissional'], data['Departamento'], data['SalarioBaseMensal'],
+        data['ValorSubsidioAlimentacaoDiario'], data['TaxaIRS'],
+        data['TaxaSegurancaSocialFuncionario'], data['HorasTrabalhoMensalPadrao'],
+        data['TaxaHoraExtra50'], data['TaxaHoraExtra100'], data['DiasFeriasAnuais']
+    )
+    return execute_query(query, params, tabelas=('Funcionarios',))
+
+def update_funcionario(funcionario_id, data):
+    query = """
+    UPDATE dbo.Funcionarios
+    SET NomeCompleto=?, NumeroFuncionario=?, DataNascimento=?, NIF=?, NISS=?, Telefone=?, Email=?, CategoriaProfissional=?, Departamento=?,
+        SalarioBaseMensal=?, ValorSubsidioAlimentacaoDiario=?, TaxaIRS=?, TaxaSegurancaSocialFuncionario=?,
+        HorasTrabalhoMensalPadrao=?, TaxaHoraExtra50=?, TaxaHoraExtra100=?, DiasFeriasAnuais=?
+    WHERE FuncionarioID=?
+    """
+    params = (
+        data['NomeCompleto'], data['NumeroFuncionario'], data['DataNascimento'], data['NIF'], data['NISS'],
+        data['Telefone'], data['Email'], data['CategoriaProfissional'], data['Departamento'], data['SalarioBaseMensal'],
+        data['ValorSubsidioAlimentacaoDiario'], data['TaxaIRS'],
+        data['TaxaSegurancaSocialFuncionario'], data['HorasTrabalhoMensalPadrao'],
+        data['TaxaHoraExtra50'], data['TaxaHoraExtra100'], data['DiasFeriasAnuais'], funcionario_id
+    )
+    return execute_query(query, params, tabelas=('Funcionarios',))
+
+def delete_funcionario(funcionario_id):
+    queries = [
+        "DELETE FROM dbo.RegistosMensais WHERE FuncionarioID=?",
+        "DELETE FROM dbo.ImportacaoEscalaBlocos WHERE FuncionarioID=?",
+        "DELETE FROM dbo.RegistosDiarios WHERE FuncionarioID=?",
+        "DELETE FROM dbo.Ferias WHERE FuncionarioID=?",
+        "DELETE FROM dbo.Faltas WHERE FuncionarioID=?",
+        "DELETE FROM dbo.Licencas WHERE FuncionarioID=?",
+        "DELETE FROM dbo.AcertosSemestrais WHERE FuncionarioID=?",
+        "DELETE FROM dbo.Funcionarios WHERE FuncionarioID=?"
+    ]
+    try:
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            for query in queries:
+                cursor.execute(query, (funcionario_id,))
+            conn.commit()
+    except ERROS_BASE_DADOS as ex:
+        st.error(f"Erro ao apagar funcionário e dados relacionados: {ex}")
+        return False
+    invalidate_tables('RegistosMensais', 'RegistosDiarios', 'Ferias', 'Faltas', 'Licencas', 'AcertosSemestrais', 'Funcionarios')
+    return True
+
+def get_registos_diarios(data_inicio=None, data_fim=None, funcionario_id=None, departamento=None):
+    where, params = _build_where('DataRegisto', 'DataRegisto', data_inicio, data_fim, funcionario_id, departamento)
+    return fetch_data(f"SELECT {COLUNAS_REGISTOS_DIARIOS} FROM dbo.RegistosDiarios{where}", params, tabelas=_tabelas_lidas('RegistosDiarios', departamento))
+
+def get_ultimos_registos_diarios(quantidade=10):
+    return fetch_data(
+        f"SELECT TOP (?) {COLUNAS_REGISTOS_DIARIOS} FROM dbo.RegistosDiarios ORDER BY RegistoID DESC",
+        (quantidade,),
+        tabelas=('RegistosDiarios',)
+    )
+
+def get_totais_registos_diarios(data_inicio, data_fim, funcionario_id=None, departamento=None):
+    """
+    Totais de RegistosDiarios no período, calculados no servidor (uma só linha):
+    NumRegistos, TotalHorasTrabalhadas, TotalHorasExtra e TotalHorasAusencia.
+    """
+    where, params = _build_where('DataRegisto', 'DataRegisto', data_inicio, data_fim, funcionario_id, departamento)
+    query = f"""
+    SELECT COUNT(*) AS NumRegistos,
+           COALESCE(SUM(HorasTrabalhadas), 0) AS TotalHorasTrabalhadas,
+           COALESCE(SUM(HorasExtraDiarias), 0) AS TotalHorasExtra,
+           COALESCE(SUM(HorasAusencia), 0) AS TotalHorasAusencia
+    FROM dbo.RegistosDiarios{where}
+    """
+    return fetch_data(query, params, tabelas=_tabelas_lidas('RegistosDiarios', departamento))
+
+def add_registo_diario(data):
+    query = """
+    INSERT INTO dbo.RegistosDiarios (FuncionarioID, DataRegisto, TipoOcorrenciaID, HorasTrabalhadas, HorasExtraDiarias, HorasAusencia, Observacoes)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    """
+    params = (
+        data['FuncionarioID'], data['DataRegisto'], data['TipoOcorrenciaID'],
+        data['HorasTrabalhadas'], data['HorasExtraDiarias'], data['HorasAusencia'], data['Observacoes']
+    )
+    return _execute_registo_diario(query, params, novo_registo=data)
+
+def update_registo_diario(registo_id, data):
+    query = """
+    UPDATE dbo.RegistosDiarios
+    SET FuncionarioID=?, DataRegisto=?, TipoOcorrenciaID=?, HorasTrabalhadas=?, HorasExtraDiarias=?, HorasAusencia=?, Observacoes=?
+    WHERE RegistoID=?
+    """
+    params = (
+        data['FuncionarioID'], data['DataRegisto'], data['TipoOcorrenciaID'],
+        data['HorasTrabalhadas'], data['HorasExtraDiarias'], data['HorasAusencia'], data['Observacoes'], registo_id
+    )
+    return _execute_registo_diario(query, params, registo_id=registo_id, novo_registo=data)
+
+def delete_registo_diario(registo_id):
+    query = "DELETE FROM dbo.RegistosDiarios WHERE RegistoID=?"
+    return _execute_registo_diario(query, (registo_id,), registo_id=registo_id)
+
+def _execute_registo_diario(query, params, registo_id=None, novo_registo=None):
+    """
+    Escreve em RegistosDiarios e recalcula, na mesma transação, os meses de RegistosMensais
+    afetados: o mês em que o registo estava (registo_id) e aquele para onde vai (novo_registo).
+    """
+    try:
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            registos = []
+            if registo_id is not None:
+                cursor.execute("SELECT FuncionarioID, DataRegisto FROM dbo.RegistosDiarios WHERE RegistoID=?", (registo_id,))
+                registos.extend(tuple(row) for row in cursor.fetchall())
+            if novo_registo is not None:
+                registos.append((novo_registo['FuncionarioID'], novo_registo['DataRegisto']))
+            cursor.execute(query, params)
+            recalcular_meses(cursor, meses_afetados(registos))
+            conn.commit()
+    except ERROS_BASE_DADOS as ex:
+        st.error(f"Erro ao executar query: {ex}")
+        return False
+    invalidate_tables('RegistosDiarios', 'RegistosMensais')
+    return True
+
+def _where_mes(ano, mes=None, funcionario_id=None, departamento=None):
+    where, params = _build_where(funcionario_id=funcionario_id, departamento=departamento)
+    where = (where + " AND" if where else " WHERE") + " Ano = ?"
+    params = params + (ano,)
+    if mes is not None:
+        where += " AND Mes = ?"
+        params = params + (mes,)
+    return where, params
+
+def get_registos_mensais(ano, mes=None, funcionario_id=None, departamento=None):
+    """
+    Totais mensais por funcionário e tipo de ocorrência (RegistosMensais) de um ano ou de um mês.
+    Tem as colunas de horas de RegistosDiarios (HorasTrabalhadas, HorasExtraDiarias, HorasAusencia)
+    e NumRegistos, o número de dias com registo.
+    """
+    where, params = _where_mes(ano, mes, funcionario_id, departamento)
+    return fetch_data(f"SELECT {COLUNAS_REGISTOS_MENSAIS} FROM dbo.RegistosMensais{where}", params,
+                      tabelas=_tabelas_lidas('RegistosMensais', departamento))
+
+def get_totais_registos_mensais(ano, mes=None, funcionario_id=None, departamento=None):
+    """Os totais de get_totais_registos_diarios para um mês (ou ano) inteiro, lidos de RegistosMensais."""
+    where, params = _where_mes(ano, mes, funcionario_id, departamento)
+    query = f"""
+    SELECT COALESCE(SUM(NumRegistos), 0) AS NumRegistos,
+           COALESCE(SUM(HorasTrabalhadas), 0) AS TotalHorasTrabalhadas,
+           COALESCE(SUM(HorasExtraDiarias), 0) AS TotalHorasExtra,
+           COALESCE(SUM(HorasAusencia), 0) AS TotalHorasAusencia
+    FROM dbo.RegistosMensais{where}
+    """
+    return fetch_data(query, params, tabelas=_tabelas_lidas('RegistosMensais', departamento))
+
+def get_ferias(data_inicio=None, data_fim=None, funcionario_id=None, departamento=None):
+    where, params = _build_where('DataInicio', 'DataFim', data_inicio, data_fim, funcionario_id, departamento)
+    return fetch_data(f"SELECT {COLUNAS_FERIAS} FROM dbo.Ferias{where}", params, tabelas=_tabelas_lidas('Ferias', departamento))
+
+def get_proximas_ferias(a_partir_de, quantidade=5):
+    """As `quantidade` férias em curso ou futuras (DataFim >= a_partir_de) que começam primeiro."""
+    return fetch_data(
+        f"SELECT TOP (?) {COLUNAS_FERIAS} FROM dbo.Ferias WHERE DataFim >= ? ORDER BY DataInicio, FeriasID",
+        (quantidade, a_partir_de),
+        tabelas=('Ferias',)
+    )
+
+def add_ferias(data):
+    query = "INSERT INTO dbo.Ferias (FuncionarioID, DataInicio, DataFim, Observacoes, Aprovado) VALUES (?, ?, ?, ?, ?)"
+    params = (data['FuncionarioID'], data['DataInicio'], data['DataFim'], data['Observacoes'], data['Aprovado'])
+    return execute_query(query, params, tabelas=('Ferias',))
+
+def update_ferias(ferias_id, data):
+    query = "UPDATE dbo.Ferias SET FuncionarioID=?, DataInicio=?, DataFim=?, Observacoes=?, Aprovado=? WHERE FeriasID=?"
+    params = (data['FuncionarioID'], data['DataInicio'], data['DataFim'], data['Observacoes'], data['Aprovado'], ferias_id)
+    return execute_query(query, params, tabelas=('Ferias',))
+
+def delete_ferias(ferias_id):
+    query = "DELETE FROM dbo.Ferias WHERE FeriasID=?"
+    return execute_query(query, (ferias_id,), tabelas=('Ferias',))
+
+def get_faltas(data_inicio=None, data_fim=None, funcionario_id=None, departamento=None):
+    where, params = _build_where('DataFalta', 'DataFalta', data_inicio, data_fim, funcionario_id, departamento)
+    return fetch_data(f"SELECT {COLUNAS_FALTAS} FROM dbo.Faltas{where}", params, tabelas=_tabelas_lidas('Faltas', departamento))
+
+def add_falta(data):
+    query = "INSERT INTO dbo.Faltas (FuncionarioID, DataFalta, Motivo, Justificada, HorasAusenciaFalta, Aprovado) VALUES (?, ?, ?, ?, ?, ?)"
+    params = (data['FuncionarioID'], data['DataFalta'], data['Motivo'], data['Justificada'], data['HorasAusenciaFalta'], data['Aprovado'])
+    return execute_query(query, params, tabelas=('Faltas',))
+
+def update_falta(falta_id, data):
+    query = "UPDATE dbo.Faltas SET FuncionarioID=?, DataFalta=?, Motivo=?, Justificada=?, HorasAusenciaFalta=?, Aprovado=? WHERE FaltaID=?"
+    params = (data['FuncionarioID'], data['DataFalta'], data['Motivo'], data['Justificada'], data['HorasAusenciaFalta'], data['Aprovado'], falta_id)
+    return execute_query(query, params, tabelas=('Faltas',))
+
+def delete_falta(falta_id):
+    query = "DELETE FROM dbo.Faltas WHERE FaltaID=?"
+    return execute_query(query, (falta_id,), tabelas=('Faltas',))
+
+def get_licencas(data_inicio=None, data_fim=None, funcionario_id=None, departamento=None):
+    where, params = _build_where('DataInicio', 'DataFim', data_inicio, data_fim, funcionario_id, departamento)
+    return fetch_data(f"SELECT {COLUNAS_LICENCAS} FROM dbo.Licencas{where}", params, tabelas=_tabelas_lidas('Licencas', departamento))
+
+def get_proximas_licencas(a_partir_de, quantidade=5):
+    """As `quantidade` licenças em curso ou futuras (DataFim >= a_partir_de) que começam primeiro."""
+    return fetch_data(
+        f"SELECT TOP (?) {COLUNAS_LICENCAS} FROM dbo.Licencas WHERE DataFim >= ? ORDER BY DataInicio, LicencaID",
+        (quantidade, a_partir_de),
+        tabelas=('Licencas',)
+    )
+
+def add_licenca(data):
+    query = "INSERT INTO dbo.Licencas (FuncionarioID, DataInicio, DataFim, Motivo, Observacoes, Aprovado) VALUES (?, ?, ?, ?, ?, ?)"
+    params = (data['FuncionarioID'], data['DataInicio'], data['DataFim'], data['Motivo'], data['Observacoes'], data['Aprovado'])
+    return execute_query(query, params, tabelas=('Licencas',))
+
+def update_licenca(licenca_id, data):
+    query = "UPDATE dbo.Licencas SET FuncionarioID=?, DataInicio=?, DataFim=?, Motivo=?, Observacoes=?, Aprovado=? WHERE LicencaID=?"
+    params = (data['FuncionarioID'], data['DataInicio'], data['DataFim'], data['Motivo'], data['Observacoes'], data['Aprovado'], licenca_id)
+    return execute_query(query, params, tabelas=('Licencas',))
+
+def delete_licenca(licenca_id):
+    query = "DELETE FROM dbo.Licencas WHERE LicencaID=?"
+    return execute_query(query, (licenca_id,), tabelas=('Licencas',))
+
+def get_tipos_ocorrencia():
+    return fetch_data(f"SELECT {COLUNAS_TIPOS_OCORRENCIA} FROM dbo.TiposOcorrencia", tabelas=('TiposOcorrencia',))
+
+CONSULTA_MAPAS_TIPOS_OCORRENCIA = "SELECT TipoID, Descricao, Sigla FROM dbo.TiposOcorrencia ORDER BY TipoID"
+
+@st.cache_data(ttl=TTL_REFERENCIA, max_entries=20, show_spinner=False)
+def _mapas_tipos_ocorrencia(versoes):
+    df = _run_query(CONSULTA_MAPAS_TIPOS_OCORRENCIA, None, ('TiposOcorrencia',))
+    nomes = df['Descricao'].tolist()
+    return nomes, dict(zip(df['Descricao'], df['TipoID'].tolist())), dict(zip(df['Descricao'], df['Sigla'].tolist()))
+
+def get_mapas_tipos_ocorrencia():
+    """
+    (descrições, descrição -> TipoID, descrição -> Sigla) dos tipos de ocorrência.
+    Calculados uma vez por versão da tabela TiposOcorrencia (ver get_table_versions).
+    """
+    try:
+        versoes = get_table_versions(('TiposOcorrencia',))
+        with instrumentacao.consulta(CONSULTA_MAPAS_TIPOS_OCORRENCIA) as medicao:
+            mapas = _mapas_tipos_ocorrencia(versoes)
+            medicao['linhas'] = len(mapas[0])
+        return mapas
+    except ERROS_BASE_DADOS as ex:
+        st.error(f"Erro ao buscar dados: {ex}")
+        return [], {}, {}
+
+def add_tipo_ocorrencia(data):
+    query = """
+    INSERT INTO dbo.TiposOcorrencia (Codigo, Descricao, HorasPadrao, EhTurno, EhHorasExtra, EhAusencia, EhFOTS, EhFolgaCompensatoria, Sigla)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+    params = (data['Codigo'], data['Descricao'], data['HorasPadrao'], data['EhTurno'], data['EhHorasExtra'],
+              data['EhAusencia'], data['EhFOTS'], data['EhFolgaCompensatoria'], data['Sigla'])
+    return execute_query(query, params, tabelas=('TiposOcorrencia',))
+
+def update_tipo_ocorrencia(tipo_id, data):
+    query = """
+    UPDATE dbo.TiposOcorrencia
+    SET Codigo=?, Descricao=?, HorasPadrao=?, EhTurno=?, EhHorasExtra=?, EhAusencia=?, EhFOTS=?, EhFolgaCompensatoria=?, Sigla=?
+    WHERE TipoID=?
+    """
+    params = (data['Codigo'], data['Descricao'], data['HorasPadrao'], data['EhTurno'], data['EhHorasExtra'],
+              data['EhAusencia'], data['EhFOTS'], data['EhFolgaCompensatoria'], data['Sigla'], tipo_id)
+    return execute_query(query, params, tabelas=('TiposOcorrencia',))
+
+def delete_tipo_ocorrencia(tipo_id):
+    query = "DELETE FROM dbo.TiposOcorrencia WHERE TipoID=?"
+    return execute_query(query, (tipo_id,), tabelas=('TiposOcorrencia',))
+
+def get_acertos_semestrais(ano=None, funcionario_id=None, departamento=None):
+    where, params = _build_where(funcionario_id=funcionario_id, departamento=departamento)
+    if ano is not None:
+        where = (where + " AND" if where else " WHERE") + " Ano = ?"
+        params = params + (ano,)
+    return fetch_data(f"SELECT {COLUNAS_ACERTOS_SEMESTRAIS} FROM dbo.AcertosSemestrais{where}", params, tabelas=_tabelas_lidas('AcertosSemestrais', departamento))
+
+def add_acerto_semestral(data):
+    query = """
+    INSERT INTO dbo.AcertosSemestrais (FuncionarioID, Ano, Semestre, TotalHorasNormais,
+                                       TotalHorasExtraAcumuladas, TotalFOTSDisponiveis)
+    VALUES (?, ?, ?, ?, ?, ?)
+    """
+    params = (
+        data['FuncionarioID'], data['Ano'], data['Semestre'], data['TotalHorasNormais'],
+        data['TotalHorasExtraAcumuladas'], data['TotalFOTSDisponiveis']
+    )
+    return execute_query(query, params, tabelas=('AcertosSemestrais',))
+
+def update_acerto_semestral(acerto_id, data):
+    query = """
+    UPDATE dbo.AcertosSemestrais
+    SET FuncionarioID=?, Ano=?, Semestre=?, TotalHorasNormais=?,
+        TotalHorasExtraAcumuladas=?, TotalFOTSDisponiveis=?
+    WHERE AcertoID=?
+    """
+    params = (
+        data['FuncionarioID'], data['Ano'], data['Semestre'], data['TotalHorasNormais'],
+        data['TotalHorasExtraAcumuladas'], data['TotalFOTSDisponiveis'], acerto_id
+    )
+    return execute_query(query, params, tabelas=('AcertosSemestrais',))
+
+def delete_acerto_semestral(acerto_id):
+    query = "DELETE FROM dbo.AcertosSemestrais WHERE AcertoID=?"
+    return execute_query(query, (acerto_id,), tabelas=('AcertosSemestrais',))
+
+def get_acertos_calculados(ano, semestre):
+    """Valores dos acertos do semestre calculados a partir dos registos (ver acertos_semestrais.py)."""
+    query, params = consulta_acertos_calculados(ano, semestre)
+    return fetch_data(query, params, tabelas=('RegistosMensais', 'TiposOcorrencia'))
+
+def fechar_semestre(ano, semestre):
+    """Grava em AcertosSemestrais os acertos calculados do semestre; devolve (inseridos, atualizados) ou None."""
+    try:
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            resultado = aplicar_acertos(cursor, ano, semestre)
+            conn.commit()
+    except ERROS_BASE_DADOS as ex:
+        st.error(f"Erro ao fechar o semestre: {ex}")
+        return None
+    invalidate_tables('AcertosSemestrais')
+    return resultado
+
+def get_all_events_for_employee_and_period(funcionario_id, start_date, end_date):
+    return get_all_events_for_period(start_date, end_date, funcionario_id=funcionario_id)
+
+def get_eventos_mes(ano, mes, departamento=None, funcionario_id=None):
+    """
+    Como get_all_events_for_period para um mês inteiro, mas com os registos diários já
+    resumidos por RegistosMensais (basta para os totais do recibo).
+    """
+    start_date = date(ano, mes, 1)
+    end_date = date(ano, mes, calendar.monthrange(ano, mes)[1])
+    registos_mensais_df = get_registos_mensais(ano, mes, funcionario_id, departamento)
+    faltas_df = get_faltas(start_date, end_date, funcionario_id, departamento)
+    ferias_df = get_ferias(start_date, end_date, funcionario_id, departamento)
+    licencas_df = get_licencas(start_date, end_date, funcionario_id, departamento)
+    return registos_mensais_df, faltas_df, ferias_df, licencas_df
+
+def get_all_events_for_period(start_date, end_date, departamento=None, funcionario_id=None):
+    registos_diarios_df = get_registos_diarios(start_date, end_date, funcionario_id, departamento)
+    faltas_df = get_faltas(start_date, end_date, funcionario_id, departamento)
+    ferias_df = get_ferias(start_date, end_date, funcionario_id, departamento)
+    licencas_df = get_licencas(start_date, end_date, funcionario_id, departamento)
+    return registos_diarios_df, faltas_df, ferias_df, licencas_df
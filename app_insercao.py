@@ -1,26 +1,15 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import pyodbc
 from datetime import datetime, date
 
-DB_SERVER = '.\\SQLEXPRESS'
-DB_DATABASE = 'GestaoHoras'
-DB_DRIVER = '{ODBC Driver 17 for SQL Server}'
-
-conn_str = (
-    f"DRIVER={DB_DRIVER};"
-    f"SERVER={DB_SERVER};"
-    f"DATABASE={DB_DATABASE};"
-    "Trusted_Connection=yes;"
-    "TrustServerCertificate=yes;"
-)
+import base_dados
 
 def get_db_connection():
+    # Backend e servidor configurados em base_dados (variáveis GESTAO_HORAS_DB_*)
     try:
-        cnxn = pyodbc.connect(conn_str)
+        cnxn = base_dados.conectar()
         return cnxn
-    except pyodbc.Error as ex:
-        sqlstate = ex.args[0]
+    except base_dados.ERROS_BASE_DADOS as ex:
         messagebox.showerror("Erro de Conexão", f"Ocorreu um erro ao conectar à base de dados: {ex}")
         return None
 
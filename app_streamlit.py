@@ -1,18 +1,29 @@
 import streamlit as st
 import pandas as pd
-import pyodbc
 from datetime import datetime, date, time, timedelta
 import calendar
-from decimal import Decimal
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import cm
-from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-from reportlab.lib import colors
 from io import BytesIO
 
+from acesso_dados import (
+    check_db_connection, recarregar_dados,
+    get_funcionarios, get_mapas_funcionarios, add_funcionario, update_funcionario, delete_funcionario,
+    get_ultimos_registos_diarios, get_registos_mensais, get_totais_registos_mensais, add_registo_diario, update_registo_diario, delete_registo_diario,
+    get_ferias, get_proximas_ferias, add_ferias, update_ferias, delete_ferias,
+    get_faltas, add_falta, update_falta, delete_falta,
+    get_licencas, get_proximas_licencas, add_licenca, update_licenca, delete_licenca,
+    get_tipos_ocorrencia, get_mapas_tipos_ocorrencia, add_tipo_ocorrencia, update_tipo_ocorrencia, delete_tipo_ocorrencia,
+    get_acertos_semestrais, add_acerto_semestral, update_acerto_semestral, delete_acerto_semestral,
+    get_acertos_calculados, fechar_semestre,
+    contar_listagem, get_pagina_listagem, chave_ultima_linha, listagem_em_lotes, ERROS_BASE_DADOS,
+    get_all_events_for_period, get_eventos_mes,
+)
+from quadro_mensal import build_quadro_mensal
+from saldos import compute_saldos
+from acertos_semestrais import comparar_acertos
+from calculo_salarios import calcular_recibos_mes, folha_vencimentos
+from recibos_lote import gerar_pdf_recibo, gerar_pdfs_recibos, gerar_pdf_unico, empacotar_zip, nome_ficheiro_recibo
+import instrumentacao
+
 st.set_page_config(
     page_title="Sistema de Gestão de Horas",
     page_icon="⏰",
@@ -20,6 +31,10 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Diagnóstico de desempenho (só com GESTAO_HORAS_DIAGNOSTICO=1, ver instrumentacao.py)
+instrumentacao.iniciar_execucao()
+instrumentacao.fase("Carregamento inicial")
+
 st.markdown("""
 <style>
     :root {
@@ -196,484 +211,121 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-DB_DRIVER = "{ODBC Driver 18 for SQL Server}"
-DB_SERVER = "SusanaGonçalves\\SQLEXPRESS"
-DB_DATABASE = "GestaoHoras"
-
-@st.cache_resource
-def get_db_connection():
-    try:
-        conn = pyodbc.connect(
-            f'DRIVER={DB_DRIVER};'
-            f'SERVER={DB_SERVER};'
-            f'DATABASE={DB_DATABASE};'
-            f'Trusted_Connection=yes;'
-            f'Encrypt=yes;TrustServerCertificate=yes;Connection Timeout=30;'
-        )
-        return conn
-    except pyodbc.Error as ex:
-        sqlstate = ex.args[0]
-        st.error(f"Erro de Conexão à Base de Dados (SQLSTATE: {sqlstate}): {ex}")
-        st.info("Por favor, verifique se o SQL Server está configurado para permitir a Autenticação do Windows e se o utilizador atual do Windows tem permissões na base de dados.")
-        return None
-
-def execute_query(query, params=None):
-    conn = get_db_connection()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            cursor.execute(query, params if params else ())
-            conn.commit()
-            return True
-        except pyodbc.Error as ex:
-            st.error(f"Erro ao executar query: {ex}")
-            conn.rollback()
-            return False
-    return False
-
-@st.cache_data(ttl=60)
-def fetch_data(query, params=None):
-    conn = get_db_connection()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            cursor.execute(query, params if params else ())
-            columns = [column[0] for column in cursor.description]
-            rows = cursor.fetchall()
-            df = pd.DataFrame.from_records(rows, columns=columns)
-
-            for col in df.columns:
-                if not df[col].empty:
-                    if isinstance(df[col].iloc[0], Decimal):
-                        df[col] = df[col].astype(float)
-                    elif pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_float_dtype(df[col]):
-                        try:
-                            df[col] = df[col].astype(float)
-                        except Exception:
-                            pass
-
-            return df
-        except pyodbc.Error as ex:
-            st.error(f"Erro ao buscar dados: {ex}")
-            return pd.DataFrame()
-    return pd.DataFrame()
-
-def get_funcionarios():
-    return fetch_data("SELECT FuncionarioID, NomeCompleto, NumeroFuncionario, DataNascimento, NIF, NISS, Telefone, Email, CategoriaProfissional, Departamento, SalarioBaseMensal, ValorSubsidioAlimentacaoDiario, TaxaIRS, TaxaSegurancaSocialFuncionario, HorasTrabalhoMensalPadrao, TaxaHoraExtra50, TaxaHoraExtra100, DiasFeriasAnuais FROM dbo.Funcionarios")
-
-def add_funcionario(data):
-    query = """
-    INSERT INTO dbo.Funcionarios (NomeCompleto, NumeroFuncionario, DataNascimento, NIF, NISS, Telefone, Email, CategoriaProfissional, Departamento,
-                                  SalarioBaseMensal, ValorSubsidioAlimentacaoDiario, TaxaIRS, TaxaSegurancaSocialFuncionario,
-                                  HorasTrabalhoMensalPadrao, TaxaHoraExtra50, TaxaHoraExtra100, DiasFeriasAnuais)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """
-    params = (
-        data['NomeCompleto'], data['NumeroFuncionario'], data['DataNascimento'], data['NIF'], data['NISS'],
-        data['Telefone'], data['Email'], data['CategoriaProfissional'], data['Departamento'], data['SalarioBaseMensal'],
-        data['ValorSubsidioAlimentacaoDiario'], data['TaxaIRS'],
-        data['TaxaSegurancaSocialFuncionario'], data['HorasTrabalhoMensalPadrao'],
-        data['TaxaHoraExtra50'], data['TaxaHoraExtra100'], data['DiasFeriasAnuais']
-    )
-    return execute_query(query, params)
-
-def update_funcionario(funcionario_id, data):
-    query = """
-    UPDATE dbo.Funcionarios
-    SET NomeCompleto=?, NumeroFuncionario=?, DataNascimento=?, NIF=?, NISS=?, Telefone=?, Email=?, CategoriaProfissional=?, Departamento=?,
-        SalarioBaseMensal=?, ValorSubsidioAlimentacaoDiario=?, TaxaIRS=?, TaxaSegurancaSocialFuncionario=?,
-        HorasTrabalhoMensalPadrao=?, TaxaHoraExtra50=?, TaxaHoraExtra100=?, DiasFeriasAnuais=?
-    WHERE FuncionarioID=?
-    """
-    params = (
-        data['NomeCompleto'], data['NumeroFuncionario'], data['DataNascimento'], data['NIF'], data['NISS'],
-        data['Telefone'], data['Email'], data['CategoriaProfissional'], data['Departamento'], data['SalarioBaseMensal'],
-        data['ValorSubsidioAlimentacaoDiario'], data['TaxaIRS'],
-        data['TaxaSegurancaSocialFuncionario'], data['HorasTrabalhoMensalPadrao'],
-        data['TaxaHoraExtra50'], data['TaxaHoraExtra100'], data['DiasFeriasAnuais'], funcionario_id
-    )
-    return execute_query(query, params)
-
-def delete_funcionario(funcionario_id):
-    queries = [
-        "DELETE FROM dbo.RegistosDiarios WHERE FuncionarioID=?",
-        "DELETE FROM dbo.Ferias WHERE FuncionarioID=?",
-        "DELETE FROM dbo.Faltas WHERE FuncionarioID=?",
-        "DELETE FROM dbo.Licencas WHERE FuncionarioID=?",
-        "DELETE FROM dbo.AcertosSemestrais WHERE FuncionarioID=?",
-        "DELETE FROM dbo.Funcionarios WHERE FuncionarioID=?"
-    ]
-    conn = get_db_connection()
-    if conn:
-        try:
-            cursor = conn.cursor()
-            for query in queries:
-                cursor.execute(query, (funcionario_id,))
-            conn.commit()
-            return True
-        except pyodbc.Error as ex:
-            st.error(f"Erro ao apagar funcionário e dados relacionados: {ex}")
-            conn.rollback()
-            return False
-    return False
-
-def get_registos_diarios():
-    return fetch_data("SELECT * FROM dbo.RegistosDiarios")
-
-def add_registo_diario(data):
-    query = """
-    INSERT INTO dbo.RegistosDiarios (FuncionarioID, DataRegisto, TipoOcorrenciaID, HorasTrabalhadas, HorasExtraDiarias, HorasAusencia, Observacoes)
-    VALUES (?, ?, ?, ?, ?, ?, ?)
-    """
-    params = (
-        data['FuncionarioID'], data['DataRegisto'], data['TipoOcorrenciaID'],
-        data['HorasTrabalhadas'], data['HorasExtraDiarias'], data['HorasAusencia'], data['Observacoes']
-    )
-    return execute_query(query, params)
+def convert_df_to_csv(df):
+    with instrumentacao.secao("Exportação CSV"):
+        return df.to_csv(index=False).encode('utf-8')
 
-def update_registo_diario(registo_id, data):
-    query = """
-    UPDATE dbo.RegistosDiarios
-    SET FuncionarioID=?, DataRegisto=?, TipoOcorrenciaID=?, HorasTrabalhadas=?, HorasExtraDiarias=?, HorasAusencia=?, Observacoes=?
-    WHERE RegistoID=?
-    """
-    params = (
-        data['FuncionarioID'], data['DataRegisto'], data['TipoOcorrenciaID'],
-        data['HorasTrabalhadas'], data['HorasExtraDiarias'], data['HorasAusencia'], data['Observacoes'], registo_id
-    )
-    return execute_query(query, params)
-
-def delete_registo_diario(registo_id):
-    query = "DELETE FROM dbo.RegistosDiarios WHERE RegistoID=?"
-    return execute_query(query, (registo_id,))
-
-def get_ferias():
-    return fetch_data("SELECT * FROM dbo.Ferias")
-
-def add_ferias(data):
-    query = "INSERT INTO dbo.Ferias (FuncionarioID, DataInicio, DataFim, Observacoes, Aprovado) VALUES (?, ?, ?, ?, ?)"
-    params = (data['FuncionarioID'], data['DataInicio'], data['DataFim'], data['Observacoes'], data['Aprovado'])
-    return execute_query(query, params)
-
-def update_ferias(ferias_id, data):
-    query = "UPDATE dbo.Ferias SET FuncionarioID=?, DataInicio=?, DataFim=?, Observacoes=?, Aprovado=? WHERE FeriasID=?"
-    params = (data['FuncionarioID'], data['DataInicio'], data['DataFim'], data['Observacoes'], data['Aprovado'], ferias_id)
-    return execute_query(query, params)
-
-def delete_ferias(ferias_id):
-    query = "DELETE FROM dbo.Ferias WHERE FeriasID=?"
-    return execute_query(query, (ferias_id,))
-
-def get_faltas():
-    return fetch_data("SELECT * FROM dbo.Faltas")
-
-def add_falta(data):
-    query = "INSERT INTO dbo.Faltas (FuncionarioID, DataFalta, Motivo, Justificada, HorasAusenciaFalta, Aprovado) VALUES (?, ?, ?, ?, ?, ?)"
-    params = (data['FuncionarioID'], data['DataFalta'], data['Motivo'], data['Justificada'], data['HorasAusenciaFalta'], data['Aprovado'])
-    return execute_query(query, params)
-
-def update_falta(falta_id, data):
-    query = "UPDATE dbo.Faltas SET FuncionarioID=?, DataFalta=?, Motivo=?, Justificada=?, HorasAusenciaFalta=?, Aprovado=? WHERE FaltaID=?"
-    params = (data['FuncionarioID'], data['DataFalta'], data['Motivo'], data['Justificada'], data['HorasAusenciaFalta'], data['Aprovado'], falta_id)
-    return execute_query(query, params)
-
-def delete_falta(falta_id):
-    query = "DELETE FROM dbo.Faltas WHERE FaltaID=?"
-    return execute_query(query, (falta_id,))
-
-def get_licencas():
-    return fetch_data("SELECT * FROM dbo.Licencas")
-
-def add_licenca(data):
-    query = "INSERT INTO dbo.Licencas (FuncionarioID, DataInicio, DataFim, Motivo, Observacoes, Aprovado) VALUES (?, ?, ?, ?, ?, ?)"
-    params = (data['FuncionarioID'], data['DataInicio'], data['DataFim'], data['Motivo'], data['Observacoes'], data['Aprovado'])
-    return execute_query(query, params)
-
-def update_licenca(licenca_id, data):
-    query = "UPDATE dbo.Licencas SET FuncionarioID=?, DataInicio=?, DataFim=?, Motivo=?, Observacoes=?, Aprovado=? WHERE LicencaID=?"
-    params = (data['FuncionarioID'], data['DataInicio'], data['DataFim'], data['Motivo'], data['Observacoes'], data['Aprovado'], licenca_id)
-    return execute_query(query, params)
-
-def delete_licenca(licenca_id):
-    query = "DELETE FROM dbo.Licencas WHERE LicencaID=?"
-    return execute_query(query, (licenca_id,))
-
-def get_tipos_ocorrencia():
-    return fetch_data("SELECT TipoID, Codigo, Descricao, HorasPadrao, EhTurno, EhHorasExtra, EhAusencia, EhFOTS, EhFolgaCompensatoria, Sigla FROM dbo.TiposOcorrencia")
-
-def add_tipo_ocorrencia(data):
-    query = """
-    INSERT INTO dbo.TiposOcorrencia (Codigo, Descricao, HorasPadrao, EhTurno, EhHorasExtra, EhAusencia, EhFOTS, EhFolgaCompensatoria, Sigla)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """
-    params = (data['Codigo'], data['Descricao'], data['HorasPadrao'], data['EhTurno'], data['EhHorasExtra'],
-              data['EhAusencia'], data['EhFOTS'], data['EhFolgaCompensatoria'], data['Sigla'])
-    return execute_query(query, params)
-
-def update_tipo_ocorrencia(tipo_id, data):
-    query = """
-    UPDATE dbo.TiposOcorrencia
-    SET Codigo=?, Descricao=?, HorasPadrao=?, EhTurno=?, EhHorasExtra=?, EhAusencia=?, EhFOTS=?, EhFolgaCompensatoria=?, Sigla=?
-    WHERE TipoID=?
-    """
-    params = (data['Codigo'], data['Descricao'], data['HorasPadrao'], data['EhTurno'], data['EhHorasExtra'],
-              data['EhAusencia'], data['EhFOTS'], data['EhFolgaCompensatoria'], data['Sigla'], tipo_id)
-    return execute_query(query, params)
-
-def delete_tipo_ocorrencia(tipo_id):
-    query = "DELETE FROM dbo.TiposOcorrência WHERE TipoID=?"
-    return execute_query(query, (tipo_id,))
-
-def get_sigla_by_tipo_id(tipo_id, tipos_ocorrencia_df_global):
-    if not tipos_ocorrencia_df_global.empty and 'TipoOcorrenciaID' in tipos_ocorrencia_df_global.columns and tipo_id in tipos_ocorrencia_df_global['TipoOcorrenciaID'].values:
-        return tipos_ocorrencia_df_global[tipos_ocorrencia_df_global['TipoOcorrenciaID'] == tipo_id]['Sigla'].iloc[0]
-    return '-'
-
-def get_acertos_semestrais():
-    return fetch_data("SELECT * FROM dbo.AcertosSemestrais")
-
-def add_acerto_semestral(data):
-    query = """
-    INSERT INTO dbo.AcertosSemestrais (FuncionarioID, Ano, Semestre, TotalHorasNormais,
-                                       TotalHorasExtraAcumuladas, TotalFOTSDisponiveis)
-    VALUES (?, ?, ?, ?, ?, ?)
+def convert_lotes_to_csv(lotes):
+    """CSV de um resultado lido por lotes (ler_em_lotes): cada lote é escrito logo, sem juntar o resultado num DataFrame."""
+    with instrumentacao.secao("Exportação CSV"):
+        output = BytesIO()
+        for numero, lote in enumerate(lotes):
+            lote.to_csv(output, index=False, header=numero == 0, encoding='utf-8')
+        return output.getvalue()
+
+def to_excel(df):
+    with instrumentacao.secao("Exportação Excel"):
+        output = BytesIO()
+        writer = pd.ExcelWriter(output, engine='xlsxwriter')
+        df.to_excel(writer, index=False, sheet_name='Sheet1')
+        writer.close()
+        processed_data = output.getvalue()
+    return processed_data
+
+TAMANHOS_PAGINA = [25, 50, 100, 200]
+
+def filtros_listagem(prefixo, tipos=None, rotulo_tipo="Tipo"):
     """
-    params = (
-        data['FuncionarioID'], data['Ano'], data['Semestre'], data['TotalHorasNormais'],
-        data['TotalHorasExtraAcumuladas'], data['TotalFOTSDisponiveis']
-    )
-    return execute_query(query, params)
-
-def update_acerto_semestral(acerto_id, data):
-    query = """
-    UPDATE dbo.AcertosSemestrais
-    SET FuncionarioID=?, Ano=?, Semestre=?, TotalHorasNormais=?,
-        TotalHorasExtraAcumuladas=?, TotalFOTSDisponiveis=?
-    WHERE AcertoID=?
+    Filtros de uma listagem paginada: funcionário, intervalo de datas e, se `tipos` for dado
+    (dicionário rótulo -> valor), o tipo. Devolve um dicionário com os argumentos dos loaders.
     """
-    params = (
-        data['FuncionarioID'], data['Ano'], data['Semestre'], data['TotalHorasNormais'],
-        data['TotalHorasExtraAcumuladas'], data['TotalFOTSDisponiveis'], acerto_id
-    )
-    return execute_query(query, params)
+    colunas = st.columns(4 if tipos else 3)
+    nome_funcionario = colunas[0].selectbox("Funcionário", ['Todos'] + funcionario_nomes, key=f"{prefixo}_filtro_funcionario")
+    data_inicio = colunas[1].date_input("Desde", value=None, key=f"{prefixo}_filtro_inicio")
+    data_fim = colunas[2].date_input("Até", value=None, key=f"{prefixo}_filtro_fim")
+    tipo = None
+    if tipos:
+        tipo = tipos.get(colunas[3].selectbox(rotulo_tipo, ['Todos'] + list(tipos), key=f"{prefixo}_filtro_tipo"))
+    return {
+        'funcionario_id': funcionario_id_map.get(nome_funcionario),
+        'data_inicio': data_inicio,
+        'data_fim': data_fim,
+        'tipo': tipo,
+    }
 
-def delete_acerto_semestral(acerto_id):
-    query = "DELETE FROM dbo.AcertosSemestrais WHERE AcertoID=?"
-    return execute_query(query, (acerto_id,))
+def _mudar_pagina(chave_pagina, passo):
+    st.session_state[chave_pagina] += passo
 
-def get_all_events_for_employee_and_period(funcionario_id, start_date, end_date):
-    registos_diarios_df = fetch_data(
-        "SELECT * FROM dbo.RegistosDiarios WHERE FuncionarioID = ? AND DataRegisto BETWEEN ? AND ?",
-        (funcionario_id, start_date, end_date)
-    )
-    faltas_df = fetch_data(
-        "SELECT * FROM dbo.Faltas WHERE FuncionarioID = ? AND DataFalta BETWEEN ? AND ?",
-        (funcionario_id, start_date, end_date)
-    )
-    ferias_df = fetch_data(
-        "SELECT * FROM dbo.Ferias WHERE FuncionarioID = ? AND DataInicio <= ? AND DataFim >= ?",
-        (funcionario_id, end_date, start_date)
-    )
-    licencas_df = fetch_data(
-        "SELECT * FROM dbo.Licencas WHERE FuncionarioID = ? AND DataInicio <= ? AND DataFim >= ?",
-        (funcionario_id, end_date, start_date)
-    )
-    return registos_diarios_df, faltas_df, ferias_df, licencas_df
+def listagem_paginada(tabela, prefixo, filtros):
+    """
+    Mostra os controlos de navegação e devolve a página atual de uma listagem (get_pagina_listagem).
 
-def convert_df_to_csv(df):
-    return df.to_csv(index=False).encode('utf-8')
+    Cada página carregada guarda a chave da sua última linha, pelo que "Seguinte" e "Anterior"
+    seguem por keyset; saltar para uma página ainda não visitada usa OFFSET. Mudar os filtros
+    ou o tamanho da página volta à primeira página.
+    """
+    chave_pagina = f"{prefixo}_pagina"
+    chave_cursores = f"{prefixo}_cursores"
+    chave_filtros = f"{prefixo}_filtros_ativos"
+
+    colunas = st.columns([1, 1, 1, 3])
+    tamanho = colunas[3].selectbox("Linhas por página", TAMANHOS_PAGINA, index=1, key=f"{prefixo}_tamanho")
+    assinatura = (tuple(sorted(filtros.items())), tamanho)
+    if st.session_state.get(chave_filtros) != assinatura:
+        st.session_state[chave_filtros] = assinatura
+        st.session_state[chave_pagina] = 1
+        st.session_state[chave_cursores] = {}
+
+    total = contar_listagem(tabela, **filtros)
+    total_paginas = max(1, -(-total // tamanho))
+    st.session_state[chave_pagina] = min(max(st.session_state.get(chave_pagina, 1), 1), total_paginas)
+
+    colunas[0].button("◀ Anterior", key=f"{prefixo}_anterior", on_click=_mudar_pagina, args=(chave_pagina, -1),
+                      disabled=st.session_state[chave_pagina] <= 1)
+    pagina = colunas[1].number_input("Página", min_value=1, max_value=total_paginas, step=1, key=chave_pagina)
+    colunas[2].button("Seguinte ▶", key=f"{prefixo}_seguinte", on_click=_mudar_pagina, args=(chave_pagina, 1),
+                      disabled=pagina >= total_paginas)
+    st.caption(f"{total} registos — página {pagina} de {total_paginas}")
+
+    # A listagem completa pode ter anos de registos: só é lida (por lotes) quando pedida
+    if total and st.button(f"Preparar exportação dos {total} registos (CSV)", key=f"{prefixo}_preparar_csv"):
+        try:
+            dados_csv = convert_lotes_to_csv(listagem_em_lotes(tabela, **filtros))
+        except ERROS_BASE_DADOS as ex:
+            st.error(f"Erro ao exportar a listagem: {ex}")
+        else:
+            st.download_button(
+                label="Exportar Listagem Completa (CSV)",
+                data=dados_csv,
+                file_name=f"listagem_{tabela.lower()}.csv",
+                mime="text/csv",
+                key=f"{prefixo}_exportar_csv",
+                on_click="ignore"
+            )
 
-def to_excel(df):
-    output = BytesIO()
-    writer = pd.ExcelWriter(output, engine='xlsxwriter')
-    df.to_excel(writer, index=False, sheet_name='Sheet1')
-    writer.close()
-    processed_data = output.getvalue()
-    return processed_data
-
-def generate_payslip_pdf(funcionario_info, mes_recibo, ano_recibo,
-                          total_horas_trabalhadas_mes, total_horas_extra_mes,
-                          salario_base_mensal, valor_horas_extra,
-                          subsidio_alimentacao, vencimento_bruto,
-                          desconto_irs, taxa_irs, desconto_ss, taxa_seguranca_social_funcionario,
-                          total_horas_ausencia_geral, desconto_ausencia, salario_liquido,
-                          dias_ferias_mes, dias_licencas_mes):
-
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=1.0*cm, leftMargin=1.0*cm, topMargin=1.0*cm, bottomMargin=1.0*cm)
-    styles = getSampleStyleSheet()
-
-    styles.add(ParagraphStyle(name='HeaderTitle', fontSize=20, leading=24, alignment=TA_CENTER, fontName='Helvetica-Bold', textColor=colors.HexColor('#5A7C93')))
-    styles.add(ParagraphStyle(name='HeaderSubtitle', fontSize=11, leading=13, alignment=TA_CENTER, fontName='Helvetica-Bold', textColor=colors.HexColor('#88A0B2'), spaceAfter=0.3*cm))
-    styles.add(ParagraphStyle(name='CompanyInfo', fontSize=6, leading=8, alignment=TA_CENTER, fontName='Helvetica', textColor=colors.HexColor('#666666')))
-
-    styles.add(ParagraphStyle(name='SectionHeading', fontSize=10, leading=13, alignment=TA_LEFT, fontName='Helvetica-Bold', textColor=colors.HexColor('#5A7C93'), spaceBefore=0.6*cm, spaceAfter=0.2*cm))
-    styles.add(ParagraphStyle(name='EmployeeDetail', fontSize=7, leading=9, alignment=TA_LEFT, fontName='Helvetica', textColor=colors.HexColor('#333333')))
-    styles.add(ParagraphStyle(name='EmployeeDetailBold', fontSize=7, leading=9, alignment=TA_LEFT, fontName='Helvetica-Bold', textColor=colors.HexColor('#333333')))
-
-    styles.add(ParagraphStyle(name='TableCaption', fontSize=8, leading=10, alignment=TA_LEFT, fontName='Helvetica-Bold', textColor=colors.HexColor('#5A7C93'), spaceBefore=0.3*cm, spaceAfter=0.1*cm))
-    styles.add(ParagraphStyle(name='TableColHeader', fontSize=8, leading=10, alignment=TA_CENTER, fontName='Helvetica-Bold', textColor=colors.HexColor('#333333')))
-    styles.add(ParagraphStyle(name='TableTextLeft', fontSize=7, leading=9, alignment=TA_LEFT, fontName='Helvetica', textColor=colors.HexColor('#333333')))
-    styles.add(ParagraphStyle(name='TableTextRight', fontSize=7, leading=9, alignment=TA_RIGHT, fontName='Helvetica', textColor=colors.HexColor('#333333')))
-    styles.add(ParagraphStyle(name='TableTotalText', fontSize=8, leading=10, alignment=TA_RIGHT, fontName='Helvetica-Bold', textColor=colors.HexColor('#5A7C93')))
-    styles.add(ParagraphStyle(name='TableTotalValue', fontSize=8, leading=10, alignment=TA_RIGHT, fontName='Helvetica-Bold', textColor=colors.HexColor('#333333')))
-
-    styles.add(ParagraphStyle(name='FinalTotalLabel', fontSize=13, leading=15, alignment=TA_RIGHT, fontName='Helvetica-Bold', textColor=colors.HexColor('#5A7C93'), spaceBefore=0.6*cm))
-    styles.add(ParagraphStyle(name='FinalTotalValue', fontSize=15, leading=17, alignment=TA_RIGHT, fontName='Helvetica-Bold', textColor=colors.HexColor('#006600')))
-
-    styles.add(ParagraphStyle(name='FooterText', fontSize=5, leading=7, alignment=TA_CENTER, fontName='Helvetica', textColor=colors.HexColor('#888888'), spaceBefore=0.7*cm))
-
-    story = []
-
-    story.append(Paragraph("NOME DA EMPRESA", styles['HeaderTitle']))
-    story.append(Paragraph("Rua Fictícia, 123, 4700-000 Braga - Portugal", styles['CompanyInfo']))
-    story.append(Paragraph("NIF: 987654321", styles['CompanyInfo']))
-    story.append(Spacer(1, 0.2*cm))
-    story.append(Paragraph(f"RECIBO DE VENCIMENTO - {calendar.month_name[mes_recibo].upper()} / {ano_recibo}", styles['HeaderSubtitle']))
-    story.append(Spacer(1, 0.4*cm))
-
-    story.append(Paragraph("Informações do Funcionário:", styles['SectionHeading']))
-    employee_data = [
-        [Paragraph("Nome:", styles['EmployeeDetailBold']), Paragraph(funcionario_info['NomeCompleto'], styles['EmployeeDetail']),
-         Paragraph("Categoria:", styles['EmployeeDetailBold']), Paragraph(funcionario_info['CategoriaProfissional'], styles['EmployeeDetail'])],
-        [Paragraph("Nº Funcionário:", styles['EmployeeDetailBold']), Paragraph(funcionario_info['NumeroFuncionario'], styles['EmployeeDetail']),
-         Paragraph("Salário Base:", styles['EmployeeDetailBold']), Paragraph(f"{salario_base_mensal:.2f} €", styles['EmployeeDetail'])],
-        [Paragraph("NIF:", styles['EmployeeDetailBold']), Paragraph(funcionario_info['NIF'], styles['EmployeeDetail']),
-         Paragraph("IRS (%):", styles['EmployeeDetailBold']), Paragraph(f"{taxa_irs*100:.2f} %", styles['EmployeeDetail'])],
-        [Paragraph("NISS:", styles['EmployeeDetailBold']), Paragraph(funcionario_info['NISS'], styles['EmployeeDetail']),
-         Paragraph("Seg. Social (%):", styles['EmployeeDetailBold']), Paragraph(f"{taxa_seguranca_social_funcionario*100:.2f} %", styles['EmployeeDetail'])],
-        [Paragraph("Departamento:", styles['EmployeeDetailBold']), Paragraph(funcionario_info['Departamento'] if funcionario_info['Departamento'] else 'N/A', styles['EmployeeDetail']),
-         Paragraph("", styles['EmployeeDetailBold']), Paragraph("", styles['EmployeeDetail'])],
-    ]
-    employee_table = Table(employee_data, colWidths=[3.5*cm, 6.5*cm, 3.5*cm, 5.5*cm])
-    employee_table.setStyle(TableStyle([
-        ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 0),
-        ('TOPPADDING', (0,0), (-1,-1), 0),
-        ('GRID', (0,0), (-1,-1), 0.25, colors.HexColor('#E0E0E0')),
-        ('BOX', (0,0), (-1,-1), 0.5, colors.HexColor('#C3D9E8')),
-    ]))
-    story.append(employee_table)
-    story.append(Spacer(1, 0.4*cm))
-
-    story.append(Paragraph("Rendimentos:", styles['SectionHeading']))
-    data_rendimentos = [
-        [Paragraph("Descrição", styles['TableColHeader']), Paragraph("Valor (€)", styles['TableColHeader'])]
-    ]
-    data_rendimentos.append([Paragraph("Salário Base Mensal", styles['TableTextLeft']), Paragraph(f"{salario_base_mensal:.2f}", styles['TableTextRight'])])
-    if valor_horas_extra > 0:
-        data_rendimentos.append([Paragraph(f"Horas Extra ({total_horas_extra_mes:.2f}h)", styles['TableTextLeft']), Paragraph(f"{valor_horas_extra:.2f}", styles['TableTextRight'])])
-    data_rendimentos.append([Paragraph("Subsídio de Alimentação", styles['TableTextLeft']), Paragraph(f"{subsidio_alimentacao:.2f}", styles['TableTextRight'])])
-    
-    data_rendimentos.append([
-        Paragraph("<b>Vencimento Bruto</b>", styles['TableTotalText']),
-        Paragraph(f"<b>{vencimento_bruto + subsidio_alimentacao:.2f}</b>", styles['TableTotalValue'])
-    ])
-
-    table_rendimentos = Table(data_rendimentos, colWidths=[13*cm, 5*cm])
-    table_rendimentos.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#C3D9E8')),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.HexColor('#333333')),
-        ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-        ('ALIGN', (1,1), (-1,-1), 'RIGHT'),
-        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0,0), (-1,0), 3),
-        ('TOPPADDING', (0,0), (-1,0), 3),
-        ('GRID', (0,0), (-1,-1), 0.5, colors.HexColor('#E0E0E0')),
-        ('BOX', (0,0), (-1,-1), 1, colors.HexColor('#E0E0E0')),
-        ('BACKGROUND', (0,-1), (-1,-1), colors.HexColor('#E0E0E0')),
-        ('LEFTPADDING', (0,0), (-1,-1), 2),
-        ('RIGHTPADDING', (0,0), (-1,-1), 2),
-    ]))
-    story.append(table_rendimentos)
-    story.append(Spacer(1, 0.4*cm))
-
-    story.append(Paragraph("Descontos:", styles['SectionHeading']))
-    data_descontos = [
-        [Paragraph("Descrição", styles['TableColHeader']), Paragraph("Valor (€)", styles['TableColHeader'])]
-    ]
-    data_descontos.append([Paragraph(f"IRS ({taxa_irs*100:.2f}%)", styles['TableTextLeft']), Paragraph(f"{desconto_irs:.2f}", styles['TableTextRight'])])
-    data_descontos.append([Paragraph(f"Segurança Social ({taxa_seguranca_social_funcionario*100:.2f}%)", styles['TableTextLeft']), Paragraph(f"{desconto_ss:.2f}", styles['TableTextRight'])])
-    if total_horas_ausencia_geral > 0:
-        data_descontos.append([Paragraph(f"Ausências ({total_horas_ausencia_geral:.2f}h)", styles['TableTextLeft']), Paragraph(f"{desconto_ausencia:.2f}", styles['TableTextRight'])])
-    
-    data_descontos.append([
-        Paragraph("<b>Total Descontos</b>", styles['TableTotalText']),
-        Paragraph(f"<b>{(desconto_irs + desconto_ss + desconto_ausencia):.2f}</b>", styles['TableTotalValue'])
-    ])
-
-    table_descontos = Table(data_descontos, colWidths=[13*cm, 5*cm])
-    table_descontos.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#C3D9E8')),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.HexColor('#333333')),
-        ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-        ('ALIGN', (1,1), (-1,-1), 'RIGHT'),
-        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0,0), (-1,0), 3),
-        ('TOPPADDING', (0,0), (-1,0), 3),
-        ('GRID', (0,0), (-1,-1), 0.5, colors.HexColor('#E0E0E0')),
-        ('BOX', (0,0), (-1,-1), 1, colors.HexColor('#E0E0E0')),
-        ('BACKGROUND', (0,-1), (-1,-1), colors.HexColor('#E0E0E0')),
-        ('LEFTPADDING', (0,0), (-1,-1), 2),
-        ('RIGHTPADDING', (0,0), (-1,-1), 2),
-    ]))
-    story.append(table_descontos)
-    story.append(Spacer(1, 0.6*cm))
-
-    story.append(Paragraph(f"Salário Líquido a Receber:", styles['FinalTotalLabel']))
-    story.append(Paragraph(f"{salario_liquido:.2f} €", styles['FinalTotalValue']))
-    story.append(Spacer(1, 0.6*cm))
-
-    story.append(Paragraph("Resumo de Férias e Licenças no Mês:", styles['SectionHeading']))
-    summary_data = [
-        [Paragraph("Dias de Férias:", styles['EmployeeDetailBold']), Paragraph(f"{dias_ferias_mes} dias", styles['EmployeeDetail'])],
-        [Paragraph("Dias de Licença:", styles['EmployeeDetailBold']), Paragraph(f"{dias_licencas_mes} dias", styles['EmployeeDetail'])],
-    ]
-    summary_table = Table(summary_data, colWidths=[5*cm, 13*cm])
-    summary_table.setStyle(TableStyle([
-        ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 0),
-        ('TOPPADDING', (0,0), (-1,-1), 0),
-        ('GRID', (0,0), (-1,-1), 0.25, colors.HexColor('#E0E0E0')),
-        ('BOX', (0,0), (-1,-1), 0.5, colors.HexColor('#C3D9E8')),
-    ]))
-    story.append(summary_table)
-    story.append(Spacer(1, 0.8*cm))
-
-    story.append(Paragraph("Documento gerado pelo Sistema de Gestão de Horas", styles['FooterText']))
-    story.append(Paragraph(f"Impresso em: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}", styles['FooterText']))
-    
-    doc.build(story)
-    buffer.seek(0)
-    return buffer.getvalue()
+    cursores = st.session_state[chave_cursores]
+    apos = cursores.get(pagina)
+    pagina_df = get_pagina_listagem(tabela, **filtros, tamanho_pagina=tamanho,
+                                    deslocamento=(pagina - 1) * tamanho, apos=apos)
+    if not pagina_df.empty:
+        cursores[pagina + 1] = chave_ultima_linha(tabela, pagina_df)
+    return pagina_df
+
+def carregar_tipos_ocorrencia():
+    """Tipos de ocorrência com a chave renomeada para TipoOcorrenciaID, como nas tabelas de registos."""
+    tipos_ocorrencia_df = get_tipos_ocorrencia()
+    if not tipos_ocorrencia_df.empty and 'TipoID' in tipos_ocorrencia_df.columns:
+        tipos_ocorrencia_df = tipos_ocorrencia_df.rename(columns={'TipoID': 'TipoOcorrenciaID'})
+    return tipos_ocorrencia_df
 
 if 'active_tab_index' not in st.session_state:
     st.session_state.active_tab_index = 0
 
-funcionarios_df = get_funcionarios()
-registos_diarios_df = get_registos_diarios()
-ferias_df = get_ferias()
-faltas_df = get_faltas()
-licencas_df = get_licencas()
-tipos_ocorrencia_df = get_tipos_ocorrencia()
-acertos_semestrais_df = get_acertos_semestrais()
-
-if not tipos_ocorrencia_df.empty and 'TipoID' in tipos_ocorrencia_df.columns:
-    tipos_ocorrencia_df = tipos_ocorrencia_df.rename(columns={'TipoID': 'TipoOcorrenciaID'})
-
-funcionario_nomes = funcionarios_df['NomeCompleto'].tolist() if not funcionarios_df.empty else []
-funcionario_id_map = dict(zip(funcionarios_df['NomeCompleto'], funcionarios_df['FuncionarioID'])) if not funcionarios_df.empty else {}
-departamentos_unicos = ['Todos'] + sorted(funcionarios_df['Departamento'].dropna().unique().tolist()) if not funcionarios_df.empty else ['Todos']
+# Cada separador carrega apenas os dados de que precisa; aqui ficam só os mapas das caixas de
+# seleção, calculados uma vez por versão da tabela Funcionarios
+funcionario_nomes, funcionario_id_map, departamentos_unicos = get_mapas_funcionarios()
 
-tipo_ocorrencia_nomes = tipos_ocorrencia_df['Descricao'].tolist() if not tipos_ocorrencia_df.empty else []
-tipo_ocorrencia_id_map = dict(zip(tipos_ocorrencia_df['Descricao'], tipos_ocorrencia_df['TipoOcorrenciaID'])) if not tipos_ocorrencia_df.empty else {}
-tipo_ocorrencia_sigla_map = dict(zip(tipos_ocorrencia_df['Descricao'], tipos_ocorrencia_df['Sigla'])) if not tipos_ocorrencia_df.empty else {}
-
-if funcionarios_df.empty and get_db_connection() is None:
+if not funcionario_nomes and not check_db_connection():
     st.stop()
 
 st.sidebar.title("Sistema de Gestão de Horas")
@@ -693,27 +345,32 @@ if st.sidebar.button("📋 Relatórios e Análises", key="nav_relatorios_analise
     st.session_state.active_tab_index = 5
 
 st.sidebar.markdown("---")
+# Para alterações feitas fora da aplicação (ex.: processar_excel.py) aparecerem de imediato
+if st.sidebar.button("🔄 Recarregar dados", key="recarregar_dados"):
+    recarregar_dados()
+    st.rerun()
 st.sidebar.info("Desenvolvido por Susana Gonçalves")
 
+NOMES_SEPARADORES = ["Dashboard", "Gestão de Funcionários", "Registos de Presença", "Recibo de Vencimento",
+                     "Acertos Semestrais", "Relatórios e Análises"]
+instrumentacao.fase(NOMES_SEPARADORES[st.session_state.active_tab_index])
+
 if st.session_state.active_tab_index == 0:
     st.title("📊 Dashboard Geral")
     st.write("Visão geral da gestão de funcionários e registos de horas.")
+    funcionarios_df = get_funcionarios()
+    tipos_ocorrencia_df = carregar_tipos_ocorrencia()
 
     col1, col2, col3 = st.columns(3)
 
-    num_funcionarios = len(funcionarios_df) if not funcionarios_df.empty else 0
+    num_funcionarios = len(funcionario_nomes)
     col1.metric("Total de Funcionários", num_funcionarios)
 
-    if not registos_diarios_df.empty:
-        mes_atual = datetime.now().month
-        ano_atual = datetime.now().year
-        registos_mes_atual = registos_diarios_df[
-            (pd.to_datetime(registos_diarios_df['DataRegisto']).dt.month == mes_atual) &
-            (pd.to_datetime(registos_diarios_df['DataRegisto']).dt.year == ano_atual)
-        ].copy()
-
-        total_horas_trabalhadas = registos_mes_atual['HorasTrabalhadas'].sum()
-        total_horas_extra = registos_mes_atual['HorasExtraDiarias'].sum()
+    today = date.today()
+    totais_mes_atual = get_totais_registos_mensais(today.year, today.month)
+    if not totais_mes_atual.empty:
+        total_horas_trabalhadas = totais_mes_atual['TotalHorasTrabalhadas'].iloc[0]
+        total_horas_extra = totais_mes_atual['TotalHorasExtra'].iloc[0]
     else:
         total_horas_trabalhadas = 0
         total_horas_extra = 0
@@ -724,29 +381,27 @@ if st.session_state.active_tab_index == 0:
     st.markdown("---")
 
     st.subheader("Últimos Registos de Presença")
-    if not registos_diarios_df.empty:
-        registos_com_nomes = pd.merge(registos_diarios_df, funcionarios_df[['FuncionarioID', 'NomeCompleto']],
+    ultimos_registos_df = get_ultimos_registos_diarios(10)
+    if not ultimos_registos_df.empty:
+        registos_com_nomes = pd.merge(ultimos_registos_df, funcionarios_df[['FuncionarioID', 'NomeCompleto']],
                                       on='FuncionarioID', how='left')
         registos_com_nomes = pd.merge(registos_com_nomes, tipos_ocorrencia_df[['TipoOcorrenciaID', 'Descricao']],
                                       left_on='TipoOcorrenciaID', right_on='TipoOcorrenciaID', how='left')
         registos_com_nomes = registos_com_nomes.rename(columns={'Descricao': 'Tipo de Ocorrência'})
         st.dataframe(registos_com_nomes[['RegistoID', 'NomeCompleto', 'DataRegisto', 'HorasTrabalhadas', 'HorasExtraDiarias', 'HorasAusencia', 'Tipo de Ocorrência', 'Observacoes']]
-                     .tail(10).sort_values(by='DataRegisto', ascending=False), use_container_width=True)
+                     .sort_values(by='DataRegisto', ascending=False), use_container_width=True)
     else:
         st.info("Nenhum registo de presença encontrado.")
 
     st.subheader("Próximas Férias e Licenças")
-    if not ferias_df.empty or not licencas_df.empty:
-        today = date.today()
-        
-        ferias_df['DataInicio'] = pd.to_datetime(ferias_df['DataInicio']).dt.date
-        ferias_df['DataFim'] = pd.to_datetime(ferias_df['DataFim']).dt.date
-        licencas_df['DataInicio'] = pd.to_datetime(licencas_df['DataInicio']).dt.date
-        licencas_df['DataFim'] = pd.to_datetime(licencas_df['DataFim']).dt.date
-
-
-        proximas_ferias = ferias_df[ferias_df['DataFim'] >= today].sort_values(by='DataInicio').head(5)
-        proximas_licencas = licencas_df[licencas_df['DataFim'] >= today].sort_values(by='DataInicio').head(5)
+    # Só as 5 primeiras de cada, já ordenadas pela base de dados
+    proximas_ferias = get_proximas_ferias(today, 5)
+    proximas_licencas = get_proximas_licencas(today, 5)
+    if not proximas_ferias.empty or not proximas_licencas.empty:
+        for proximas_df in (proximas_ferias, proximas_licencas):
+            if not proximas_df.empty:
+                proximas_df['DataInicio'] = pd.to_datetime(proximas_df['DataInicio']).dt.date
+                proximas_df['DataFim'] = pd.to_datetime(proximas_df['DataFim']).dt.date
 
         st.markdown("##### Férias:")
         if not proximas_ferias.empty:
@@ -772,6 +427,7 @@ if st.session_state.active_tab_index == 0:
 elif st.session_state.active_tab_index == 1:
     st.title("👥 Gestão de Funcionários")
     st.write("Adicione, edite ou remova informações de funcionários.")
+    funcionarios_df = get_funcionarios()
 
     with st.expander("Adicionar/Editar Funcionário"):
         with st.form("funcionario_form", clear_on_submit=True):
@@ -858,6 +514,7 @@ elif st.session_state.active_tab_index == 1:
 elif st.session_state.active_tab_index == 2:
     st.title("📝 Registos de Presença e Ausência")
     st.write("Gerencie os registos diários, férias, faltas e licenças dos funcionários.")
+    funcionarios_df = get_funcionarios()
 
     registro_type = st.radio(
         "Selecione o tipo de registo:",
@@ -867,6 +524,8 @@ elif st.session_state.active_tab_index == 2:
     )
 
     if registro_type == "Registo Diário":
+        tipos_ocorrencia_df = carregar_tipos_ocorrencia()
+        tipo_ocorrencia_nomes, tipo_ocorrencia_id_map, _ = get_mapas_tipos_ocorrencia()
         st.subheader("Adicionar/Editar Registo Diário")
         st.info("Os campos abaixo permitem registar `HorasTrabalhadas`, `HorasExtraDiarias`, `HorasAusencia` e `Observacoes` diretamente, conforme a sua tabela `RegistosDiarios`.")
         with st.expander("Formulário de Registo Diário"):
@@ -912,7 +571,8 @@ elif st.session_state.active_tab_index == 2:
 
         st.markdown("---")
         st.subheader("Registos Diários Existentes")
-        registos_diarios_df = get_registos_diarios()
+        filtros_rd = filtros_listagem("lista_rd", tipo_ocorrencia_id_map, "Tipo de Ocorrência")
+        registos_diarios_df = listagem_paginada('RegistosDiarios', "lista_rd", filtros_rd)
         if not registos_diarios_df.empty:
             registos_diarios_com_nomes = pd.merge(registos_diarios_df, funcionarios_df[['FuncionarioID', 'NomeCompleto']], on='FuncionarioID', how='left')
             registos_diarios_com_nomes = pd.merge(registos_diarios_com_nomes, tipos_ocorrencia_df[['TipoOcorrenciaID', 'Descricao']], left_on='TipoOcorrenciaID', right_on='TipoOcorrenciaID', how='left')
@@ -922,7 +582,7 @@ elif st.session_state.active_tab_index == 2:
             st.markdown("#### Apagar Registo Diário")
             registo_ids_delete = registos_diarios_df['RegistoID'].tolist()
             if registo_ids_delete:
-                registo_id_to_delete = st.selectbox("Selecione o ID do registo a apagar", registo_ids_delete, key="delete_rd_select")
+                registo_id_to_delete = st.selectbox("Selecione o ID do registo a apagar (página atual)", registo_ids_delete, key="delete_rd_select")
                 if st.button("Apagar Registo Diário", key="delete_rd_button"):
                     if delete_registo_diario(registo_id_to_delete):
                         st.success(f"Registo diário ID {registo_id_to_delete} apagado com sucesso!")
@@ -933,7 +593,7 @@ elif st.session_state.active_tab_index == 2:
             else:
                 st.info("Nenhum registo diário para apagar.")
         else:
-            st.info("Nenhum registo diário encontrado.")
+            st.info("Nenhum registo diário encontrado com estes filtros.")
 
     elif registro_type == "Férias":
         st.subheader("Adicionar/Editar Registo de Férias")
@@ -975,7 +635,8 @@ elif st.session_state.active_tab_index == 2:
 
         st.markdown("---")
         st.subheader("Registos de Férias Existentes")
-        ferias_df = get_ferias()
+        filtros_ferias = filtros_listagem("lista_ferias")
+        ferias_df = listagem_paginada('Ferias', "lista_ferias", filtros_ferias)
         if not ferias_df.empty:
             ferias_com_nomes = pd.merge(ferias_df, funcionarios_df[['FuncionarioID', 'NomeCompleto']], on='FuncionarioID', how='left')
             st.dataframe(ferias_com_nomes[['FeriasID', 'NomeCompleto', 'DataInicio', 'DataFim', 'Aprovado', 'Observacoes']], use_container_width=True)
@@ -983,7 +644,7 @@ elif st.session_state.active_tab_index == 2:
             st.markdown("#### Apagar Registo de Férias")
             ferias_ids_delete = ferias_df['FeriasID'].tolist()
             if ferias_ids_delete:
-                ferias_id_to_delete = st.selectbox("Selecione o ID das férias a apagar", ferias_ids_delete, key="delete_ferias_select")
+                ferias_id_to_delete = st.selectbox("Selecione o ID das férias a apagar (página atual)", ferias_ids_delete, key="delete_ferias_select")
                 if st.button("Apagar Férias", key="delete_ferias_button"):
                     if delete_ferias(ferias_id_to_delete):
                         st.success(f"Férias ID {ferias_id_to_delete} apagadas com sucesso!")
@@ -994,7 +655,7 @@ elif st.session_state.active_tab_index == 2:
             else:
                 st.info("Nenhum registo de férias para apagar.")
         else:
-            st.info("Nenhum registo de férias encontrado.")
+            st.info("Nenhum registo de férias encontrado com estes filtros.")
 
     elif registro_type == "Faltas":
         st.subheader("Adicionar/Editar Registo de Falta")
@@ -1038,7 +699,8 @@ elif st.session_state.active_tab_index == 2:
 
         st.markdown("---")
         st.subheader("Registos de Faltas Existentes")
-        faltas_df = get_faltas()
+        filtros_faltas = filtros_listagem("lista_faltas", {'Justificadas': True, 'Injustificadas': False}, "Justificação")
+        faltas_df = listagem_paginada('Faltas', "lista_faltas", filtros_faltas)
         if not faltas_df.empty:
             faltas_com_nomes = pd.merge(faltas_df, funcionarios_df[['FuncionarioID', 'NomeCompleto']], on='FuncionarioID', how='left')
             cols_to_display_falta = ['FaltaID', 'NomeCompleto', 'DataFalta', 'Motivo', 'HorasAusenciaFalta', 'Aprovado']
@@ -1049,7 +711,7 @@ elif st.session_state.active_tab_index == 2:
             st.markdown("#### Apagar Registo de Falta")
             falta_ids_delete = faltas_df['FaltaID'].tolist()
             if falta_ids_delete:
-                falta_id_to_delete = st.selectbox("Selecione o ID da falta a apagar", falta_ids_delete, key="delete_falta_select")
+                falta_id_to_delete = st.selectbox("Selecione o ID da falta a apagar (página atual)", falta_ids_delete, key="delete_falta_select")
                 if st.button("Apagar Falta", key="delete_falta_button"):
                     if delete_falta(falta_id_to_delete):
                         st.success(f"Falta ID {falta_id_to_delete} apagada com sucesso!")
@@ -1060,7 +722,7 @@ elif st.session_state.active_tab_index == 2:
             else:
                 st.info("Nenhum registo de falta para apagar.")
         else:
-            st.info("Nenhum registo de falta encontrado.")
+            st.info("Nenhum registo de falta encontrado com estes filtros.")
 
     elif registro_type == "Licenças":
         st.subheader("Adicionar/Editar Registo de Licença")
@@ -1104,7 +766,8 @@ elif st.session_state.active_tab_index == 2:
 
         st.markdown("---")
         st.subheader("Registos de Licenças Existentes")
-        licencas_df = get_licencas()
+        filtros_licencas = filtros_listagem("lista_licencas")
+        licencas_df = listagem_paginada('Licencas', "lista_licencas", filtros_licencas)
         if not licencas_df.empty:
             licencas_com_nomes = pd.merge(licencas_df, funcionarios_df[['FuncionarioID', 'NomeCompleto']], on='FuncionarioID', how='left')
             cols_to_display_licenca = ['LicencaID', 'NomeCompleto', 'Motivo', 'DataInicio', 'DataFim', 'Aprovado']
@@ -1116,7 +779,7 @@ elif st.session_state.active_tab_index == 2:
             st.markdown("#### Apagar Registo de Licença")
             licenca_ids_delete = licencas_df['LicencaID'].tolist()
             if licenca_ids_delete:
-                licenca_id_to_delete = st.selectbox("Selecione o ID da licença a apagar", licenca_ids_delete, key="delete_licenca_select")
+                licenca_id_to_delete = st.selectbox("Selecione o ID da licença a apagar (página atual)", licenca_ids_delete, key="delete_licenca_select")
                 if st.button("Apagar Licença", key="delete_licenca_button"):
                     if delete_licenca(licenca_id_to_delete): 
                         st.success(f"Licença ID {licenca_id_to_delete} apagada com sucesso!")
@@ -1127,9 +790,10 @@ elif st.session_state.active_tab_index == 2:
             else:
                 st.info("Nenhum registo de licença para apagar.")
         else:
-            st.info("Nenhum registo de licença encontrado.")
+            st.info("Nenhum registo de licença encontrado com estes filtros.")
 
     elif registro_type == "Tipos de Ocorrência":
+        tipos_ocorrencia_df = carregar_tipos_ocorrencia()
         st.subheader("Gestão de Tipos de Ocorrência")
         st.info("Adicione, edite ou apague os tipos de ocorrência utilizados no sistema.")
         
@@ -1203,6 +867,7 @@ elif st.session_state.active_tab_index == 2:
 elif st.session_state.active_tab_index == 3:
     st.title("💰 Gerar Recibo de Vencimento")
     st.write("Selecione um funcionário e um mês/ano para gerar o recibo de vencimento.")
+    funcionarios_df = get_funcionarios()
 
     if not funcionarios_df.empty:
         selected_funcionario_name_recibo = st.selectbox(
@@ -1223,115 +888,176 @@ elif st.session_state.active_tab_index == 3:
         if selected_funcionario_id_recibo:
             funcionario_info = funcionarios_df[funcionarios_df['FuncionarioID'] == selected_funcionario_id_recibo].iloc[0]
 
-            num_days_in_month = calendar.monthrange(ano_recibo, mes_recibo)[1]
-            start_date = date(ano_recibo, mes_recibo, 1)
-            end_date = date(ano_recibo, mes_recibo, num_days_in_month)
-
             registos_diarios_mes, faltas_mes, ferias_mes, licencas_mes = \
-                get_all_events_for_employee_and_period(selected_funcionario_id_recibo, start_date, end_date)
-
-            salario_base_mensal = float(funcionario_info['SalarioBaseMensal'])
-            valor_subsidio_alimentacao_diario = float(funcionario_info['ValorSubsidioAlimentacaoDiario'])
-            taxa_irs = float(funcionario_info['TaxaIRS'])
-            taxa_seguranca_social_funcionario = float(funcionario_info['TaxaSegurancaSocialFuncionario'])
-            horas_trabalho_mensal_padrao = float(funcionario_info['HorasTrabalhoMensalPadrao'])
-            taxa_hora_extra_50 = float(funcionario_info['TaxaHoraExtra50'])
-            taxa_hora_extra_100 = float(funcionario_info['TaxaHoraExtra100'])
-
-            total_horas_trabalhadas_mes = registos_diarios_mes['HorasTrabalhadas'].sum() if not registos_diarios_mes.empty else 0.0
-            total_horas_extra_mes = registos_diarios_mes['HorasExtraDiarias'].sum() if not registos_diarios_mes.empty else 0.0
-
-            total_horas_ausencia_registo_diario = registos_diarios_mes['HorasAusencia'].sum() if not registos_diarios_mes.empty else 0.0
-            total_horas_ausencia_faltas = faltas_mes['HorasAusenciaFalta'].sum() if not faltas_mes.empty else 0.0
-            total_horas_ausencia_geral = total_horas_ausencia_registo_diario + total_horas_ausencia_faltas
-
-            dias_ferias_mes = 0
-            if not ferias_mes.empty:
-                for _, row in ferias_mes.iterrows():
-                    start_event = row['DataInicio'].date() if isinstance(row['DataInicio'], datetime) else row['DataInicio']
-                    end_event = row['DataFim'].date() if isinstance(row['DataFim'], datetime) else row['DataFim']
-                    start = max(start_event, start_date)
-                    end = min(end_event, end_date)
-                    if start <= end:
-                        dias_ferias_mes += (end - start).days + 1
-
-            dias_licencas_mes = 0
-            if not licencas_mes.empty:
-                for _, row in licencas_mes.iterrows():
-                    start_event = row['DataInicio'].date() if isinstance(row['DataInicio'], datetime) else row['DataInicio']
-                    end_event = row['DataFim'].date() if isinstance(row['DataFim'], datetime) else row['DataFim']
-                    start = max(start_event, start_date)
-                    end = min(end_event, end_date)
-                    if start <= end:
-                        dias_licencas_mes += (end - start).days + 1
-
-            custo_hora_padrao = salario_base_mensal / horas_trabalho_mensal_padrao if horas_trabalho_mensal_padrao > 0 else 0
-
-            vencimento_bruto = salario_base_mensal
-            valor_horas_extra = (total_horas_extra_mes * (1 + taxa_hora_extra_50) * custo_hora_padrao)
-            vencimento_bruto += valor_horas_extra
-
-            desconto_irs = vencimento_bruto * taxa_irs
-            desconto_ss = vencimento_bruto * taxa_seguranca_social_funcionario
-            desconto_ausencia = total_horas_ausencia_geral * custo_hora_padrao
-
-            dias_trabalhados_efetivos = registos_diarios_mes['DataRegisto'].nunique() if not registos_diarios_mes.empty else 0
-            subsidio_alimentacao = dias_trabalhados_efetivos * valor_subsidio_alimentacao_diario
-
-            salario_liquido = vencimento_bruto - desconto_irs - desconto_ss - desconto_ausencia + subsidio_alimentacao
-
-            st.subheader(f"Recibo de Vencimento para {funcionario_info['NomeCompleto']} - {mes_recibo:02d}/{ano_recibo}")
-            st.markdown("---")
-
-            col_left, col_right = st.columns(2)
-
-            with col_left:
-                st.markdown("#### Rendimentos")
-                st.write(f"**Salário Base Mensal:** {salario_base_mensal:.2f} €")
-                st.write(f"**Horas Trabalhadas (mês):** {total_horas_trabalhadas_mes:.2f}h")
-                st.write(f"**Horas Extra (mês):** {total_horas_extra_mes:.2f}h")
-                st.write(f"**Valor Horas Extra:** {valor_horas_extra:.2f} €")
-                st.write(f"**Subsídio de Alimentação:** {subsidio_alimentacao:.2f} €")
-                st.markdown(f"**Vencimento Bruto:** **{vencimento_bruto + subsidio_alimentacao:.2f} €**")
-
-            with col_right:
-                st.markdown("#### Descontos")
-                st.write(f"**IRS ({taxa_irs*100:.2f}%):** {desconto_irs:.2f} €")
-                st.write(f"**Segurança Social ({taxa_seguranca_social_funcionario*100:.2f}%):** {desconto_ss:.2f} €")
-                st.write(f"**Ausências (Horas):** {total_horas_ausencia_geral:.2f}h")
-                st.write(f"**Desconto por Ausência:** {desconto_ausencia:.2f} €")
-                st.markdown(f"**Total Descontos:** **{(desconto_irs + desconto_ss + desconto_ausencia):.2f} €**")
-
-            st.markdown("---")
-            st.subheader(f"Salário Líquido a Receber: **{salario_liquido:.2f} €**")
-
-            st.markdown("#### Resumo de Férias e Licenças no Mês")
-            st.write(f"**Dias de Férias:** {dias_ferias_mes} dias")
-            st.write(f"**Dias de Licença:** {dias_licencas_mes} dias")
-
-            pdf_content = generate_payslip_pdf(
-                funcionario_info, mes_recibo, ano_recibo,
-                total_horas_trabalhadas_mes, total_horas_extra_mes,
-                salario_base_mensal, valor_horas_extra,
-                subsidio_alimentacao, vencimento_bruto,
-                desconto_irs, taxa_irs, desconto_ss, taxa_seguranca_social_funcionario,
-                total_horas_ausencia_geral, desconto_ausencia, salario_liquido,
-                dias_ferias_mes, dias_licencas_mes
-            )
-            st.download_button(
-                label="Baixar Recibo em PDF",
-                data=pdf_content,
-                file_name=f"recibo_vencimento_{funcionario_info['NomeCompleto'].replace(' ', '_')}_{ano_recibo}_{mes_recibo:02d}.pdf",
-                mime="application/pdf",
-                key="download_pdf_button"
-            )
+                get_eventos_mes(ano_recibo, mes_recibo, funcionario_id=selected_funcionario_id_recibo)
+
+            with instrumentacao.secao("Recibo: cálculo"):
+                recibo = calcular_recibos_mes(funcionarios_df[funcionarios_df['FuncionarioID'] == selected_funcionario_id_recibo],
+                                              registos_diarios_mes, faltas_mes, ferias_mes, licencas_mes,
+                                              ano_recibo, mes_recibo).iloc[0]
+            if recibo['Erro']:
+                st.error(f"Não é possível calcular o recibo: {recibo['Erro']}. Complete a ficha do funcionário.")
+            else:
+                st.subheader(f"Recibo de Vencimento para {funcionario_info['NomeCompleto']} - {mes_recibo:02d}/{ano_recibo}")
+                st.markdown("---")
+
+                col_left, col_right = st.columns(2)
+
+                with col_left:
+                    st.markdown("#### Rendimentos")
+                    st.write(f"**Salário Base Mensal:** {recibo['salario_base_mensal']:.2f} €")
+                    st.write(f"**Horas Trabalhadas (mês):** {recibo['total_horas_trabalhadas_mes']:.2f}h")
+                    st.write(f"**Horas Extra (mês):** {recibo['total_horas_extra_mes']:.2f}h")
+                    st.write(f"**Valor Horas Extra:** {recibo['valor_horas_extra']:.2f} €")
+                    st.write(f"**Subsídio de Alimentação:** {recibo['subsidio_alimentacao']:.2f} €")
+                    st.markdown(f"**Vencimento Bruto:** **{recibo['vencimento_bruto'] + recibo['subsidio_alimentacao']:.2f} €**")
+
+                with col_right:
+                    st.markdown("#### Descontos")
+                    st.write(f"**IRS ({recibo['taxa_irs']*100:.2f}%):** {recibo['desconto_irs']:.2f} €")
+                    st.write(f"**Segurança Social ({recibo['taxa_seguranca_social_funcionario']*100:.2f}%):** {recibo['desconto_ss']:.2f} €")
+                    st.write(f"**Ausências (Horas):** {recibo['total_horas_ausencia_geral']:.2f}h")
+                    st.write(f"**Desconto por Ausência:** {recibo['desconto_ausencia']:.2f} €")
+                    st.markdown(f"**Total Descontos:** **{recibo['total_descontos']:.2f} €**")
+
+                st.markdown("---")
+                st.subheader(f"Salário Líquido a Receber: **{recibo['salario_liquido']:.2f} €**")
+
+                st.markdown("#### Resumo de Férias e Licenças no Mês")
+                st.write(f"**Dias de Férias:** {recibo['dias_ferias_mes']} dias")
+                st.write(f"**Dias de Licença:** {recibo['dias_licencas_mes']} dias")
+
+                with instrumentacao.secao("Recibo: PDF"):
+                    pdf_content = gerar_pdf_recibo(recibo, ano_recibo, mes_recibo)
+                st.download_button(
+                    label="Baixar Recibo em PDF",
+                    data=pdf_content,
+                    file_name=nome_ficheiro_recibo(funcionario_info['NomeCompleto'], ano_recibo, mes_recibo),
+                    mime="application/pdf",
+                    key="download_pdf_button",
+                    on_click="ignore"
+                )
 
         else:
             st.warning("Por favor, selecione um funcionário para gerar o recibo de vencimento.")
 
+    st.markdown("---")
+    st.subheader("Recibos em Lote")
+    st.write("Gera os recibos de todos os funcionários (ou de um departamento) para o mês e ano indicados acima.")
+
+    col_dep_lote, col_formato_lote = st.columns(2)
+    departamento_lote = col_dep_lote.selectbox("Departamento", departamentos_unicos, key="recibo_lote_departamento")
+    formato_lote = col_formato_lote.radio("Formato", ["ZIP (um PDF por funcionário)", "PDF único"], key="recibo_lote_formato")
+
+    if st.button("Gerar Recibos em Lote", key="gerar_recibos_lote_button"):
+        departamento = None if departamento_lote == 'Todos' else departamento_lote
+        funcionarios_lote = funcionarios_df if departamento is None else funcionarios_df[funcionarios_df['Departamento'] == departamento]
+        st.session_state.pop('recibos_lote', None)
+
+        if funcionarios_lote.empty:
+            st.warning("Não há funcionários para gerar recibos com o filtro selecionado.")
+        else:
+            # Um só conjunto de consultas para o mês inteiro, em vez de quatro por funcionário
+            registos_lote, faltas_lote, ferias_lote, licencas_lote = get_eventos_mes(ano_recibo, mes_recibo, departamento)
+            with instrumentacao.secao("Recibos em lote: cálculo"):
+                recibos_lote = calcular_recibos_mes(funcionarios_lote, registos_lote, faltas_lote, ferias_lote, licencas_lote,
+                                                    ano_recibo, mes_recibo)
+
+            barra_progresso = st.progress(0.0, text="A gerar recibos...")
+
+            def atualizar_progresso(feitos, total):
+                barra_progresso.progress(feitos / total, text=f"A gerar recibos... {feitos}/{total}")
+
+            with instrumentacao.secao("Recibos em lote: PDFs"):
+                if formato_lote == "PDF único":
+                    conteudo, erros = gerar_pdf_unico(recibos_lote, ano_recibo, mes_recibo, progresso=atualizar_progresso)
+                    nome_ficheiro, mime = f"recibos_vencimento_{ano_recibo}_{mes_recibo:02d}.pdf", "application/pdf"
+                else:
+                    pdfs, erros = gerar_pdfs_recibos(recibos_lote, ano_recibo, mes_recibo, progresso=atualizar_progresso)
+                    conteudo = empacotar_zip(pdfs, ano_recibo, mes_recibo) if pdfs else None
+                    nome_ficheiro, mime = f"recibos_vencimento_{ano_recibo}_{mes_recibo:02d}.zip", "application/zip"
+
+            # Guardado na sessão para o botão de download sobreviver ao rerun
+            st.session_state.recibos_lote = {
+                'conteudo': conteudo, 'nome_ficheiro': nome_ficheiro, 'mime': mime,
+                'gerados': len(recibos_lote) - len(erros), 'erros': erros,
+                'folha': folha_vencimentos(recibos_lote), 'periodo': f"{ano_recibo}_{mes_recibo:02d}",
+            }
+
+    if 'recibos_lote' in st.session_state:
+        resultado_lote = st.session_state.recibos_lote
+        if resultado_lote['conteudo']:
+            st.success(f"{resultado_lote['gerados']} recibos gerados com sucesso.")
+            st.download_button(
+                label="Baixar Recibos",
+                data=resultado_lote['conteudo'],
+                file_name=resultado_lote['nome_ficheiro'],
+                mime=resultado_lote['mime'],
+                key="download_recibos_lote_button",
+                on_click="ignore"
+            )
+        if resultado_lote['erros']:
+            st.warning(f"{len(resultado_lote['erros'])} recibos não foram gerados:")
+            st.dataframe(pd.DataFrame(resultado_lote['erros'], columns=['FuncionarioID', 'Funcionário', 'Erro']), hide_index=True)
+
+        st.markdown("#### Folha de Vencimentos")
+        st.dataframe(resultado_lote['folha'], hide_index=True)
+        col_csv_folha, col_excel_folha = st.columns(2)
+        col_csv_folha.download_button(
+            label="Exportar Folha de Vencimentos (CSV)",
+            data=convert_df_to_csv(resultado_lote['folha']),
+            file_name=f"folha_vencimentos_{resultado_lote['periodo']}.csv",
+            mime="text/csv",
+            key="download_folha_vencimentos_csv",
+            on_click="ignore"
+        )
+        col_excel_folha.download_button(
+            label="Exportar Folha de Vencimentos (Excel)",
+            data=to_excel(resultado_lote['folha']),
+            file_name=f"folha_vencimentos_{resultado_lote['periodo']}.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            key="download_folha_vencimentos_excel",
+            on_click="ignore"
+        )
+
 elif st.session_state.active_tab_index == 4:
     st.title("📈 Gestão de Acertos Semestrais")
     st.write("Registe e visualize os acertos semestrais de horas e FOTS dos funcionários.")
+    funcionarios_df = get_funcionarios()
+
+    with st.expander("Fecho de Semestre (cálculo automático)"):
+        st.write("Calcula os acertos de todos os funcionários com registos no semestre, a partir dos registos diários "
+                 "e das características dos tipos de ocorrência (horas extra, FOTS e folgas compensatórias).")
+        col_ano_fecho, col_semestre_fecho = st.columns(2)
+        ano_fecho = col_ano_fecho.number_input("Ano", min_value=2000, value=datetime.now().year, step=1, key="fecho_ano")
+        semestre_fecho = col_semestre_fecho.selectbox("Semestre", [1, 2], key="fecho_semestre_select")
+
+        if st.button("Pré-visualizar Fecho", key="fecho_preview_button"):
+            with instrumentacao.secao("Fecho de semestre: pré-visualização"):
+                calculados_df = get_acertos_calculados(ano_fecho, semestre_fecho)
+                comparacao_df = comparar_acertos(calculados_df, get_acertos_semestrais(ano=ano_fecho), semestre_fecho)
+            st.session_state.fecho_semestre = {'periodo': (ano_fecho, semestre_fecho), 'comparacao': comparacao_df}
+
+        fecho = st.session_state.get('fecho_semestre')
+        if fecho and fecho['periodo'] == (ano_fecho, semestre_fecho):
+            comparacao_df = fecho['comparacao']
+            if comparacao_df.empty:
+                st.info("Não há registos diários neste semestre.")
+            else:
+                contagem = comparacao_df['Estado'].value_counts()
+                st.write(f"**Novos:** {contagem.get('Novo', 0)} | **Alterados:** {contagem.get('Alterado', 0)} | "
+                         f"**Sem alterações:** {contagem.get('Sem alterações', 0)}")
+                comparacao_com_nomes = pd.merge(comparacao_df, funcionarios_df[['FuncionarioID', 'NomeCompleto']], on='FuncionarioID', how='left')
+                st.dataframe(comparacao_com_nomes[['NomeCompleto'] + [c for c in comparacao_df.columns if c != 'FuncionarioID']],
+                             use_container_width=True)
+
+                if st.button("Aplicar Fecho de Semestre", key="fecho_aplicar_button"):
+                    with instrumentacao.secao("Fecho de semestre: gravação"):
+                        resultado = fechar_semestre(ano_fecho, semestre_fecho)
+                    if resultado is not None:
+                        inseridos, atualizados = resultado
+                        del st.session_state.fecho_semestre
+                        st.success(f"Fecho do {semestre_fecho}º semestre de {ano_fecho} aplicado: {inseridos} acertos criados, {atualizados} atualizados.")
 
     with st.expander("Adicionar/Editar Acerto Semestral"):
         with st.form("acerto_semestral_form", clear_on_submit=True):
@@ -1405,67 +1131,25 @@ elif st.session_state.active_tab_index == 5:
     ano_relatorio_global = col_filter_ano.number_input("Ano", min_value=2000, value=datetime.now().year, step=1, key="rel_ano_global")
     selected_departamento = col_filter_depto.selectbox("Filtrar por Departamento", departamentos_unicos, key="rel_depto_global")
 
-    funcionarios_filtrados_df = funcionarios_df.copy()
+    funcionarios_filtrados_df = get_funcionarios()
+    departamento_filtro = None
     if selected_departamento != 'Todos':
         funcionarios_filtrados_df = funcionarios_filtrados_df[funcionarios_filtrados_df['Departamento'] == selected_departamento]
+        departamento_filtro = selected_departamento
+
+    inicio_ano_relatorio = date(ano_relatorio_global, 1, 1)
+    fim_ano_relatorio = date(ano_relatorio_global, 12, 31)
 
     st.markdown("---")
 
     st.subheader(f"Saldos de Horas e Dias (Ano: {ano_relatorio_global})")
     if not funcionarios_filtrados_df.empty:
-        saldos_data = []
-        for index, func_row in funcionarios_filtrados_df.iterrows():
-            funcionario_id = func_row['FuncionarioID']
-            nome_completo = func_row['NomeCompleto']
-            
-            dias_ferias_anuais = int(func_row['DiasFeriasAnuais']) if pd.notna(func_row['DiasFeriasAnuais']) else 22 
-
-            horas_extra_acumuladas = acertos_semestrais_df[
-                (acertos_semestrais_df['FuncionarioID'] == funcionario_id) &
-                (acertos_semestrais_df['Ano'] == ano_relatorio_global)
-            ]['TotalHorasExtraAcumuladas'].sum() if not acertos_semestrais_df.empty else 0.0
-
-            ferias_do_ano = ferias_df[
-                (ferias_df['FuncionarioID'] == funcionario_id) &
-                (pd.to_datetime(ferias_df['DataInicio']).dt.year == ano_relatorio_global)
-            ]
-            dias_ferias_tirados = 0
-            if not ferias_do_ano.empty:
-                for _, ferias_row in ferias_do_ano.iterrows():
-                    start_event = ferias_row['DataInicio'].date() if isinstance(ferias_row['DataInicio'], datetime) else ferias_row['DataInicio']
-                    end_event = ferias_row['DataFim'].date() if isinstance(ferias_row['DataFim'], datetime) else ferias_row['DataFim']
-                    dias_ferias_tirados += (end_event - start_event).days + 1
-
-            dias_ferias_disponiveis = dias_ferias_anuais - dias_ferias_tirados
-
-            faltas_do_ano = faltas_df[
-                (faltas_df['FuncionarioID'] == funcionario_id) &
-                (pd.to_datetime(faltas_df['DataFalta']).dt.year == ano_relatorio_global)
-            ]
-            dias_faltas_total = faltas_do_ano['DataFalta'].nunique() if not faltas_do_ano.empty else 0
-
-            licencas_do_ano = licencas_df[
-                (licencas_df['FuncionarioID'] == funcionario_id) &
-                (pd.to_datetime(licencas_df['DataInicio']).dt.year == ano_relatorio_global)
-            ]
-            dias_licencas_total = 0
-            if not licencas_do_ano.empty:
-                for _, licenca_row in licencas_do_ano.iterrows():
-                    start_event = licenca_row['DataInicio'].date() if isinstance(licenca_row['DataInicio'], datetime) else licenca_row['DataInicio']
-                    end_event = licenca_row['DataFim'].date() if isinstance(licenca_row['DataFim'], datetime) else licenca_row['DataFim']
-                    dias_licencas_total += (end_event - start_event).days + 1
-
-            saldos_data.append({
-                'Funcionário': nome_completo,
-                'Departamento': func_row['Departamento'],
-                'Horas Extra Acumuladas': f"{horas_extra_acumuladas:.2f}h",
-                'Dias Férias Anuais (Direito)': dias_ferias_anuais,
-                'Dias Férias Tirados': dias_ferias_tirados,
-                'Dias Férias Disponíveis': dias_ferias_disponiveis,
-                'Dias Faltas (Ano)': dias_faltas_total,
-                'Dias Licença (Ano)': dias_licencas_total
-            })
-        saldos_df = pd.DataFrame(saldos_data)
+        acertos_semestrais_df = get_acertos_semestrais(ano=ano_relatorio_global, departamento=departamento_filtro)
+        ferias_df = get_ferias(inicio_ano_relatorio, fim_ano_relatorio, departamento=departamento_filtro)
+        faltas_df = get_faltas(inicio_ano_relatorio, fim_ano_relatorio, departamento=departamento_filtro)
+        licencas_df = get_licencas(inicio_ano_relatorio, fim_ano_relatorio, departamento=departamento_filtro)
+        with instrumentacao.secao("Saldos: cálculo"):
+            saldos_df = compute_saldos(funcionarios_filtrados_df, acertos_semestrais_df, ferias_df, faltas_df, licencas_df, ano_relatorio_global)
         st.dataframe(saldos_df, use_container_width=True)
 
         st.download_button(
@@ -1473,14 +1157,16 @@ elif st.session_state.active_tab_index == 5:
             data=convert_df_to_csv(saldos_df),
             file_name=f"saldos_horas_dias_{ano_relatorio_global}.csv",
             mime="text/csv",
-            key="export_saldos_csv"
+            key="export_saldos_csv",
+            on_click="ignore"
         )
         st.download_button(
             label="Exportar Saldos (Excel)",
             data=to_excel(saldos_df),
             file_name=f"saldos_horas_dias_{ano_relatorio_global}.xlsx",
             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            key="export_saldos_excel"
+            key="export_saldos_excel",
+            on_click="ignore"
         )
     else:
         st.info("Nenhum funcionário encontrado para o departamento selecionado ou na base de dados.")
@@ -1489,160 +1175,118 @@ elif st.session_state.active_tab_index == 5:
 
     st.subheader(f"Quadro Mensal de Ocorrências: {mes_relatorio_global:02d}/{ano_relatorio_global}")
     
-    if st.button("Gerar Quadro Mensal", key="gerar_quadro_mensal_button"):
-        if not funcionarios_filtrados_df.empty and not tipos_ocorrencia_df.empty:
-            num_days_in_month = calendar.monthrange(ano_relatorio_global, mes_relatorio_global)[1]
-            start_of_month = date(ano_relatorio_global, mes_relatorio_global, 1)
-            end_of_month = date(ano_relatorio_global, mes_relatorio_global, num_days_in_month)
-
-            columns_quadro = ['Funcionário'] + [f'Dia {d}' for d in range(1, num_days_in_month + 1)]
-            columns_quadro.extend(['Total Horas Normais', 'Total Horas Extra', 'Total Dias Férias', 'Total Dias Faltas', 'Total Dias Licença'])
-            report_data_quadro = []
-
-            for index, func_row in funcionarios_filtrados_df.iterrows():
-                funcionario_id = func_row['FuncionarioID']
-                nome_completo = func_row['NomeCompleto']
-                row_values = {'Funcionário': nome_completo}
-                
-                total_horas_normais_func = 0.0
-                total_horas_extra_func = 0.0
-                total_dias_ferias_func = 0
-                total_dias_faltas_func = 0
-                total_dias_licenca_func = 0
-
-                registos_diarios_func, faltas_func, ferias_func, licencas_func = \
-                    get_all_events_for_employee_and_period(funcionario_id, start_of_month, end_of_month)
-
-                if not registos_diarios_func.empty: registos_diarios_func['DataRegisto'] = pd.to_datetime(registos_diarios_func['DataRegisto']).dt.date
-                if not faltas_func.empty: faltas_func['DataFalta'] = pd.to_datetime(faltas_func['DataFalta']).dt.date
-                if not ferias_func.empty: 
-                    ferias_func['DataInicio'] = pd.to_datetime(ferias_func['DataInicio']).dt.date
-                    ferias_func['DataFim'] = pd.to_datetime(ferias_func['DataFim']).dt.date
-                if not licencas_func.empty: 
-                    licencas_func['DataInicio'] = pd.to_datetime(licencas_func['DataInicio']).dt.date
-                    licencas_func['DataFim'] = pd.to_datetime(licencas_func['DataFim']).dt.date
-
-                for day in range(1, num_days_in_month + 1):
-                    current_day_date = date(ano_relatorio_global, mes_relatorio_global, day)
-                    sigla = '-'
-
-                    is_ferias = ferias_func[(ferias_func['DataInicio'] <= current_day_date) & (ferias_func['DataFim'] >= current_day_date) & (ferias_func['Aprovado'] == True)]
-                    if not is_ferias.empty:
-                        sigla = 'F'
-                        total_dias_ferias_func += 1
-                    else:
-                        is_licenca = licencas_func[(licencas_func['DataInicio'] <= current_day_date) & (licencas_func['DataFim'] >= current_day_date) & (licencas_func['Aprovado'] == True)]
-                        if not is_licenca.empty:
-                            sigla = 'L'
-                            total_dias_licenca_func += 1
-                        else:
-                            is_falta = faltas_func[(faltas_func['DataFalta'] == current_day_date) & (faltas_func['Aprovado'] == True)]
-                            if not is_falta.empty:
-                                sigla = 'FJ' if is_falta['Justificada'].iloc[0] else 'FI'
-                                total_dias_faltas_func += 1
-                            else:
-                                registo_do_dia = registos_diarios_func[registos_diarios_func['DataRegisto'] == current_day_date]
-                                if not registo_do_dia.empty:
-                                    reg_info = registo_do_dia.iloc[0]
-                                    tipo_ocorrencia_id = reg_info['TipoOcorrenciaID']
-                                    sigla = get_sigla_by_tipo_id(tipo_ocorrencia_id, tipos_ocorrencia_df)
-                                    
-                                    total_horas_normais_func += reg_info['HorasTrabalhadas']
-                                    total_horas_extra_func += reg_info['HorasExtraDiarias']
-                                    
-                    row_values[f'Dia {day}'] = sigla
-
-                row_values['Total Horas Normais'] = f"{total_horas_normais_func:.2f}"
-                row_values['Total Horas Extra'] = f"{total_horas_extra_func:.2f}"
-                row_values['Total Dias Férias'] = total_dias_ferias_func
-                row_values['Total Dias Faltas'] = total_dias_faltas_func
-                row_values['Total Dias Licença'] = total_dias_licenca_func
-
-                report_data_quadro.append(row_values)
-
-            report_df_quadro = pd.DataFrame(report_data_quadro, columns=columns_quadro)
-
-            def highlight_siglas(val):
-                color_map = {
-                    'D': '#228B22', 'N': '#228B22', 'DT': '#90EE90', 'NT': '#90EE90', 'T': '#90EE90', 'HE': '#90EE90',
-                    'DTS': '#DDA0DD', 'NTS': '#DDA0DD',
-                    'F': '#FFA500', 'L': '#FFA500', 'B': '#FF0000', 'FI': '#FF0000', 'FJ': '#FF0000',
-                    'FOTS': '#FFFF00', 'DDTS5': '#D2B48C', 'NDTS5': '#D2B48C', '-': ''
-                }
-                if isinstance(val, str) and val in color_map:
-                    return f'background-color: {color_map[val]}'
-                return ''
+    # Os relatórios a pedido correm como fragmentos: os seus botões e exportações voltam a executar
+    # apenas o próprio relatório, sem recalcular os saldos acima
+    @st.fragment
+    @instrumentacao.fragmento
+    def quadro_mensal_ocorrencias(funcionarios_filtrados_df, departamento_filtro, ano_relatorio_global, mes_relatorio_global):
+        if st.button("Gerar Quadro Mensal", key="gerar_quadro_mensal_button"):
+            tipos_ocorrencia_df = carregar_tipos_ocorrencia()
+            if not funcionarios_filtrados_df.empty and not tipos_ocorrencia_df.empty:
+                num_days_in_month = calendar.monthrange(ano_relatorio_global, mes_relatorio_global)[1]
+                start_of_month = date(ano_relatorio_global, mes_relatorio_global, 1)
+                end_of_month = date(ano_relatorio_global, mes_relatorio_global, num_days_in_month)
+
+                registos_diarios_mes, faltas_mes, ferias_mes, licencas_mes = \
+                    get_all_events_for_period(start_of_month, end_of_month, departamento_filtro)
+
+                with instrumentacao.secao("Quadro mensal: grelha"):
+                    report_df_quadro = build_quadro_mensal(
+                        funcionarios_filtrados_df, tipos_ocorrencia_df,
+                        registos_diarios_mes, faltas_mes, ferias_mes, licencas_mes,
+                        ano_relatorio_global, mes_relatorio_global
+                    )
+
+                def highlight_siglas(val):
+                    color_map = {
+                        'D': '#228B22', 'N': '#228B22', 'DT': '#90EE90', 'NT': '#90EE90', 'T': '#90EE90', 'HE': '#90EE90',
+                        'DTS': '#DDA0DD', 'NTS': '#DDA0DD',
+                        'F': '#FFA500', 'L': '#FFA500', 'B': '#FF0000', 'FI': '#FF0000', 'FJ': '#FF0000',
+                        'FOTS': '#FFFF00', 'DDTS5': '#D2B48C', 'NDTS5': '#D2B48C', '-': ''
+                    }
+                    if isinstance(val, str) and val in color_map:
+                        return f'background-color: {color_map[val]}'
+                    return ''
 
-            day_columns_to_style = [col for col in report_df_quadro.columns if col.startswith('Dia')]
-            styled_report_df_quadro = report_df_quadro.style.applymap(highlight_siglas, subset=day_columns_to_style)
+                with instrumentacao.secao("Quadro mensal: Styler"):
+                    day_columns_to_style = [col for col in report_df_quadro.columns if col.startswith('Dia')]
+                    styled_report_df_quadro = report_df_quadro.style.applymap(highlight_siglas, subset=day_columns_to_style)
 
-            st.dataframe(styled_report_df_quadro, use_container_width=True)
+                    st.dataframe(styled_report_df_quadro, use_container_width=True)
 
-            st.download_button(
-                label="Exportar Quadro Mensal (CSV)",
-                data=convert_df_to_csv(report_df_quadro),
-                file_name=f"quadro_mensal_ocorrencias_{mes_relatorio_global:02d}_{ano_relatorio_global}.csv",
-                mime="text/csv",
-                key="export_quadro_csv"
-            )
-            st.download_button(
-                label="Exportar Quadro Mensal (Excel)",
-                data=to_excel(report_df_quadro),
-                file_name=f"quadro_mensal_ocorrencias_{mes_relatorio_global:02d}_{ano_relatorio_global}.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                key="export_quadro_excel"
-            )
-        else:
-            st.info("Nenhum funcionário encontrado para o departamento selecionado ou na base de dados para gerar o relatório de quadro mensal.")
+                st.download_button(
+                    label="Exportar Quadro Mensal (CSV)",
+                    data=convert_df_to_csv(report_df_quadro),
+                    file_name=f"quadro_mensal_ocorrencias_{mes_relatorio_global:02d}_{ano_relatorio_global}.csv",
+                    mime="text/csv",
+                    key="export_quadro_csv",
+                    on_click="ignore"
+                )
+                st.download_button(
+                    label="Exportar Quadro Mensal (Excel)",
+                    data=to_excel(report_df_quadro),
+                    file_name=f"quadro_mensal_ocorrencias_{mes_relatorio_global:02d}_{ano_relatorio_global}.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                    key="export_quadro_excel",
+                    on_click="ignore"
+                )
+            else:
+                st.info("Nenhum funcionário encontrado para o departamento selecionado ou na base de dados para gerar o relatório de quadro mensal.")
+
+    quadro_mensal_ocorrencias(funcionarios_filtrados_df, departamento_filtro, ano_relatorio_global, mes_relatorio_global)
 
     st.markdown("---")
 
     st.subheader(f"Análise de Horas por Tipo de Ocorrência (Mês: {mes_relatorio_global:02d}/{ano_relatorio_global})")
     
-    if st.button("Gerar Análise por Ocorrência", key="gerar_analise_ocorrencia_button"):
-        if not funcionarios_filtrados_df.empty and not registos_diarios_df.empty and not tipos_ocorrencia_df.empty:
-            start_of_month = date(ano_relatorio_global, mes_relatorio_global, 1)
-            end_of_month = date(ano_relatorio_global, mes_relatorio_global, calendar.monthrange(ano_relatorio_global, mes_relatorio_global)[1])
-
-            registos_periodo = registos_diarios_df[
-                (pd.to_datetime(registos_diarios_df['DataRegisto']).dt.date >= start_of_month) &
-                (pd.to_datetime(registos_diarios_df['DataRegisto']).dt.date <= end_of_month) &
-                (registos_diarios_df['FuncionarioID'].isin(funcionarios_filtrados_df['FuncionarioID']))
-            ]
-
-            if not registos_periodo.empty:
-                registos_com_tipo = pd.merge(registos_periodo, tipos_ocorrencia_df[['TipoOcorrenciaID', 'Descricao', 'EhHorasExtra', 'EhAusencia']],
-                                             on='TipoOcorrenciaID', how='left')
+    @st.fragment
+    @instrumentacao.fragmento
+    def analise_por_ocorrencia(funcionarios_filtrados_df, departamento_filtro, ano_relatorio_global, mes_relatorio_global):
+        if st.button("Gerar Análise por Ocorrência", key="gerar_analise_ocorrencia_button"):
+            tipos_ocorrencia_df = carregar_tipos_ocorrencia()
+            if not funcionarios_filtrados_df.empty and not tipos_ocorrencia_df.empty:
+                # Totais já resumidos por funcionário e tipo de ocorrência (RegistosMensais)
+                registos_periodo = get_registos_mensais(ano_relatorio_global, mes_relatorio_global, departamento=departamento_filtro)
+
+                if not registos_periodo.empty:
+                    registos_com_tipo = pd.merge(registos_periodo, tipos_ocorrencia_df[['TipoOcorrenciaID', 'Descricao', 'EhHorasExtra', 'EhAusencia']],
+                                                 on='TipoOcorrenciaID', how='left')
                 
-                horas_por_tipo = registos_com_tipo.groupby('Descricao').agg(
-                    TotalHorasTrabalhadas=('HorasTrabalhadas', 'sum'),
-                    TotalHorasExtraDiarias=('HorasExtraDiarias', 'sum'),
-                    TotalHorasAusencia=('HorasAusencia', 'sum')
-                ).reset_index()
-
-                horas_por_tipo['Tipo'] = horas_por_tipo['Descricao']
-                horas_por_tipo['Horas Normais'] = horas_por_tipo['TotalHorasTrabalhadas'].apply(lambda x: f"{x:.2f}")
-                horas_por_tipo['Horas Extra'] = horas_por_tipo['TotalHorasExtraDiarias'].apply(lambda x: f"{x:.2f}")
-                horas_por_tipo['Horas Ausência'] = horas_por_tipo['TotalHorasAusencia'].apply(lambda x: f"{x:.2f}")
+                    horas_por_tipo = registos_com_tipo.groupby('Descricao').agg(
+                        TotalHorasTrabalhadas=('HorasTrabalhadas', 'sum'),
+                        TotalHorasExtraDiarias=('HorasExtraDiarias', 'sum'),
+                        TotalHorasAusencia=('HorasAusencia', 'sum')
+                    ).reset_index()
+
+                    horas_por_tipo['Tipo'] = horas_por_tipo['Descricao']
+                    horas_por_tipo['Horas Normais'] = horas_por_tipo['TotalHorasTrabalhadas'].apply(lambda x: f"{x:.2f}")
+                    horas_por_tipo['Horas Extra'] = horas_por_tipo['TotalHorasExtraDiarias'].apply(lambda x: f"{x:.2f}")
+                    horas_por_tipo['Horas Ausência'] = horas_por_tipo['TotalHorasAusencia'].apply(lambda x: f"{x:.2f}")
+
+                    horas_por_tipo = horas_por_tipo[['Tipo', 'Horas Normais', 'Horas Extra', 'Horas Ausência']]
+                    st.dataframe(horas_por_tipo, use_container_width=True)
+
+                    st.download_button(
+                        label="Exportar Análise por Ocorrência (CSV)",
+                        data=convert_df_to_csv(horas_por_tipo),
+                        file_name=f"analise_ocorrencias_{mes_relatorio_global:02d}_{ano_relatorio_global}.csv",
+                        mime="text/csv",
+                        key="export_ocorrencia_csv",
+                        on_click="ignore"
+                    )
+                    st.download_button(
+                        label="Exportar Análise por Ocorrência (Excel)",
+                        data=to_excel(horas_por_tipo),
+                        file_name=f"analise_ocorrencias_{mes_relatorio_global:02d}_{ano_relatorio_global}.xlsx",
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                        key="export_ocorrencia_excel",
+                        on_click="ignore"
+                    )
+                else:
+                    st.info("Nenhum registo diário encontrado para o período e filtros selecionados.")
+            else:
+                st.info("Nenhum funcionário ou registo de ocorrência encontrado para gerar esta análise.")
 
-                horas_por_tipo = horas_por_tipo[['Tipo', 'Horas Normais', 'Horas Extra', 'Horas Ausência']]
-                st.dataframe(horas_por_tipo, use_container_width=True)
+    analise_por_ocorrencia(funcionarios_filtrados_df, departamento_filtro, ano_relatorio_global, mes_relatorio_global)
 
-                st.download_button(
-                    label="Exportar Análise por Ocorrência (CSV)",
-                    data=convert_df_to_csv(horas_por_tipo),
-                    file_name=f"analise_ocorrencias_{mes_relatorio_global:02d}_{ano_relatorio_global}.csv",
-                    mime="text/csv",
-                    key="export_ocorrencia_csv"
-                )
-                st.download_button(
-                    label="Exportar Análise por Ocorrência (Excel)",
-                    data=to_excel(horas_por_tipo),
-                    file_name=f"analise_ocorrencias_{mes_relatorio_global:02d}_{ano_relatorio_global}.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                    key="export_ocorrencia_excel"
-                )
-            else:
-                st.info("Nenhum registo diário encontrado para o período e filtros selecionados.")
-        else:
-            st.info("Nenhum funcionário ou registo de ocorrência encontrado para gerar esta análise.")
\ No newline at end of file
+instrumentacao.terminar_execucao()
@@ -1,12 +1,10 @@
 import pandas as pd
-import pyodbc
 import os
 
+import base_dados
+
 # --- Configurações da Base de Dados ---
-# Ajusta estas variáveis de acordo com a tua configuração
-DB_SERVER = 'SusanaGonçalves\\SQLEXPRESS'
-DB_DATABASE = 'GestaoHoras'
-DB_DRIVER = '{ODBC Driver 17 for SQL Server}' # Verifica se é a versão correta instalada
+# O servidor e a base de dados vêm de base_dados (variáveis de ambiente GESTAO_HORAS_DB_*)
 
 # --- Caminho para o teu ficheiro CSV ---
 # Certifica-te que este caminho está CORRETO e que o ficheiro existe
@@ -20,17 +18,11 @@ print(f"Caminho do CSV: {csv_file_path}") # Para debugging
 def get_db_connection_script():
     """Tenta estabelecer uma conexão com a base de dados."""
     try:
-        conn = pyodbc.connect(
-            f'DRIVER={DB_DRIVER};'
-            f'SERVER={DB_SERVER};'
-            f'DATABASE={DB_DATABASE};'
-            f'Trusted_Connection=yes;'
-        )
-        print("Conexão à base de dados estabelecida com sucesso!")
+        conn = base_dados.conectar()
+        print(f"Conexão à base de dados {base_dados.descricao()} estabelecida com sucesso!")
         return conn
-    except pyodbc.Error as ex:
-        sqlstate = ex.args[0]
-        print(f"ERRO DE CONEXÃO À BASE DE DADOS (SQLSTATE: {sqlstate}): {ex}")
+    except base_dados.ERROS_BASE_DADOS as ex:
+        print(f"ERRO DE CONEXÃO À BASE DE DADOS: {ex}")
         return None
 
 def update_nif_niss_from_csv(csv_path):
@@ -111,9 +103,8 @@ def update_nif_niss_from_csv(csv_path):
         print(f"Erro: O ficheiro CSV '{csv_path}' está vazio.")
     except pd.errors.ParserError as pe:
         print(f"Erro ao analisar o CSV: {pe}. Verifique o delimitador de colunas e o formato.")
-    except pyodbc.Error as ex:
-        sqlstate = ex.args[0]
-        print(f"Erro de Base de Dados (SQLSTATE: {sqlstate}): {ex}")
+    except base_dados.ERROS_BASE_DADOS as ex:
+        print(f"Erro de Base de Dados: {ex}")
         cnxn.rollback() # Reverte em caso de erro na base de dados
     except Exception as e:
         print(f"Ocorreu um erro inesperado: {e}")
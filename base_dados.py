@@ -0,0 +1,293 @@
+"""
+Backends da base de dados GestaoHoras.
+
+  - sqlserver (por omissão): SQL Server / Azure SQL através do pyodbc;
+  - sqlite: um ficheiro local, para correr a aplicação, o importador e os relatórios (e medir o
+    seu desempenho) em qualquer máquina, sem SQL Server.
+
+O backend escolhe-se com variáveis de ambiente:
+    GESTAO_HORAS_DB_BACKEND   sqlserver | sqlite
+    GESTAO_HORAS_DB_SERVER, GESTAO_HORAS_DB_DATABASE, GESTAO_HORAS_DB_DRIVER,
+    GESTAO_HORAS_DB_USER, GESTAO_HORAS_DB_PASSWORD   (SQL Server; sem utilizador usa a
+                                                      Autenticação do Windows)
+    GESTAO_HORAS_DB_SQLITE    caminho do ficheiro SQLite (por omissão gestao_horas.db)
+
+As consultas da aplicação estão escritas em T-SQL. A conexão SQLite aceita diretamente o
+subconjunto usado nas leituras (prefixo dbo., TOP, OFFSET ... FETCH NEXT, DATEFROMPARTS,
+DATEADD, YEAR, MONTH e DAY); as escritas com MERGE/OUTPUT têm uma variante para SQLite nos
+respetivos módulos, escolhida com dialeto(conexao_ou_cursor).
+"""
+import os
+import re
+import sqlite3
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyodbc
+except ImportError:  # Só é preciso para o backend SQL Server
+    pyodbc = None
+
+BACKEND = os.environ.get("GESTAO_HORAS_DB_BACKEND", "sqlserver").lower()
+
+DB_DRIVER = os.environ.get("GESTAO_HORAS_DB_DRIVER", "{ODBC Driver 18 for SQL Server}")
+DB_SERVER = os.environ.get("GESTAO_HORAS_DB_SERVER", "SusanaGonçalves\\SQLEXPRESS")
+DB_DATABASE = os.environ.get("GESTAO_HORAS_DB_DATABASE", "GestaoHoras")
+DB_USER = os.environ.get("GESTAO_HORAS_DB_USER")
+DB_PASSWORD = os.environ.get("GESTAO_HORAS_DB_PASSWORD")
+
+DB_SQLITE = os.environ.get("GESTAO_HORAS_DB_SQLITE", "gestao_horas.db")
+
+# Erros de base de dados de qualquer um dos backends
+ERROS_BASE_DADOS = (sqlite3.Error,) + ((pyodbc.Error,) if pyodbc is not None else ())
+
+
+def dialeto(objeto):
+    """'sqlite' para conexões e cursores do backend SQLite; 'sqlserver' para os do pyodbc."""
+    return getattr(objeto, 'dialeto', 'sqlserver')
+
+
+def conectar():
+    """Abre uma conexão nova ao backend configurado."""
+    if BACKEND == 'sqlite':
+        return ConexaoSQLite(DB_SQLITE)
+    if BACKEND != 'sqlserver':
+        raise ValueError(f"Backend de base de dados desconhecido: {BACKEND!r} (use 'sqlserver' ou 'sqlite').")
+    if pyodbc is None:
+        raise ImportError("O backend SQL Server precisa do pyodbc (pip install pyodbc).")
+    autenticacao = f"UID={DB_USER};PWD={DB_PASSWORD};" if DB_USER else "Trusted_Connection=yes;"
+    return pyodbc.connect(
+        f'DRIVER={DB_DRIVER};'
+        f'SERVER={DB_SERVER};'
+        f'DATABASE={DB_DATABASE};'
+        f'{autenticacao}'
+        f'Encrypt=yes;TrustServerCertificate=yes;Connection Timeout=30;'
+    )
+
+
+def descricao():
+    """Texto curto com o backend e a base de dados configurados, para mensagens."""
+    if BACKEND == 'sqlite':
+        return f"SQLite ({os.path.abspath(DB_SQLITE)})"
+    return f"SQL Server ({DB_SERVER}, base de dados {DB_DATABASE})"
+
+
+# --- SQLite -----------------------------------------------------------------------------------
+
+def _data_sql(valor):
+    # Datas como texto ISO, para se compararem corretamente entre si; meia-noite conta como data
+    if isinstance(valor, datetime):
+        if valor.hour == valor.minute == valor.second == valor.microsecond == 0:
+            return valor.date().isoformat()
+        return valor.isoformat(' ')
+    return valor.isoformat()
+
+
+for _tipo in (date, datetime, pd.Timestamp):
+    sqlite3.register_adapter(_tipo, _data_sql)
+sqlite3.register_adapter(Decimal, float)
+sqlite3.register_adapter(np.int64, int)
+sqlite3.register_adapter(np.int32, int)
+sqlite3.register_adapter(np.bool_, bool)
+sqlite3.register_converter("DATE", lambda valor: date.fromisoformat(valor.decode()))
+
+
+def _como_data(valor):
+    if valor is None:
+        return None
+    return date.fromisoformat(str(valor)[:10])
+
+
+def _datefromparts(ano, mes, dia):
+    if None in (ano, mes, dia):
+        return None
+    return date(int(ano), int(mes), int(dia)).isoformat()
+
+
+def _dateadd(parte, quantidade, valor):
+    data = _como_data(valor)
+    if data is None or quantidade is None:
+        return None
+    parte = parte.upper()
+    if parte in ('DAY', 'DD', 'D'):
+        return (data + timedelta(days=int(quantidade))).isoformat()
+    meses = int(quantidade) * (12 if parte in ('YEAR', 'YY', 'YYYY') else 1)
+    return (pd.Timestamp(data) + pd.DateOffset(months=meses)).date().isoformat()
+
+
+def _parte_data(atributo):
+    def parte(valor):
+        data = _como_data(valor)
+        return getattr(data, atributo) if data is not None else None
+    return parte
+
+
+_RE_TOP = re.compile(r"\bTOP\s*(?:\(\s*(\?|\d+)\s*\)|(\d+))\s*", re.IGNORECASE)
+_RE_OFFSET_FETCH = re.compile(r"\bOFFSET\s+(\?|\d+)\s+ROWS?\s+FETCH\s+(?:NEXT|FIRST)\s+(\?|\d+)\s+ROWS?\s+ONLY\b",
+                              re.IGNORECASE)
+_RE_DATEADD = re.compile(r"\bDATEADD\s*\(\s*([A-Za-z]+)\s*,", re.IGNORECASE)
+_RE_LEITURA = re.compile(r"\s*(?:SELECT|EXPLAIN|PRAGMA)\b", re.IGNORECASE)
+_RE_ESCRITA_CTE = re.compile(r"\b(?:INSERT|UPDATE|DELETE|REPLACE)\b", re.IGNORECASE)
+
+
+def _e_leitura(query):
+    if _RE_LEITURA.match(query):
+        return True
+    return query.lstrip()[:4].upper() == 'WITH' and not _RE_ESCRITA_CTE.search(query)
+
+
+def traduzir_tsql(query, params=()):
+    """
+    Traduz o subconjunto de T-SQL usado nas leituras da aplicação para SQLite. Devolve
+    (query, params), com os parâmetros reordenados quando a tradução muda a sua posição.
+    """
+    params = list(params)
+    query = _RE_DATEADD.sub(lambda m: f"DATEADD('{m.group(1)}',", query)
+
+    m = _RE_TOP.search(query)
+    if m:
+        # TOP (?) passa a LIMIT ? no fim da instrução (as consultas com TOP terminam no ORDER BY)
+        limite = m.group(1) or m.group(2)
+        if limite == '?':
+            posicao = query.count('?', 0, m.start())
+            params.append(params.pop(posicao))
+        query = query[:m.start()] + query[m.end():]
+        query = query.rstrip().rstrip(';') + f" LIMIT {limite}"
+
+    m = _RE_OFFSET_FETCH.search(query)
+    if m:
+        deslocamento, quantidade = m.group(1), m.group(2)
+        if deslocamento == '?' and quantidade == '?':
+            posicao = query.count('?', 0, m.start())
+            params[posicao], params[posicao + 1] = params[posicao + 1], params[posicao]
+        query = query[:m.start()] + f"LIMIT {quantidade} OFFSET {deslocamento}" + query[m.end():]
+    return query, params
+
+
+class _Linha(tuple):
+    """Linha de resultado com acesso por posição e por nome de coluna (row.NomeCompleto), como no pyodbc."""
+
+    __slots__ = ()
+    _colunas = {}
+
+    def __getattr__(self, nome):
+        try:
+            return self[self._colunas[nome]]
+        except KeyError:
+            raise AttributeError(nome) from None
+
+
+def _fabrica_linhas(cursor, linha):
+    descricao = cursor.description
+    classe = _CLASSES_LINHA.get(descricao)
+    if classe is None:
+        classe = type('Linha', (_Linha,), {'__slots__': (), '_colunas': {c[0]: i for i, c in enumerate(descricao)}})
+        _CLASSES_LINHA[descricao] = classe
+    return classe(linha)
+
+
+_CLASSES_LINHA = {}
+
+
+class CursorSQLite:
+    """Cursor SQLite com a interface usada do pyodbc (execute com tradução de T-SQL, fetch*, nextset, fast_executemany)."""
+
+    dialeto = 'sqlite'
+
+    def __init__(self, conexao, cursor):
+        self.connection = conexao
+        self._cursor = cursor
+        self.fast_executemany = False
+
+    @staticmethod
+    def _parametros(params):
+        if len(params) == 1 and isinstance(params[0], (list, tuple)):
+            return params[0]
+        return params
+
+    def execute(self, query, *params):
+        query, params = traduzir_tsql(query, self._parametros(params))
+        self.connection._iniciar_transacao(query)
+        self._cursor.execute(query, params)
+        return self
+
+    def executemany(self, query, sequencia):
+        query, _ = traduzir_tsql(query)
+        self.connection._iniciar_transacao(query)
+        self._cursor.executemany(query, sequencia)
+        return self
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, tamanho=None):
+        return self._cursor.fetchmany(tamanho or self._cursor.arraysize)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def nextset(self):
+        return False
+
+    def close(self):
+        self._cursor.close()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+
+class ConexaoSQLite:
+    """
+    Conexão a um ficheiro SQLite com a interface usada do pyodbc.
+
+    O ficheiro é anexado com o nome de esquema dbo, pelo que tanto dbo.Funcionarios como
+    Funcionarios se referem à mesma tabela. As transações seguem o modelo do pyodbc: a primeira
+    instrução que não é uma leitura abre uma transação (também para DDL e WITH ... DELETE, que o
+    módulo sqlite3 deixaria em autocommit) e as escritas só ficam gravadas com commit(). As
+    leituras não abrem transação, para uma conexão do pool não ficar presa a um snapshot antigo.
+    """
+
+    dialeto = 'sqlite'
+
+    def __init__(self, caminho):
+        self._conn = sqlite3.connect(':memory:', timeout=30, check_same_thread=False,
+                                     detect_types=sqlite3.PARSE_DECLTYPES, isolation_level=None)
+        self._conn.execute("ATTACH DATABASE ? AS dbo", (caminho,))
+        self._conn.execute("PRAGMA dbo.journal_mode = WAL")
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.row_factory = _fabrica_linhas
+        self._conn.create_function("DATEFROMPARTS", 3, _datefromparts, deterministic=True)
+        self._conn.create_function("DATEADD", 3, _dateadd, deterministic=True)
+        for nome, atributo in (("YEAR", 'year'), ("MONTH", 'month'), ("DAY", 'day')):
+            self._conn.create_function(nome, 1, _parte_data(atributo), deterministic=True)
+        self.caminho = caminho
+
+    def _iniciar_transacao(self, query):
+        if not self._conn.in_transaction and not _e_leitura(query):
+            self._conn.execute("BEGIN")
+
+    def cursor(self):
+        return CursorSQLite(self, self._conn.cursor())
+
+    def execute(self, query, *params):
+        return self.cursor().execute(query, *params)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,396 @@
+"""
+Gerador de dados sintéticos para os benchmarks.
+
+Cria, numa escala configurável, os dados de que a aplicação vive:
+  - Funcionarios com a ficha salarial completa (os recibos podem ser calculados);
+  - TiposOcorrencia com os códigos da escala (D, N, DT, NT, FOTS, F, L, B);
+  - RegistosDiarios com escalas em rotação dia/noite/folga/folga, turnos extra e FOTS nas
+    folgas, e os dias de férias (F), licença (L) e baixa (B) marcados na própria escala;
+  - Ferias, Licencas e Faltas coerentes com a escala (uma falta apaga o turno desse dia);
+  - RegistosMensais e AcertosSemestrais, calculados a partir dos registos tal como na
+    aplicação (reconstruir_registos_mensais e o fecho de cada semestre).
+
+As horas de cada registo seguem as regras do importador (processar_excel.parse_escala), pelo
+que uma folha gerada com escrever_escala e importada de novo dá os mesmos registos.
+escrever_escala grava as folhas mensais no formato de 01Jan_12Dez_Escala_Geral (mês na linha
+10, dias da semana na 11, cabeçalho TURNO/NOME/FUNÇÃO/dias na 12 e um funcionário por linha
+a partir da 13).
+
+Uso:
+    python benchmarks/dados_sinteticos.py --funcionarios 1000 --anos 5 --base-dados sintetico.db
+    python benchmarks/dados_sinteticos.py --funcionarios 1000 --escala escala_2025.xlsx --ano 2025
+"""
+import argparse
+import calendar
+import os
+import sys
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from acertos_semestrais import aplicar_acertos
+from processar_excel import CODIGOS_SEM_HORAS, CODIGOS_TURNO_12H
+from registos_mensais import reconstruir_registos_mensais
+
+ANO = 2025
+
+# (Codigo, Descricao, HorasPadrao, EhTurno, EhHorasExtra, EhAusencia, EhFOTS, EhFolgaCompensatoria, Sigla)
+TIPOS_OCORRENCIA = [
+    ('D', 'Turno de Dia', 12.0, True, False, False, False, False, 'D'),
+    ('N', 'Turno de Noite', 12.0, True, False, False, False, False, 'N'),
+    ('DT', 'Turno de Dia (Trabalho Suplementar)', 12.0, True, True, False, False, False, 'DT'),
+    ('NT', 'Turno de Noite (Trabalho Suplementar)', 12.0, True, True, False, False, False, 'NT'),
+    ('FOTS', 'Folga por Trabalho Suplementar', 0.0, False, False, False, True, False, 'FOTS'),
+    ('F', 'Férias', 0.0, False, False, False, False, False, 'F'),
+    ('L', 'Licença', 0.0, False, False, False, False, False, 'L'),
+    ('B', 'Baixa Médica', 0.0, False, False, True, False, False, 'B'),
+]
+COLUNAS_TIPOS_OCORRENCIA = ['Codigo', 'Descricao', 'HorasPadrao', 'EhTurno', 'EhHorasExtra', 'EhAusencia',
+                            'EhFOTS', 'EhFolgaCompensatoria', 'Sigla']
+
+# Índices dos códigos na matriz funcionário × dia (0 = célula vazia)
+CODIGOS = [tipo[0] for tipo in TIPOS_OCORRENCIA]
+VAZIO, D, N, DT, NT, FOTS, F, L, B = range(len(CODIGOS) + 1)
+CODIGOS_TURNO = [D, N, DT, NT]
+# Rotação base de 4 dias: dia, noite, folga, folga
+ROTACAO = np.array([D, N, VAZIO, VAZIO], dtype=np.int8)
+
+PROB_TURNO_EXTRA = 0.06      # por dia de folga
+PROB_FOTS = 0.03             # por dia de folga
+PROB_LICENCA = 0.05          # funcionários com uma licença no ano
+PROB_BAIXA = 0.10            # funcionários com uma baixa no ano
+FALTAS_POR_ANO = 2.0         # média por funcionário
+
+PRIMEIROS_NOMES = [
+    'Ana', 'António', 'Beatriz', 'Bruno', 'Carla', 'Carlos', 'Catarina', 'Cláudia', 'Daniel', 'Diana',
+    'Diogo', 'Eduardo', 'Filipa', 'Francisco', 'Gonçalo', 'Helena', 'Hélder', 'Inês', 'Joana', 'João',
+    'Jorge', 'José', 'Leonor', 'Luís', 'Manuel', 'Margarida', 'Maria', 'Marta', 'Miguel', 'Nuno',
+    'Patrícia', 'Paulo', 'Pedro', 'Raquel', 'Ricardo', 'Rita', 'Rodrigo', 'Sofia', 'Tiago', 'Vítor',
+]
+APELIDOS = [
+    'Almeida', 'Alves', 'Antunes', 'Barbosa', 'Batista', 'Cardoso', 'Carvalho', 'Correia', 'Costa', 'Cunha',
+    'Dias', 'Fernandes', 'Ferreira', 'Fonseca', 'Gomes', 'Gonçalves', 'Henriques', 'Lopes', 'Marques', 'Martins',
+    'Mendes', 'Monteiro', 'Moreira', 'Nunes', 'Oliveira', 'Pereira', 'Pinto', 'Ramos', 'Reis', 'Ribeiro',
+    'Rocha', 'Rodrigues', 'Santos', 'Silva', 'Sousa', 'Teixeira', 'Tavares', 'Vieira', 'Fidalgo', 'Lourenço',
+]
+DEPARTAMENTOS = ['Urgência', 'Bloco', 'Internamento', 'Consulta']
+CATEGORIAS = ['CT', 'CE', 'OPS']
+
+MESES_ESCALA = ['JAN', 'FEV', 'MAR', 'ABR', 'MAI', 'JUN', 'JUL', 'AGO', 'SET', 'OUT', 'NOV', 'DEZ']
+NOMES_MESES = ['JANEIRO', 'FEVEREIRO', 'MARÇO', 'ABRIL', 'MAIO', 'JUNHO', 'JULHO', 'AGOSTO', 'SETEMBRO',
+               'OUTUBRO', 'NOVEMBRO', 'DEZEMBRO']
+DIAS_SEMANA = ['Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb', 'Dom']
+
+# Linhas por executemany ao carregar a base de dados
+LINHAS_POR_LOTE = 50_000
+
+
+def tipos_ocorrencia_df():
+    """TiposOcorrencia da escala sintética (sem TipoID)."""
+    return pd.DataFrame(TIPOS_OCORRENCIA, columns=COLUNAS_TIPOS_OCORRENCIA)
+
+
+def _nomes_unicos(num, rng):
+    """Nomes completos distintos (primeiro nome e dois apelidos), sem distinção de maiúsculas."""
+    combinacoes = len(PRIMEIROS_NOMES) * len(APELIDOS) * len(APELIDOS)
+    escolhidas = rng.choice(combinacoes, size=min(num, combinacoes), replace=False)
+    primeiro, resto = np.divmod(escolhidas, len(APELIDOS) * len(APELIDOS))
+    apelido1, apelido2 = np.divmod(resto, len(APELIDOS))
+    nomes = [f"{PRIMEIROS_NOMES[p]} {APELIDOS[a]} {APELIDOS[b]}" for p, a, b in zip(primeiro, apelido1, apelido2)]
+    # Acima do número de combinações repetem-se os nomes com um sufixo numérico
+    nomes += [f"{nomes[i % len(nomes)]} {i // len(nomes) + 1}" for i in range(len(nomes), num)]
+    return nomes
+
+
+def gerar_funcionarios(num_funcionarios, rng):
+    """Funcionarios (sem FuncionarioID) com a ficha salarial completa."""
+    indices = np.arange(1, num_funcionarios + 1)
+    return pd.DataFrame({
+        'NomeCompleto': _nomes_unicos(num_funcionarios, rng),
+        'NumeroFuncionario': [f"F{i:03d}" for i in indices],
+        'DataNascimento': (np.datetime64('1965-01-01') + rng.integers(0, 365 * 38, num_funcionarios).astype('timedelta64[D]')
+                           ).astype('datetime64[D]').astype(str),
+        'NIF': [str(200000000 + i) for i in indices],
+        'NISS': [str(11000000000 + i) for i in indices],
+        'Telefone': [f"9{rng.integers(10000000, 99999999)}" for _ in indices],
+        'Email': [f"funcionario{i}@exemplo.pt" for i in indices],
+        'CategoriaProfissional': rng.choice(CATEGORIAS, num_funcionarios, p=[0.2, 0.5, 0.3]),
+        'Departamento': rng.choice(DEPARTAMENTOS, num_funcionarios),
+        'SalarioBaseMensal': np.round(rng.uniform(900, 2500, num_funcionarios), 2),
+        'ValorSubsidioAlimentacaoDiario': 6.0,
+        'TaxaIRS': np.round(rng.uniform(0.08, 0.25, num_funcionarios), 4),
+        'TaxaSegurancaSocialFuncionario': 0.11,
+        'HorasTrabalhoMensalPadrao': 160.0,
+        'TaxaHoraExtra50': 0.5,
+        'TaxaHoraExtra100': 1.0,
+        'DiasFeriasAnuais': rng.choice([22, 25], num_funcionarios, p=[0.8, 0.2]),
+    })
+
+
+def _intervalos(rng, num, inicio_min, inicio_max, duracao_min, duracao_max, num_dias):
+    """Inícios e fins (inclusive, em dias desde 1 de janeiro, recortados ao ano) de `num` intervalos."""
+    inicio = rng.integers(inicio_min, inicio_max, num)
+    fim = np.minimum(inicio + rng.integers(duracao_min, duracao_max + 1, num) - 1, num_dias - 1)
+    return inicio, fim
+
+
+def _marcar(codigos, linhas, inicio, fim, codigo):
+    """Marca `codigo` nos dias [inicio, fim] de cada linha da matriz, sem percorrer dia a dia."""
+    duracoes = fim - inicio + 1
+    linhas_exp = np.repeat(linhas, duracoes)
+    dias_exp = np.repeat(inicio, duracoes) + np.arange(duracoes.sum()) - np.repeat(np.cumsum(duracoes) - duracoes, duracoes)
+    codigos[linhas_exp, dias_exp] = codigo
+
+
+def gerar_escala_ano(num_funcionarios, dias_ferias, ano, rng):
+    """
+    Matriz funcionário × dia (códigos, ver CODIGOS) de um ano e os intervalos de férias e de
+    licença que nela estão marcados. A rotação de cada funcionário (desfasada pela sua posição,
+    como equipas) continua de um ano para o seguinte. Devolve (codigos, ferias, licencas), com os
+    intervalos como (linhas, inicio, fim).
+    """
+    num_dias = 366 if calendar.isleap(ano) else 365
+    primeiro_dia = (date(ano, 1, 1) - date(2000, 1, 1)).days
+    fases = np.arange(num_funcionarios) % len(ROTACAO)
+    codigos = ROTACAO[(fases[:, None] + primeiro_dia + np.arange(num_dias)[None, :]) % len(ROTACAO)]
+
+    folgas = codigos == VAZIO
+    sorteio = rng.random(codigos.shape)
+    codigos[folgas & (sorteio < PROB_TURNO_EXTRA / 2)] = DT
+    codigos[folgas & (sorteio >= PROB_TURNO_EXTRA / 2) & (sorteio < PROB_TURNO_EXTRA)] = NT
+    codigos[folgas & (sorteio >= PROB_TURNO_EXTRA) & (sorteio < PROB_TURNO_EXTRA + PROB_FOTS)] = FOTS
+
+    # Baixas e licenças numa parte dos funcionários; férias para todos, em dois períodos
+    com_baixa = np.flatnonzero(rng.random(num_funcionarios) < PROB_BAIXA)
+    _marcar(codigos, com_baixa, *_intervalos(rng, len(com_baixa), 0, num_dias, 2, 20, num_dias), B)
+
+    com_licenca = np.flatnonzero(rng.random(num_funcionarios) < PROB_LICENCA)
+    inicio_licenca, fim_licenca = _intervalos(rng, len(com_licenca), 0, num_dias, 5, 90, num_dias)
+    _marcar(codigos, com_licenca, inicio_licenca, fim_licenca, L)
+
+    todos = np.arange(num_funcionarios)
+    primeiro_periodo = rng.integers(5, 13, num_funcionarios)
+    inicio_1 = rng.integers(0, 150, num_funcionarios)
+    inicio_2 = rng.integers(180, 330, num_funcionarios)
+    fim_1 = inicio_1 + primeiro_periodo - 1
+    fim_2 = np.minimum(inicio_2 + (dias_ferias - primeiro_periodo) - 1, num_dias - 1)
+    linhas_ferias = np.concatenate([todos, todos])
+    inicio_ferias = np.concatenate([inicio_1, inicio_2])
+    fim_ferias = np.concatenate([fim_1, fim_2])
+    _marcar(codigos, linhas_ferias, inicio_ferias, fim_ferias, F)
+
+    return codigos, (linhas_ferias, inicio_ferias, fim_ferias), (com_licenca, inicio_licenca, fim_licenca)
+
+
+def gerar_ano(funcionarios_df, tipos_df, ano, rng):
+    """
+    Dados de um ano para os funcionários indicados (com FuncionarioID) e os tipos (com TipoID).
+    Devolve um dict com os DataFrames RegistosDiarios, Faltas, Ferias e Licencas, com as colunas
+    das tabelas (sem as chaves IDENTITY) e as datas em texto ISO.
+    """
+    num_funcionarios = len(funcionarios_df)
+    ids = funcionarios_df['FuncionarioID'].to_numpy()
+    codigos, ferias, licencas = gerar_escala_ano(num_funcionarios, funcionarios_df['DiasFeriasAnuais'].to_numpy(), ano, rng)
+    datas = np.datetime64(f'{ano}-01-01') + np.arange(codigos.shape[1]).astype('timedelta64[D]')
+    datas_iso = datas.astype(str)
+
+    # Faltas em dias de turno: a falta fica na tabela Faltas e o turno desaparece da escala
+    num_faltas = rng.poisson(FALTAS_POR_ANO, num_funcionarios)
+    linhas_falta = np.repeat(np.arange(num_funcionarios), num_faltas)
+    dias_falta = rng.integers(0, codigos.shape[1], len(linhas_falta))
+    em_turno = np.isin(codigos[linhas_falta, dias_falta], CODIGOS_TURNO)
+    linhas_falta, dias_falta = linhas_falta[em_turno], dias_falta[em_turno]
+    faltas_df = pd.DataFrame({
+        'FuncionarioID': ids[linhas_falta],
+        'DataFalta': datas_iso[dias_falta],
+        'Motivo': rng.choice(['Doença', 'Assuntos pessoais', 'Consulta médica', None], len(linhas_falta)),
+        'Justificada': rng.random(len(linhas_falta)) < 0.6,
+        'HorasAusenciaFalta': 12.0,
+        'Aprovado': True,
+    }).drop_duplicates(subset=['FuncionarioID', 'DataFalta'])
+    codigos[linhas_falta, dias_falta] = VAZIO
+
+    linhas, dias = np.nonzero(codigos)
+    tipos = tipos_df.set_index('Codigo')
+    codigo_tipo = np.array([''] + CODIGOS, dtype=object)[codigos[linhas, dias]]
+    horas = tipos['HorasPadrao'].reindex(codigo_tipo).to_numpy(dtype=float)
+    horas[np.isin(codigo_tipo, CODIGOS_TURNO_12H)] = 12.0
+    horas[np.isin(codigo_tipo, CODIGOS_SEM_HORAS)] = 0.0
+    registos_df = pd.DataFrame({
+        'FuncionarioID': ids[linhas],
+        'DataRegisto': datas_iso[dias],
+        'TipoOcorrenciaID': tipos['TipoID'].reindex(codigo_tipo).to_numpy(),
+        'HorasTrabalhadas': horas,
+        'HorasExtraDiarias': 0.0,
+        'HorasAusencia': 0.0,
+        'Observacoes': '',
+    })
+
+    def intervalos_df(linhas_intervalo, inicio, fim, **colunas):
+        return pd.DataFrame({
+            'FuncionarioID': ids[linhas_intervalo],
+            'DataInicio': datas_iso[inicio],
+            'DataFim': datas_iso[fim],
+            **colunas,
+            'Aprovado': rng.random(len(linhas_intervalo)) < 0.9,
+        })
+
+    ferias_df = intervalos_df(*ferias, Observacoes=None)
+    licencas_df = intervalos_df(*licencas, Motivo=rng.choice(['Parentalidade', 'Formação', 'Sem vencimento'], len(licencas[0])),
+                                Observacoes=None)
+    return {'RegistosDiarios': registos_df, 'Faltas': faltas_df, 'Ferias': ferias_df, 'Licencas': licencas_df}
+
+
+def _inserir(cnxn, tabela, df):
+    """Insere um DataFrame numa tabela, em lotes de executemany com tipos Python nativos."""
+    if df.empty:
+        return
+    colunas = list(df.columns)
+    # tolist() entrega int/float/bool/str nativos (o pyodbc não aceita tipos numpy)
+    valores = [df[coluna].astype(object).where(df[coluna].notna(), None).tolist() for coluna in colunas]
+    linhas = list(zip(*valores))
+    cursor = cnxn.cursor()
+    cursor.fast_executemany = True
+    instrucao = (f"INSERT INTO dbo.{tabela} ({', '.join(colunas)}) "
+                 f"VALUES ({', '.join(['?'] * len(colunas))})")
+    for inicio in range(0, len(linhas), LINHAS_POR_LOTE):
+        cursor.executemany(instrucao, linhas[inicio:inicio + LINHAS_POR_LOTE])
+
+
+def _com_ids(cnxn, tabela, chave, coluna_nome, df):
+    """Acrescenta a df a chave IDENTITY atribuída pela base de dados, pela coluna de nome (única)."""
+    cursor = cnxn.cursor()
+    cursor.execute(f"SELECT {chave}, {coluna_nome} FROM dbo.{tabela}")
+    ids = pd.DataFrame.from_records([tuple(linha) for linha in cursor.fetchall()], columns=[chave, coluna_nome])
+    return df.merge(ids, on=coluna_nome, how='left')
+
+
+def carregar_base_dados(cnxn, num_funcionarios, anos, ano_final=ANO, seed=0, progresso=print):
+    """
+    Gera e grava numa base de dados vazia (com o esquema de esquema.py) `anos` anos de dados
+    de `num_funcionarios` funcionários, terminando em `ano_final`. Cada ano é gerado, gravado e
+    fechado (RegistosMensais e acertos dos dois semestres) com o seu próprio commit, pelo que a
+    memória usada não cresce com o número de anos.
+
+    Devolve (funcionarios_df, tipos_df), com FuncionarioID e TipoID, e o número de linhas
+    gravadas por tabela.
+    """
+    cursor = cnxn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM dbo.Funcionarios")
+    if cursor.fetchone()[0]:
+        raise ValueError("A base de dados já tem funcionários; os dados sintéticos só se geram numa base vazia.")
+
+    rng = np.random.default_rng(seed)
+    funcionarios_df = gerar_funcionarios(num_funcionarios, rng)
+    tipos_df = tipos_ocorrencia_df()
+    _inserir(cnxn, 'Funcionarios', funcionarios_df)
+    _inserir(cnxn, 'TiposOcorrencia', tipos_df)
+    cnxn.commit()
+    funcionarios_df = _com_ids(cnxn, 'Funcionarios', 'FuncionarioID', 'NomeCompleto', funcionarios_df)
+    tipos_df = _com_ids(cnxn, 'TiposOcorrencia', 'TipoID', 'Codigo', tipos_df)
+
+    linhas = {'Funcionarios': len(funcionarios_df), 'TiposOcorrencia': len(tipos_df)}
+    for ano in range(ano_final - anos + 1, ano_final + 1):
+        inicio = time.perf_counter()
+        for tabela, df in gerar_ano(funcionarios_df, tipos_df, ano, rng).items():
+            _inserir(cnxn, tabela, df)
+            linhas[tabela] = linhas.get(tabela, 0) + len(df)
+        linhas['RegistosMensais'] = linhas.get('RegistosMensais', 0) + reconstruir_registos_mensais(cursor, ano)
+        for semestre in (1, 2):
+            inseridos, _ = aplicar_acertos(cursor, ano, semestre)
+            linhas['AcertosSemestrais'] = linhas.get('AcertosSemestrais', 0) + inseridos
+        cnxn.commit()
+        if progresso:
+            progresso(f"  {ano}: {time.perf_counter() - inicio:.1f}s")
+    return funcionarios_df, tipos_df, linhas
+
+
+def escrever_escala(caminho, funcionarios_df, registos_df, tipos_df, ano, meses=None):
+    """
+    Grava as folhas mensais (JAN, FEV, ...) da escala de `ano` no formato de
+    01Jan_12Dez_Escala_Geral, a partir dos registos diários (com TipoOcorrenciaID) dos
+    funcionários indicados. `meses` limita as folhas escritas (por omissão, os 12 meses).
+    """
+    import xlsxwriter
+
+    ids = pd.Index(funcionarios_df['FuncionarioID'])
+    codigo_por_tipo = tipos_df.set_index('TipoID')['Codigo']
+    datas = pd.to_datetime(registos_df['DataRegisto'])
+    anos, meses_registo, dias = datas.dt.year.to_numpy(), datas.dt.month.to_numpy(), datas.dt.day.to_numpy()
+    linhas = ids.get_indexer(registos_df['FuncionarioID'])
+    codigos = codigo_por_tipo.reindex(registos_df['TipoOcorrenciaID']).to_numpy(dtype=object)
+    equipas = [f"{categoria}{i % 9 + 1}" for i, categoria in enumerate(funcionarios_df['CategoriaProfissional'])]
+
+    livro = xlsxwriter.Workbook(caminho, {'constant_memory': True})
+    try:
+        for mes in meses or range(1, 13):
+            num_dias = calendar.monthrange(ano, mes)[1]
+            do_mes = (anos == ano) & (meses_registo == mes) & (linhas >= 0)
+            grelha = np.full((len(ids), num_dias), None, dtype=object)
+            grelha[linhas[do_mes], dias[do_mes] - 1] = codigos[do_mes]
+
+            folha = livro.add_worksheet(MESES_ESCALA[mes - 1])
+            folha.set_column(1, 1, 20)
+            folha.set_column(3, 3 + num_dias - 1, 5.5)
+            folha.freeze_panes(12, 3)
+            # Linhas 10 a 12 do Excel (índices 9 a 11): mês, dias da semana e cabeçalho
+            folha.write_row(9, 0, ['MÊS', None, None, NOMES_MESES[mes - 1]])
+            folha.write_row(10, 3, [DIAS_SEMANA[date(ano, mes, dia).weekday()] for dia in range(1, num_dias + 1)])
+            folha.write_row(11, 0, ['TURNO', 'NOME', 'FUNÇÃO'] + list(range(1, num_dias + 1)))
+            for i, (equipa, nome, categoria) in enumerate(zip(equipas, funcionarios_df['NomeCompleto'],
+                                                                funcionarios_df['CategoriaProfissional'])):
+                folha.write_row(12 + i, 0, [equipa, nome, categoria])
+                for dia, codigo in enumerate(grelha[i]):
+                    if codigo is not None:
+                        folha.write_string(12 + i, 3 + dia, codigo)
+    finally:
+        livro.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos (base de dados SQLite e folhas da escala).")
+    parser.add_argument('--funcionarios', type=int, default=1000, help="Número de funcionários.")
+    parser.add_argument('--anos', type=int, default=1, help="Anos de histórico.")
+    parser.add_argument('--ano', type=int, default=ANO, help="Último ano do histórico (e ano da escala).")
+    parser.add_argument('--seed', type=int, default=0, help="Semente do gerador (os mesmos argumentos dão os mesmos dados).")
+    parser.add_argument('--base-dados', help="Ficheiro SQLite a criar (por omissão, só em memória para a escala).")
+    parser.add_argument('--escala', help="Ficheiro .xlsx onde gravar a escala do último ano.")
+    args = parser.parse_args()
+
+    if not args.base_dados and not args.escala:
+        parser.error("Indique --base-dados e/ou --escala.")
+    if args.base_dados and os.path.exists(args.base_dados):
+        parser.error(f"O ficheiro {args.base_dados} já existe.")
+
+    import esquema
+    from base_dados import ConexaoSQLite
+
+    cnxn = ConexaoSQLite(args.base_dados or ':memory:')
+    try:
+        esquema.criar_esquema(cnxn)
+        inicio = time.perf_counter()
+        print(f"A gerar {args.anos} ano(s) de dados para {args.funcionarios} funcionários...")
+        funcionarios_df, tipos_df, linhas = carregar_base_dados(cnxn, args.funcionarios, args.anos, args.ano, args.seed)
+        print(f"Base de dados gerada em {time.perf_counter() - inicio:.1f}s:")
+        for tabela, total in linhas.items():
+            print(f"  {tabela}: {total}")
+
+        if args.escala:
+            inicio = time.perf_counter()
+            cursor = cnxn.cursor()
+            cursor.execute("SELECT FuncionarioID, DataRegisto, TipoOcorrenciaID FROM dbo.RegistosDiarios "
+                           "WHERE DataRegisto BETWEEN ? AND ?", date(args.ano, 1, 1), date(args.ano, 12, 31))
+            registos_df = pd.DataFrame.from_records([tuple(linha) for linha in cursor.fetchall()],
+                                                    columns=['FuncionarioID', 'DataRegisto', 'TipoOcorrenciaID'])
+            escrever_escala(args.escala, funcionarios_df, registos_df, tipos_df, args.ano)
+            print(f"Escala de {args.ano} gravada em {args.escala} ({time.perf_counter() - inicio:.1f}s).")
+    finally:
+        cnxn.close()
+
+
+if __name__ == "__main__":
+    main()
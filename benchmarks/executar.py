@@ -0,0 +1,320 @@
+"""
+Benchmark dos caminhos críticos da aplicação sobre dados sintéticos (ver dados_sinteticos.py).
+
+Para cada escala (número de funcionários) cria uma base de dados SQLite com `--anos` anos de
+histórico e mede cada subsistema com as caches do Streamlit vazias, ou seja, o pedido que vai
+à base de dados:
+  - dashboard: fichas, métricas do mês, últimos registos e próximas férias e licenças;
+  - listagem_registos: primeira página e contagem dos registos diários;
+  - exportacao_registos: todos os registos diários da listagem em CSV, lidos por lotes;
+  - quadro_mensal: eventos do mês de todos os funcionários e build_quadro_mensal;
+  - saldos: acertos, férias, faltas e licenças do ano e compute_saldos;
+  - recibo: eventos do mês de um funcionário, cálculo e PDF;
+  - recibos_lote: eventos do mês de todos os funcionários e cálculo dos recibos (os PDFs em
+    lote medem-se com recibos_pdf.py);
+  - fecho_semestre: cálculo e gravação dos acertos do último semestre;
+  - importacao_excel: uma folha mensal da escala num mês ainda sem registos (só inserções);
+  - reimportacao_excel: a mesma folha outra vez (só atualizações).
+
+O resultado de cada medição é o tempo mínimo de `--repeticoes` execuções (a importação corre
+uma só vez). Os resultados são gravados em JSON com a versão do código (git describe); com
+--comparar, cada tempo é comparado com o de um ficheiro anterior e as regressões acima da
+tolerância são assinaladas (código de saída 1).
+
+Uso:
+    python benchmarks/executar.py
+    python benchmarks/executar.py --funcionarios 1000 5000 20000 --anos 5 --saida resultados.json
+    python benchmarks/executar.py --comparar resultados_anteriores.json
+"""
+import argparse
+import calendar
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+import numpy as np
+
+# O benchmark corre sempre sobre um ficheiro SQLite próprio (ver base_dados.py)
+os.environ['GESTAO_HORAS_DB_BACKEND'] = 'sqlite'
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import streamlit as st
+import streamlit.config
+import streamlit.logger
+
+# Fora de `streamlit run` as caches avisam que não há runtime; esses avisos não interessam aqui.
+# A configuração é lida primeiro, porque ao ser lida repõe o nível dos logs.
+streamlit.config.get_config_options()
+streamlit.logger.set_log_level('error')
+
+import acesso_dados as ad
+import base_dados
+import esquema
+import processar_excel
+from calculo_salarios import calcular_recibos_mes
+from dados_sinteticos import ANO, carregar_base_dados, escrever_escala, gerar_ano
+from quadro_mensal import build_quadro_mensal
+from recibos_lote import gerar_pdf_recibo
+from registos_mensais import meses_afetados, recalcular_meses
+from saldos import compute_saldos
+
+# Posições da folha da escala (as mesmas de processar_excel.main)
+LINHA_DATAS = 11
+COLUNA_NOMES = 1
+COLUNA_DADOS = 3
+LINHA_DADOS = 12
+
+SUBSISTEMAS = ['dashboard', 'listagem_registos', 'exportacao_registos', 'quadro_mensal', 'saldos', 'recibo', 'recibos_lote',
+               'fecho_semestre', 'importacao_excel', 'reimportacao_excel']
+
+
+def versao_codigo():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=RAIZ, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _reiniciar_pool():
+    # As conexões do pool apontam para o ficheiro da escala anterior
+    ad.get_db_pool().fechar()
+    ad.get_db_pool.clear()
+
+
+def preparar_base_dados(caminho, num_funcionarios, anos, ano, seed):
+    """Cria a base de dados sintética e devolve (funcionarios_df, tipos_df, linhas por tabela)."""
+    base_dados.DB_SQLITE = caminho
+    _reiniciar_pool()
+    cnxn = base_dados.conectar()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            esquema.criar_esquema(cnxn)
+        return carregar_base_dados(cnxn, num_funcionarios, anos, ano, seed, progresso=None)
+    finally:
+        cnxn.close()
+
+
+def importar_folha(caminho, ano, mes):
+    """
+    Importa a folha de um mês como processar_excel.main (leitura, provisionamento, MERGE e
+    RegistosMensais), sem o estado da importação incremental (ImportacaoEscalaBlocos). Devolve o
+    número de registos gravados.
+    """
+    cnxn = base_dados.conectar()
+    try:
+        cursor = cnxn.cursor()
+        cursor.execute("SELECT TipoID, Codigo, HorasPadrao FROM TiposOcorrencia")
+        tipos = {row.Codigo: {'TipoID': row.TipoID, 'HorasPadrao': row.HorasPadrao} for row in cursor.fetchall()}
+        df = processar_excel.ler_folha_escala(caminho, mes, LINHA_DATAS, COLUNA_NOMES, COLUNA_DADOS, LINHA_DADOS)
+        registos_df = processar_excel.parse_escala(df, tipos, ano, LINHA_DATAS, COLUNA_NOMES, COLUNA_DADOS,
+                                                   LINHA_DADOS, mes)
+        nomes = processar_excel.nomes_funcionarios_escala(df, LINHA_DADOS, COLUNA_NOMES)
+        func_info, _, _ = processar_excel.provisionar_funcionarios(cnxn, list(nomes))
+        registos_df['FuncionarioID'] = registos_df['NomeCompleto'].map({nome: info['FuncionarioID'] for nome, info in func_info.items()})
+        inseridos, atualizados = processar_excel.merge_registos_diarios(cnxn, registos_df)
+        recalcular_meses(cnxn.cursor(), meses_afetados(zip(registos_df['FuncionarioID'], registos_df['DataRegisto'])))
+        cnxn.commit()
+    finally:
+        cnxn.close()
+    return inseridos + atualizados
+
+
+def subsistemas(funcionarios_df, ano, mes):
+    """Funções sem argumentos de cada subsistema; cada uma devolve o número de linhas lidas ou calculadas."""
+    inicio_mes = date(ano, mes, 1)
+    fim_mes = date(ano, mes, calendar.monthrange(ano, mes)[1])
+    semestre = 2 if mes > 6 else 1
+    funcionario_id = int(funcionarios_df['FuncionarioID'].iloc[0])
+
+    def dashboard():
+        ad.get_mapas_funcionarios()
+        funcionarios = ad.get_funcionarios()
+        ad.get_tipos_ocorrencia()
+        ad.get_totais_registos_mensais(ano, mes)
+        ultimos = ad.get_ultimos_registos_diarios(10)
+        ad.get_proximas_ferias(inicio_mes, 5)
+        ad.get_proximas_licencas(inicio_mes, 5)
+        return len(funcionarios) + len(ultimos)
+
+    def listagem_registos():
+        pagina = ad.get_pagina_listagem('RegistosDiarios', tamanho_pagina=50)
+        ad.contar_listagem('RegistosDiarios')
+        return len(pagina)
+
+    def exportacao_registos():
+        # Como o botão de exportação da listagem: cada lote é escrito no CSV à medida que é lido
+        linhas = 0
+        with io.BytesIO() as saida:
+            for numero, lote in enumerate(ad.listagem_em_lotes('RegistosDiarios')):
+                lote.to_csv(saida, index=False, header=numero == 0, encoding='utf-8')
+                linhas += len(lote)
+        return linhas
+
+    def quadro_mensal():
+        funcionarios = ad.get_funcionarios()
+        tipos = ad.get_tipos_ocorrencia().rename(columns={'TipoID': 'TipoOcorrenciaID'})
+        eventos = ad.get_all_events_for_period(inicio_mes, fim_mes)
+        build_quadro_mensal(funcionarios, tipos, *eventos, ano, mes)
+        return sum(len(df) for df in eventos)
+
+    def saldos():
+        funcionarios = ad.get_funcionarios()
+        acertos = ad.get_acertos_semestrais(ano=ano)
+        ferias = ad.get_ferias(date(ano, 1, 1), date(ano, 12, 31))
+        faltas = ad.get_faltas(date(ano, 1, 1), date(ano, 12, 31))
+        licencas = ad.get_licencas(date(ano, 1, 1), date(ano, 12, 31))
+        compute_saldos(funcionarios, acertos, ferias, faltas, licencas, ano)
+        return len(acertos) + len(ferias) + len(faltas) + len(licencas)
+
+    def recibo():
+        funcionarios = ad.get_funcionarios()
+        funcionario_df = funcionarios[funcionarios['FuncionarioID'] == funcionario_id]
+        eventos = ad.get_eventos_mes(ano, mes, funcionario_id=funcionario_id)
+        calculado = calcular_recibos_mes(funcionario_df, *eventos, ano, mes).iloc[0]
+        gerar_pdf_recibo(calculado, ano, mes)
+        return sum(len(df) for df in eventos)
+
+    def recibos_lote():
+        funcionarios = ad.get_funcionarios()
+        eventos = ad.get_eventos_mes(ano, mes)
+        return len(calcular_recibos_mes(funcionarios, *eventos, ano, mes))
+
+    def fecho_semestre():
+        # Pré-visualização e gravação, como no separador Fecho de Semestre
+        calculados = ad.get_acertos_calculados(ano, semestre)
+        ad.fechar_semestre(ano, semestre)
+        return len(calculados)
+
+    return {
+        'dashboard': dashboard,
+        'listagem_registos': listagem_registos,
+        'exportacao_registos': exportacao_registos,
+        'quadro_mensal': quadro_mensal,
+        'saldos': saldos,
+        'recibo': recibo,
+        'recibos_lote': recibos_lote,
+        'fecho_semestre': fecho_semestre,
+    }
+
+
+def medir(funcao, repeticoes):
+    """Tempo mínimo de `repeticoes` execuções, cada uma com as caches vazias; devolve (segundos, linhas)."""
+    tempos = []
+    for _ in range(repeticoes):
+        st.cache_data.clear()
+        inicio = time.perf_counter()
+        linhas = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), linhas
+
+
+def executar_escala(pasta, num_funcionarios, args, selecionados):
+    resultados = []
+
+    def registar(subsistema, segundos, linhas):
+        resultados.append({'funcionarios': num_funcionarios, 'subsistema': subsistema,
+                           'segundos': round(segundos, 6), 'linhas': int(linhas)})
+        print(f"{num_funcionarios:>12} {subsistema:>20} {segundos:>10.3f} {int(linhas):>10}")
+
+    inicio = time.perf_counter()
+    caminho = os.path.join(pasta, f"gestao_horas_{num_funcionarios}.db")
+    funcionarios_df, tipos_df, linhas = preparar_base_dados(caminho, num_funcionarios, args.anos, args.ano, args.seed)
+    registar('geracao', time.perf_counter() - inicio, sum(linhas.values()))
+
+    for nome, funcao in subsistemas(funcionarios_df, args.ano, args.mes).items():
+        if nome in selecionados:
+            registar(nome, *medir(funcao, args.repeticoes))
+
+    if {'importacao_excel', 'reimportacao_excel'} & set(selecionados):
+        # Escala de janeiro do ano seguinte ao histórico: registos que ainda não estão na base de dados
+        ano_escala = args.ano + 1
+        novos = gerar_ano(funcionarios_df, tipos_df, ano_escala, np.random.default_rng(args.seed + 1))['RegistosDiarios']
+        caminho_escala = os.path.join(pasta, f"escala_{num_funcionarios}.xlsx")
+        escrever_escala(caminho_escala, funcionarios_df, novos, tipos_df, ano_escala, meses=[1])
+        inicio = time.perf_counter()
+        gravados = importar_folha(caminho_escala, ano_escala, 1)
+        if 'importacao_excel' in selecionados:
+            registar('importacao_excel', time.perf_counter() - inicio, gravados)
+        if 'reimportacao_excel' in selecionados:
+            registar('reimportacao_excel', *medir(lambda: importar_folha(caminho_escala, ano_escala, 1), args.repeticoes))
+
+    _reiniciar_pool()
+    return resultados
+
+
+def comparar(resultados, anteriores, tolerancia):
+    """Mostra a variação de cada tempo face a uma execução anterior; devolve o número de regressões."""
+    por_chave = {(r['funcionarios'], r['subsistema']): r for r in anteriores['resultados']}
+    print(f"\nComparação com {anteriores.get('versao') or 'execução anterior'} ({anteriores.get('gerado_em', '')}):")
+    print(f"{'Funcionários':>12} {'Subsistema':>20} {'Antes (s)':>10} {'Agora (s)':>10} {'Variação':>9}")
+    regressoes = 0
+    for resultado in resultados:
+        anterior = por_chave.get((resultado['funcionarios'], resultado['subsistema']))
+        if anterior is None or resultado['subsistema'] == 'geracao' or not anterior['segundos']:
+            continue
+        variacao = resultado['segundos'] / anterior['segundos'] - 1
+        regressao = variacao > tolerancia
+        regressoes += regressao
+        print(f"{resultado['funcionarios']:>12} {resultado['subsistema']:>20} {anterior['segundos']:>10.3f} "
+              f"{resultado['segundos']:>10.3f} {variacao:>+8.0%}{'  REGRESSÃO' if regressao else ''}")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos caminhos críticos da aplicação sobre dados sintéticos.")
+    parser.add_argument('--funcionarios', type=int, nargs='+', default=[200, 1000], help="Escalas a medir (número de funcionários).")
+    parser.add_argument('--anos', type=int, default=1, help="Anos de histórico gerados em cada escala.")
+    parser.add_argument('--ano', type=int, default=ANO, help="Último ano do histórico (ano dos relatórios).")
+    parser.add_argument('--mes', type=int, default=3, help="Mês dos relatórios mensais (quadro, recibos, dashboard).")
+    parser.add_argument('--repeticoes', type=int, default=3, help="Execuções por medição (conta a mais rápida).")
+    parser.add_argument('--seed', type=int, default=0, help="Semente do gerador de dados.")
+    parser.add_argument('--subsistemas', nargs='+', choices=SUBSISTEMAS, default=SUBSISTEMAS, help="Subsistemas a medir.")
+    parser.add_argument('--pasta', help="Pasta onde manter as bases de dados e as escalas geradas (por omissão, temporária).")
+    parser.add_argument('--saida', default='resultados_benchmark.json', help="Ficheiro JSON dos resultados.")
+    parser.add_argument('--comparar', help="Ficheiro JSON de uma execução anterior, para assinalar regressões.")
+    parser.add_argument('--tolerancia', type=float, default=0.2, help="Aumento relativo a partir do qual há regressão (0.2 = 20%%).")
+    args = parser.parse_args()
+
+    anteriores = None
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            anteriores = json.load(f)
+
+    resultados = []
+    print(f"{'Funcionários':>12} {'Subsistema':>20} {'Tempo (s)':>10} {'Linhas':>10}")
+    with contextlib.ExitStack() as pilha:
+        pasta = args.pasta or pilha.enter_context(tempfile.TemporaryDirectory())
+        os.makedirs(pasta, exist_ok=True)
+        for num_funcionarios in args.funcionarios:
+            resultados += executar_escala(pasta, num_funcionarios, args, args.subsistemas)
+
+    relatorio = {
+        'gerado_em': datetime.now().isoformat(timespec='seconds'),
+        'versao': versao_codigo(),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'backend': 'sqlite',
+        'motor_excel': 'calamine' if processar_excel.CalamineWorkbook is not None else 'openpyxl',
+        'parametros': {'anos': args.anos, 'ano': args.ano, 'mes': args.mes, 'repeticoes': args.repeticoes, 'seed': args.seed},
+        'resultados': resultados,
+    }
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    print(f"\nResultados gravados em {args.saida}.")
+
+    if anteriores is not None and comparar(resultados, anteriores, args.tolerancia):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+Benchmark da geração de recibos de vencimento em PDF (recibo_pdf.RenderizadorRecibos).
+
+Compara, em PDFs por segundo:
+  - sem cache: estilos e elementos fixos recriados em cada recibo (comportamento anterior);
+  - com cache: um renderizador partilhado, um recibo de cada vez (generate_payslip_pdf);
+  - render_many: o mesmo renderizador a gerar um PDF por recibo numa só chamada;
+  - documento único: render_many com todos os recibos num só PDF.
+
+Uso:
+    python benchmarks/recibos_pdf.py
+    python benchmarks/recibos_pdf.py --recibos 500
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recibo_pdf import RenderizadorRecibos, generate_payslip_pdf
+
+# Renderizador partilhado pelos modos com cache
+renderizador = RenderizadorRecibos()
+
+
+def gerar_argumentos(num_recibos):
+    argumentos = []
+    for i in range(1, num_recibos + 1):
+        funcionario_info = {
+            'NomeCompleto': f"Funcionário {i}",
+            'CategoriaProfissional': "Enfermeiro",
+            'NumeroFuncionario': str(i),
+            'NIF': f"{200000000 + i}",
+            'NISS': f"{10000000000 + i}",
+            'Departamento': ['Urgência', 'Bloco', None][i % 3],
+        }
+        horas_extra = float(i % 5)
+        horas_ausencia = float(i % 4)
+        valor_horas_extra = round(horas_extra * 11.25, 2)
+        vencimento_bruto = 1200.0 + valor_horas_extra
+        desconto_irs = round(vencimento_bruto * 0.125, 2)
+        desconto_ss = round(vencimento_bruto * 0.11, 2)
+        desconto_ausencia = round(horas_ausencia * 7.5, 2)
+        argumentos.append((
+            funcionario_info, 3, 2025,
+            160.0, horas_extra,
+            1200.0, valor_horas_extra,
+            132.0, vencimento_bruto,
+            desconto_irs, 0.125, desconto_ss, 0.11,
+            horas_ausencia, desconto_ausencia,
+            round(vencimento_bruto - desconto_irs - desconto_ss - desconto_ausencia + 132.0, 2),
+            i % 3, i % 2,
+        ))
+    return argumentos
+
+
+def sem_cache(argumentos):
+    for args in argumentos:
+        RenderizadorRecibos().render(*args)
+
+
+def com_cache(argumentos):
+    for args in argumentos:
+        generate_payslip_pdf(*args)
+
+
+def render_many(argumentos):
+    renderizador.render_many(argumentos)
+
+
+def documento_unico(argumentos):
+    renderizador.render_many(argumentos, um_documento=True)
+
+
+def medir(funcao, argumentos, repeticoes=3):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(argumentos)
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da geração de recibos em PDF.")
+    parser.add_argument('--recibos', type=int, default=200, help="Número de recibos por medição.")
+    args = parser.parse_args()
+
+    argumentos = gerar_argumentos(args.recibos)
+    print(f"{'Modo':>16} {'Tempo (s)':>10} {'PDFs/s':>10}")
+    for nome, funcao in [('sem cache', sem_cache), ('com cache', com_cache),
+                         ('render_many', render_many), ('documento único', documento_unico)]:
+        tempo = medir(funcao, argumentos)
+        print(f"{nome:>16} {tempo:>10.3f} {args.recibos / tempo:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark do cálculo dos Saldos de Horas e Dias (saldos.compute_saldos).
+
+Gera dados sintéticos com um número crescente de funcionários e de eventos
+(férias, faltas, licenças e acertos semestrais) e mede o tempo de cálculo.
+O tempo por evento deve manter-se aproximadamente constante (escala linear).
+
+Uso:
+    python benchmarks/saldos.py
+    python benchmarks/saldos.py --funcionarios 5000 --eventos 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from saldos import compute_saldos
+
+ANO = 2025
+
+
+def gerar_dados(num_funcionarios, num_eventos, seed=0):
+    rng = np.random.default_rng(seed)
+    ids = np.arange(1, num_funcionarios + 1, dtype=float)
+
+    funcionarios_df = pd.DataFrame({
+        'FuncionarioID': ids,
+        'NomeCompleto': [f"Funcionário {i}" for i in range(1, num_funcionarios + 1)],
+        'Departamento': rng.choice(['Urgência', 'Bloco', 'Internamento', 'Consulta'], num_funcionarios),
+        'DiasFeriasAnuais': rng.choice([22.0, 25.0], num_funcionarios),
+    })
+
+    # Distribuição dos eventos: 60% faltas, 20% férias, 15% licenças, 5% acertos
+    num_faltas = int(num_eventos * 0.60)
+    num_ferias = int(num_eventos * 0.20)
+    num_licencas = int(num_eventos * 0.15)
+    num_acertos = num_eventos - num_faltas - num_ferias - num_licencas
+
+    inicio_periodo = np.datetime64(f'{ANO - 1}-01-01')
+
+    def intervalos(n):
+        inicio = inicio_periodo + rng.integers(0, 730, n).astype('timedelta64[D]')
+        return pd.DataFrame({
+            'FuncionarioID': rng.choice(ids, n),
+            'DataInicio': inicio,
+            'DataFim': inicio + rng.integers(0, 15, n).astype('timedelta64[D]'),
+        })
+
+    faltas_df = pd.DataFrame({
+        'FuncionarioID': rng.choice(ids, num_faltas),
+        'DataFalta': inicio_periodo + rng.integers(0, 730, num_faltas).astype('timedelta64[D]'),
+    })
+    acertos_df = pd.DataFrame({
+        'FuncionarioID': rng.choice(ids, num_acertos),
+        'Ano': rng.choice([float(ANO - 1), float(ANO)], num_acertos),
+        'TotalHorasExtraAcumuladas': rng.random(num_acertos) * 40,
+    })
+
+    return funcionarios_df, acertos_df, intervalos(num_ferias), faltas_df, intervalos(num_licencas)
+
+
+def medir(num_funcionarios, num_eventos, repeticoes=3):
+    dados = gerar_dados(num_funcionarios, num_eventos)
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        compute_saldos(*dados, ANO)
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do cálculo de Saldos de Horas e Dias.")
+    parser.add_argument('--funcionarios', type=int, default=5000, help="Número máximo de funcionários.")
+    parser.add_argument('--eventos', type=int, default=1_000_000, help="Número máximo de eventos.")
+    parser.add_argument('--passos', type=int, default=4, help="Número de escalões entre o mínimo e o máximo.")
+    args = parser.parse_args()
+
+    print(f"{'Funcionários':>12} {'Eventos':>10} {'Tempo (s)':>10} {'µs/evento':>10}")
+    for passo in range(1, args.passos + 1):
+        num_funcionarios = args.funcionarios * passo // args.passos
+        num_eventos = args.eventos * passo // args.passos
+        tempo = medir(num_funcionarios, num_eventos)
+        print(f"{num_funcionarios:>12} {num_eventos:>10} {tempo:>10.3f} {tempo / num_eventos * 1e6:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import calendar
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+import pandas as pd
+
+from intervalos import IndiceIntervalos
+
+CENTIMO = Decimal('0.01')
+
+CAMPOS_SALARIAIS = ['SalarioBaseMensal', 'ValorSubsidioAlimentacaoDiario', 'TaxaIRS',
+                    'TaxaSegurancaSocialFuncionario', 'HorasTrabalhoMensalPadrao', 'TaxaHoraExtra50']
+
+# Dados da ficha copiados para o resultado (usados no recibo em PDF)
+CAMPOS_FUNCIONARIO_RECIBO = ['FuncionarioID', 'NomeCompleto', 'NumeroFuncionario', 'CategoriaProfissional',
+                             'NIF', 'NISS', 'Departamento']
+
+
+def arredondar_euros(valores):
+    """
+    Arredonda valores em euros ao cêntimo, com metades para cima (ROUND_HALF_UP), como no recibo.
+
+    Cada valor passa pelo Decimal da sua representação decimal mais curta, para que 2.675
+    dê 2.68 (e não 2.67, como daria o round() sobre o binário).
+    """
+    valores = np.asarray(valores, dtype=float)
+    arredondados = [
+        float(Decimal(repr(v)).quantize(CENTIMO, rounding=ROUND_HALF_UP)) if np.isfinite(v) else v
+        for v in valores.ravel().tolist()
+    ]
+    return np.array(arredondados, dtype=float).reshape(valores.shape)
+
+
+def _somar(df, coluna, ids_funcionarios):
+    if df.empty:
+        return np.zeros(len(ids_funcionarios))
+    return df.groupby('FuncionarioID')[coluna].sum().reindex(ids_funcionarios).fillna(0).to_numpy(dtype=float)
+
+
+def _dias_no_periodo(intervalos_df, inicio, fim, ids_funcionarios):
+    """Dias de cada funcionário cobertos por intervalos [DataInicio, DataFim], recortados ao período."""
+    dias = IndiceIntervalos(intervalos_df).dias_sobrepostos(inicio, fim)
+    return dias.reindex(ids_funcionarios).fillna(0).to_numpy(dtype=int)
+
+
+def agregar_eventos_mes(ids_funcionarios, registos_diarios_df, faltas_df, ferias_df, licencas_df, ano, mes):
+    """
+    Resume os eventos de um mês por funcionário: horas trabalhadas, extra e de ausência,
+    dias com registo (para o subsídio de alimentação) e dias de férias e de licença no mês.
+
+    `registos_diarios_df` pode ter os registos diários do mês ou as linhas já resumidas de
+    RegistosMensais (com NumRegistos em vez de DataRegisto).
+    """
+    ids_funcionarios = pd.Index(ids_funcionarios)
+    inicio_mes = pd.Timestamp(ano, mes, 1)
+    fim_mes = pd.Timestamp(ano, mes, calendar.monthrange(ano, mes)[1])
+
+    dias_trabalhados = np.zeros(len(ids_funcionarios), dtype=int)
+    if not registos_diarios_df.empty:
+        if 'NumRegistos' in registos_diarios_df.columns:
+            # Há um só registo por funcionário e dia, por isso cada registo resumido é um dia
+            dias_por_funcionario = registos_diarios_df.groupby('FuncionarioID')['NumRegistos'].sum()
+        else:
+            dias_por_funcionario = registos_diarios_df.groupby('FuncionarioID')['DataRegisto'].nunique()
+        dias_trabalhados = dias_por_funcionario.reindex(ids_funcionarios).fillna(0).to_numpy(dtype=int)
+
+    return pd.DataFrame({
+        'FuncionarioID': ids_funcionarios,
+        'HorasTrabalhadas': _somar(registos_diarios_df, 'HorasTrabalhadas', ids_funcionarios),
+        'HorasExtra': _somar(registos_diarios_df, 'HorasExtraDiarias', ids_funcionarios),
+        'HorasAusencia': _somar(registos_diarios_df, 'HorasAusencia', ids_funcionarios)
+                         + _somar(faltas_df, 'HorasAusenciaFalta', ids_funcionarios),
+        'DiasTrabalhados': dias_trabalhados,
+        'DiasFerias': _dias_no_periodo(ferias_df, inicio_mes, fim_mes, ids_funcionarios),
+        'DiasLicencas': _dias_no_periodo(licencas_df, inicio_mes, fim_mes, ids_funcionarios),
+    })
+
+
+def calcular_salarios(funcionarios_df, agregados_df):
+    """
+    Calcula o processamento salarial de N funcionários de uma só vez.
+
+    `agregados_df` tem uma linha por FuncionarioID (ver agregar_eventos_mes). Os valores em euros
+    de cada linha do recibo são arredondados ao cêntimo e os totais somam esses valores já
+    arredondados, para o recibo bater certo linha a linha. Funcionários sem os dados salariais
+    da ficha ficam com a coluna 'Erro' preenchida. Devolve uma linha por funcionário, pela
+    ordem de funcionarios_df, com as colunas esperadas por generate_payslip_pdf.
+    """
+    agregados = agregados_df.set_index('FuncionarioID').reindex(funcionarios_df['FuncionarioID']).fillna(0)
+    salariais = funcionarios_df[CAMPOS_SALARIAIS].apply(pd.to_numeric, errors='coerce')
+
+    salario_base_mensal = arredondar_euros(salariais['SalarioBaseMensal'])
+    taxa_irs = salariais['TaxaIRS'].to_numpy(dtype=float)
+    taxa_ss = salariais['TaxaSegurancaSocialFuncionario'].to_numpy(dtype=float)
+    horas_padrao = salariais['HorasTrabalhoMensalPadrao'].to_numpy(dtype=float)
+    horas_extra = agregados['HorasExtra'].to_numpy(dtype=float)
+    horas_ausencia = agregados['HorasAusencia'].to_numpy(dtype=float)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        custo_hora_padrao = np.where(horas_padrao > 0, salariais['SalarioBaseMensal'].to_numpy(dtype=float) / horas_padrao, 0.0)
+    valor_horas_extra = arredondar_euros(horas_extra * (1 + salariais['TaxaHoraExtra50'].to_numpy(dtype=float)) * custo_hora_padrao)
+    vencimento_bruto = arredondar_euros(salario_base_mensal + valor_horas_extra)
+    desconto_irs = arredondar_euros(vencimento_bruto * taxa_irs)
+    desconto_ss = arredondar_euros(vencimento_bruto * taxa_ss)
+    desconto_ausencia = arredondar_euros(horas_ausencia * custo_hora_padrao)
+    subsidio_alimentacao = arredondar_euros(
+        agregados['DiasTrabalhados'].to_numpy(dtype=float) * salariais['ValorSubsidioAlimentacaoDiario'].to_numpy(dtype=float)
+    )
+    total_descontos = arredondar_euros(desconto_irs + desconto_ss + desconto_ausencia)
+
+    salarios = funcionarios_df[CAMPOS_FUNCIONARIO_RECIBO].reset_index(drop=True)
+    salarios = salarios.assign(
+        total_horas_trabalhadas_mes=agregados['HorasTrabalhadas'].to_numpy(dtype=float),
+        total_horas_extra_mes=horas_extra,
+        salario_base_mensal=salario_base_mensal,
+        valor_horas_extra=valor_horas_extra,
+        subsidio_alimentacao=subsidio_alimentacao,
+        vencimento_bruto=vencimento_bruto,
+        desconto_irs=desconto_irs,
+        taxa_irs=taxa_irs,
+        desconto_ss=desconto_ss,
+        taxa_seguranca_social_funcionario=taxa_ss,
+        total_horas_ausencia_geral=horas_ausencia,
+        desconto_ausencia=desconto_ausencia,
+        total_descontos=total_descontos,
+        salario_liquido=arredondar_euros(vencimento_bruto - total_descontos + subsidio_alimentacao),
+        dias_ferias_mes=agregados['DiasFerias'].to_numpy(dtype=int),
+        dias_licencas_mes=agregados['DiasLicencas'].to_numpy(dtype=int),
+    )
+    em_falta = salariais.isna().to_numpy()
+    salarios['Erro'] = [
+        f"Dados salariais em falta: {', '.join(np.array(CAMPOS_SALARIAIS)[linha])}" if linha.any() else None
+        for linha in em_falta
+    ]
+    return salarios
+
+
+def calcular_recibos_mes(funcionarios_df, registos_diarios_df, faltas_df, ferias_df, licencas_df, ano, mes):
+    """Atalho para agregar os eventos do mês e calcular os salários dos funcionários indicados."""
+    agregados = agregar_eventos_mes(funcionarios_df['FuncionarioID'], registos_diarios_df, faltas_df,
+                                    ferias_df, licencas_df, ano, mes)
+    return calcular_salarios(funcionarios_df, agregados)
+
+
+def folha_vencimentos(salarios_df):
+    """Tabela de exportação (CSV/Excel) do processamento salarial, com os nomes de coluna do relatório."""
+    return pd.DataFrame({
+        'Nº Funcionário': salarios_df['NumeroFuncionario'],
+        'Funcionário': salarios_df['NomeCompleto'],
+        'Departamento': salarios_df['Departamento'],
+        'Horas Trabalhadas': salarios_df['total_horas_trabalhadas_mes'].round(2),
+        'Horas Extra': salarios_df['total_horas_extra_mes'].round(2),
+        'Horas Ausência': salarios_df['total_horas_ausencia_geral'].round(2),
+        'Salário Base (€)': salarios_df['salario_base_mensal'],
+        'Horas Extra (€)': salarios_df['valor_horas_extra'],
+        'Subsídio Alimentação (€)': salarios_df['subsidio_alimentacao'],
+        'IRS (€)': salarios_df['desconto_irs'],
+        'Segurança Social (€)': salarios_df['desconto_ss'],
+        'Ausências (€)': salarios_df['desconto_ausencia'],
+        'Total Descontos (€)': salarios_df['total_descontos'],
+        'Salário Líquido (€)': salarios_df['salario_liquido'],
+        'Dias Férias': salarios_df['dias_ferias_mes'],
+        'Dias Licença': salarios_df['dias_licencas_mes'],
+        'Erro': salarios_df['Erro'],
+    })
@@ -0,0 +1,453 @@
+"""
+Esquema da base de dados GestaoHoras: tabelas, índices e verificação dos planos das consultas.
+
+Uso:
+    python esquema.py criar              # cria as tabelas e os índices que faltarem
+    python esquema.py criar --mostrar    # só mostra o script SQL
+    python esquema.py verificar          # indica, para cada consulta da aplicação, se faz seek ou scan
+    python esquema.py reconstruir-mensais [--ano 2025]   # refaz a tabela de resumo RegistosMensais
+
+Todas as instruções são idempotentes: tabelas e índices já existentes são mantidos. O esquema é
+criado no backend configurado em base_dados (SQL Server ou SQLite); as definições estão em T-SQL
+e são traduzidas para SQLite por ddl_sqlite/indice_sqlite.
+"""
+import argparse
+import re
+import sys
+import xml.etree.ElementTree as ET
+from datetime import date
+
+import pandas as pd
+
+import acesso_dados
+import base_dados
+from base_dados import conectar, dialeto
+from registos_mensais import reconstruir_registos_mensais
+
+# Tabelas pela ordem de criação (as referenciadas por chaves estrangeiras primeiro)
+TABELAS = [
+    ('Funcionarios', """
+    CREATE TABLE dbo.Funcionarios (
+        FuncionarioID INT IDENTITY(1,1) NOT NULL CONSTRAINT PK_Funcionarios PRIMARY KEY,
+        NomeCompleto NVARCHAR(200) NOT NULL,
+        NumeroFuncionario NVARCHAR(50) NULL,
+        DataNascimento DATE NULL,
+        NIF NVARCHAR(20) NULL,
+        NISS NVARCHAR(20) NULL,
+        Telefone NVARCHAR(30) NULL,
+        Email NVARCHAR(200) NULL,
+        CategoriaProfissional NVARCHAR(100) NULL,
+        Departamento NVARCHAR(100) NULL,
+        SalarioBaseMensal DECIMAL(10,2) NULL,
+        ValorSubsidioAlimentacaoDiario DECIMAL(10,2) NULL,
+        TaxaIRS DECIMAL(6,4) NULL,
+        TaxaSegurancaSocialFuncionario DECIMAL(6,4) NULL,
+        HorasTrabalhoMensalPadrao DECIMAL(6,2) NULL,
+        TaxaHoraExtra50 DECIMAL(6,4) NULL,
+        TaxaHoraExtra100 DECIMAL(6,4) NULL,
+        DiasFeriasAnuais INT NULL
+    )"""),
+    ('TiposOcorrencia', """
+    CREATE TABLE dbo.TiposOcorrencia (
+        TipoID INT IDENTITY(1,1) NOT NULL CONSTRAINT PK_TiposOcorrencia PRIMARY KEY,
+        Codigo NVARCHAR(10) NOT NULL,
+        Descricao NVARCHAR(200) NULL,
+        HorasPadrao DECIMAL(5,2) NULL,
+        EhTurno BIT NOT NULL CONSTRAINT DF_TiposOcorrencia_EhTurno DEFAULT 0,
+        EhHorasExtra BIT NOT NULL CONSTRAINT DF_TiposOcorrencia_EhHorasExtra DEFAULT 0,
+        EhAusencia BIT NOT NULL CONSTRAINT DF_TiposOcorrencia_EhAusencia DEFAULT 0,
+        EhFOTS BIT NOT NULL CONSTRAINT DF_TiposOcorrencia_EhFOTS DEFAULT 0,
+        EhFolgaCompensatoria BIT NOT NULL CONSTRAINT DF_TiposOcorrencia_EhFolgaCompensatoria DEFAULT 0,
+        Sigla NVARCHAR(5) NULL
+    )"""),
+    ('RegistosDiarios', """
+    CREATE TABLE dbo.RegistosDiarios (
+        RegistoID INT IDENTITY(1,1) NOT NULL CONSTRAINT PK_RegistosDiarios PRIMARY KEY,
+        FuncionarioID INT NOT NULL CONSTRAINT FK_RegistosDiarios_Funcionarios REFERENCES dbo.Funcionarios (FuncionarioID),
+        DataRegisto DATE NOT NULL,
+        TipoOcorrenciaID INT NULL CONSTRAINT FK_RegistosDiarios_TiposOcorrencia REFERENCES dbo.TiposOcorrencia (TipoID),
+        HorasTrabalhadas DECIMAL(5,2) NOT NULL CONSTRAINT DF_RegistosDiarios_HorasTrabalhadas DEFAULT 0,
+        HorasExtraDiarias DECIMAL(5,2) NOT NULL CONSTRAINT DF_RegistosDiarios_HorasExtraDiarias DEFAULT 0,
+        HorasAusencia DECIMAL(5,2) NOT NULL CONSTRAINT DF_RegistosDiarios_HorasAusencia DEFAULT 0,
+        Observacoes NVARCHAR(500) NULL
+    )"""),
+    ('Ferias', """
+    CREATE TABLE dbo.Ferias (
+        FeriasID INT IDENTITY(1,1) NOT NULL CONSTRAINT PK_Ferias PRIMARY KEY,
+        FuncionarioID INT NOT NULL CONSTRAINT FK_Ferias_Funcionarios REFERENCES dbo.Funcionarios (FuncionarioID),
+        DataInicio DATE NOT NULL,
+        DataFim DATE NOT NULL,
+        Observacoes NVARCHAR(500) NULL,
+        Aprovado BIT NOT NULL CONSTRAINT DF_Ferias_Aprovado DEFAULT 0,
+        CONSTRAINT CK_Ferias_Datas CHECK (DataFim >= DataInicio)
+    )"""),
+    ('Faltas', """
+    CREATE TABLE dbo.Faltas (
+        FaltaID INT IDENTITY(1,1) NOT NULL CONSTRAINT PK_Faltas PRIMARY KEY,
+        FuncionarioID INT NOT NULL CONSTRAINT FK_Faltas_Funcionarios REFERENCES dbo.Funcionarios (FuncionarioID),
+        DataFalta DATE NOT NULL,
+        Motivo NVARCHAR(500) NULL,
+        Justificada BIT NOT NULL CONSTRAINT DF_Faltas_Justificada DEFAULT 0,
+        HorasAusenciaFalta DECIMAL(5,2) NOT NULL CONSTRAINT DF_Faltas_HorasAusenciaFalta DEFAULT 0,
+        Aprovado BIT NOT NULL CONSTRAINT DF_Faltas_Aprovado DEFAULT 0
+    )"""),
+    ('Licencas', """
+    CREATE TABLE dbo.Licencas (
+        LicencaID INT IDENTITY(1,1) NOT NULL CONSTRAINT PK_Licencas PRIMARY KEY,
+        FuncionarioID INT NOT NULL CONSTRAINT FK_Licencas_Funcionarios REFERENCES dbo.Funcionarios (FuncionarioID),
+        DataInicio DATE NOT NULL,
+        DataFim DATE NOT NULL,
+        Motivo NVARCHAR(200) NULL,
+        Observacoes NVARCHAR(500) NULL,
+        Aprovado BIT NOT NULL CONSTRAINT DF_Licencas_Aprovado DEFAULT 0,
+        CONSTRAINT CK_Licencas_Datas CHECK (DataFim >= DataInicio)
+    )"""),
+    # Resumo de RegistosDiarios por funcionário, mês e tipo de ocorrência (ver registos_mensais.py)
+    ('RegistosMensais', """
+    CREATE TABLE dbo.RegistosMensais (
+        FuncionarioID INT NOT NULL CONSTRAINT FK_RegistosMensais_Funcionarios REFERENCES dbo.Funcionarios (FuncionarioID),
+        Ano INT NOT NULL,
+        Mes INT NOT NULL,
+        TipoOcorrenciaID INT NULL,
+        NumRegistos INT NOT NULL,
+        HorasTrabalhadas DECIMAL(9,2) NOT NULL,
+        HorasExtraDiarias DECIMAL(9,2) NOT NULL,
+        HorasAusencia DECIMAL(9,2) NOT NULL
+    )"""),
+    # Estado da última importação da escala por funcionário e mês (ver processar_excel.py)
+    ('ImportacaoEscalaBlocos', """
+    CREATE TABLE dbo.ImportacaoEscalaBlocos (
+        FuncionarioID INT NOT NULL CONSTRAINT FK_ImportacaoEscalaBlocos_Funcionarios REFERENCES dbo.Funcionarios (FuncionarioID),
+        Ano INT NOT NULL,
+        Mes INT NOT NULL,
+        Hash CHAR(64) NOT NULL,
+        HashTipos CHAR(64) NOT NULL,
+        Celulas NVARCHAR(2000) NOT NULL,
+        CONSTRAINT PK_ImportacaoEscalaBlocos PRIMARY KEY (FuncionarioID, Ano, Mes)
+    )"""),
+    ('AcertosSemestrais', """
+    CREATE TABLE dbo.AcertosSemestrais (
+        AcertoID INT IDENTITY(1,1) NOT NULL CONSTRAINT PK_AcertosSemestrais PRIMARY KEY,
+        FuncionarioID INT NOT NULL CONSTRAINT FK_AcertosSemestrais_Funcionarios REFERENCES dbo.Funcionarios (FuncionarioID),
+        Ano INT NOT NULL,
+        Semestre INT NOT NULL CONSTRAINT CK_AcertosSemestrais_Semestre CHECK (Semestre IN (1, 2)),
+        TotalHorasNormais DECIMAL(8,2) NOT NULL CONSTRAINT DF_AcertosSemestrais_TotalHorasNormais DEFAULT 0,
+        TotalHorasExtraAcumuladas DECIMAL(8,2) NOT NULL CONSTRAINT DF_AcertosSemestrais_TotalHorasExtraAcumuladas DEFAULT 0,
+        TotalFOTSDisponiveis DECIMAL(8,2) NOT NULL CONSTRAINT DF_AcertosSemestrais_TotalFOTSDisponiveis DEFAULT 0
+    )"""),
+]
+
+# (tabela, nome, definição). Os índices por funcionário servem os ecrãs de um funcionário e o
+# importador; os índices por data servem os períodos de todos os funcionários (dashboard, recibos
+# em lote, quadro mensal). Os INCLUDE cobrem as colunas lidas pelos loaders de acesso_dados.
+INDICES = [
+    ('Funcionarios', 'IX_Funcionarios_Departamento',
+     "CREATE INDEX IX_Funcionarios_Departamento ON dbo.Funcionarios (Departamento)"),
+    ('TiposOcorrencia', 'UX_TiposOcorrencia_Codigo',
+     "CREATE UNIQUE INDEX UX_TiposOcorrencia_Codigo ON dbo.TiposOcorrencia (Codigo)"),
+    # O MERGE do importador (processar_excel.merge_registos_diarios) assume um registo por funcionário e dia
+    ('RegistosDiarios', 'UX_RegistosDiarios_FuncionarioID_DataRegisto',
+     "CREATE UNIQUE INDEX UX_RegistosDiarios_FuncionarioID_DataRegisto ON dbo.RegistosDiarios (FuncionarioID, DataRegisto) "
+     "INCLUDE (TipoOcorrenciaID, HorasTrabalhadas, HorasExtraDiarias, HorasAusencia, Observacoes)"),
+    ('RegistosDiarios', 'IX_RegistosDiarios_DataRegisto',
+     "CREATE INDEX IX_RegistosDiarios_DataRegisto ON dbo.RegistosDiarios (DataRegisto) "
+     "INCLUDE (FuncionarioID, TipoOcorrenciaID, HorasTrabalhadas, HorasExtraDiarias, HorasAusencia, Observacoes)"),
+    ('RegistosMensais', 'UX_RegistosMensais_FuncionarioID_Ano_Mes_Tipo',
+     "CREATE UNIQUE CLUSTERED INDEX UX_RegistosMensais_FuncionarioID_Ano_Mes_Tipo ON dbo.RegistosMensais (FuncionarioID, Ano, Mes, TipoOcorrenciaID)"),
+    ('RegistosMensais', 'IX_RegistosMensais_Ano_Mes',
+     "CREATE INDEX IX_RegistosMensais_Ano_Mes ON dbo.RegistosMensais (Ano, Mes) "
+     "INCLUDE (TipoOcorrenciaID, NumRegistos, HorasTrabalhadas, HorasExtraDiarias, HorasAusencia)"),
+    ('Faltas', 'IX_Faltas_FuncionarioID_DataFalta',
+     "CREATE INDEX IX_Faltas_FuncionarioID_DataFalta ON dbo.Faltas (FuncionarioID, DataFalta) "
+     "INCLUDE (Motivo, Justificada, HorasAusenciaFalta, Aprovado)"),
+    ('Faltas', 'IX_Faltas_DataFalta',
+     "CREATE INDEX IX_Faltas_DataFalta ON dbo.Faltas (DataFalta) "
+     "INCLUDE (FuncionarioID, Motivo, Justificada, HorasAusenciaFalta, Aprovado)"),
+    # Sobreposição [DataInicio, DataFim] com um período: seek em DataFim >= início, filtro residual em DataInicio
+    ('Ferias', 'IX_Ferias_FuncionarioID_DataFim',
+     "CREATE INDEX IX_Ferias_FuncionarioID_DataFim ON dbo.Ferias (FuncionarioID, DataFim) "
+     "INCLUDE (DataInicio, Observacoes, Aprovado)"),
+    ('Ferias', 'IX_Ferias_DataFim',
+     "CREATE INDEX IX_Ferias_DataFim ON dbo.Ferias (DataFim) "
+     "INCLUDE (FuncionarioID, DataInicio, Observacoes, Aprovado)"),
+    ('Licencas', 'IX_Licencas_FuncionarioID_DataFim',
+     "CREATE INDEX IX_Licencas_FuncionarioID_DataFim ON dbo.Licencas (FuncionarioID, DataFim) "
+     "INCLUDE (DataInicio, Motivo, Observacoes, Aprovado)"),
+    ('Licencas', 'IX_Licencas_DataFim',
+     "CREATE INDEX IX_Licencas_DataFim ON dbo.Licencas (DataFim) "
+     "INCLUDE (FuncionarioID, DataInicio, Motivo, Observacoes, Aprovado)"),
+    ('AcertosSemestrais', 'UX_AcertosSemestrais_FuncionarioID_Ano_Semestre',
+     "CREATE UNIQUE INDEX UX_AcertosSemestrais_FuncionarioID_Ano_Semestre ON dbo.AcertosSemestrais (FuncionarioID, Ano, Semestre) "
+     "INCLUDE (TotalHorasNormais, TotalHorasExtraAcumuladas, TotalFOTSDisponiveis)"),
+    ('AcertosSemestrais', 'IX_AcertosSemestrais_Ano',
+     "CREATE INDEX IX_AcertosSemestrais_Ano ON dbo.AcertosSemestrais (Ano) "
+     "INCLUDE (FuncionarioID, Semestre, TotalHorasNormais, TotalHorasExtraAcumuladas, TotalFOTSDisponiveis)"),
+]
+
+NS_SHOWPLAN = '{http://schemas.microsoft.com/sqlserver/2004/07/showplan}'
+OPERADORES_SEEK = {'Index Seek', 'Clustered Index Seek'}
+OPERADORES_SCAN = {'Index Scan', 'Clustered Index Scan', 'Table Scan'}
+OPERADORES_LOOKUP = {'Key Lookup', 'RID Lookup'}
+
+
+def script_tabela(tabela, ddl):
+    return f"IF OBJECT_ID(N'dbo.{tabela}', N'U') IS NULL\n{ddl.strip()};"
+
+
+def script_indice(tabela, nome, ddl):
+    return (f"IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = N'{nome}' AND object_id = OBJECT_ID(N'dbo.{tabela}'))\n"
+            f"    {ddl};")
+
+
+def ddl_sqlite(ddl):
+    """
+    Traduz o CREATE TABLE para SQLite: a chave IDENTITY passa a INTEGER PRIMARY KEY AUTOINCREMENT,
+    as referências perdem o prefixo dbo. e os textos comparam sem distinguir maiúsculas, como a
+    collation por omissão do SQL Server.
+    """
+    ddl = re.sub(r"CREATE TABLE (dbo\.\w+)", r"CREATE TABLE IF NOT EXISTS \1", ddl.strip())
+    ddl = re.sub(r"INT IDENTITY\(1,1\) NOT NULL CONSTRAINT \w+ PRIMARY KEY", "INTEGER PRIMARY KEY AUTOINCREMENT", ddl)
+    ddl = ddl.replace("REFERENCES dbo.", "REFERENCES ")
+    return re.sub(r"(NVARCHAR\(\d+\))", r"\1 COLLATE NOCASE", ddl)
+
+
+def indice_sqlite(ddl):
+    """
+    Traduz o CREATE INDEX para SQLite, que não tem índices clustered nem INCLUDE: nos índices não
+    únicos as colunas incluídas passam para o fim da chave (o índice continua a cobrir a consulta);
+    nos únicos são omitidas, para não alterar a unicidade.
+    """
+    m = re.match(r"CREATE (UNIQUE )?(?:CLUSTERED )?INDEX (\w+) ON dbo\.(\w+) \(([^)]*)\)(?: INCLUDE \(([^)]*)\))?$", ddl)
+    unico, nome, tabela, colunas, incluidas = m.groups()
+    if incluidas and not unico:
+        colunas = f"{colunas}, {incluidas}"
+    return f"CREATE {unico or ''}INDEX IF NOT EXISTS dbo.{nome} ON {tabela} ({colunas})"
+
+
+def _objetos_esquema(sqlite):
+    """(nome, instrução) de cada tabela e índice, no dialeto do backend."""
+    if sqlite:
+        objetos = [(tabela, ddl_sqlite(ddl)) for tabela, ddl in TABELAS]
+        objetos += [(f"{tabela}.{nome}", indice_sqlite(ddl)) for tabela, nome, ddl in INDICES]
+    else:
+        objetos = [(tabela, script_tabela(tabela, ddl)) for tabela, ddl in TABELAS]
+        objetos += [(f"{tabela}.{nome}", script_indice(tabela, nome, ddl)) for tabela, nome, ddl in INDICES]
+    return objetos
+
+
+def script_esquema(sqlite=False):
+    """Script SQL completo (tabelas e índices), separado por GO (ou por ; em SQLite)."""
+    instrucoes = [sql for _, sql in _objetos_esquema(sqlite)]
+    if sqlite:
+        return ";\n".join(instrucoes) + ";\n"
+    return "\nGO\n".join(instrucoes) + "\nGO\n"
+
+
+def criar_esquema(cnxn):
+    """
+    Cria as tabelas e os índices em falta, um objeto de cada vez (cada um com o seu commit).
+    Devolve o número de objetos que falharam; os erros são mostrados e não interrompem os restantes.
+    """
+    cursor = cnxn.cursor()
+    falhas = 0
+    for nome, sql in _objetos_esquema(dialeto(cnxn) == 'sqlite'):
+        try:
+            cursor.execute(sql)
+            cnxn.commit()
+            print(f"  OK: {nome}")
+        except base_dados.ERROS_BASE_DADOS as ex:
+            cnxn.rollback()
+            falhas += 1
+            print(f"  ERRO: {nome}: {ex}")
+            if nome.startswith('RegistosDiarios.UX_'):
+                print("    Há registos repetidos para o mesmo funcionário e dia; elimine-os antes de criar o índice único.")
+    return falhas
+
+
+def _consulta_do_loader(loader, *args, **kwargs):
+    """Devolve (query, params) que o loader de acesso_dados envia ao fetch_data, sem ir à base de dados."""
+    capturadas = []
+
+    def capturar(query, params=None, tabelas=()):
+        capturadas.append((query, tuple(params) if params else ()))
+        return pd.DataFrame()
+
+    original = acesso_dados.fetch_data
+    acesso_dados.fetch_data = capturar
+    try:
+        loader(*args, **kwargs)
+    finally:
+        acesso_dados.fetch_data = original
+    return capturadas[0]
+
+
+def consultas_aplicacao(funcionario_id, departamento, inicio, fim):
+    """
+    Consultas críticas da aplicação, geradas pelos próprios loaders de acesso_dados.
+    Devolve uma lista de (descrição, query, params, scan_aceitavel).
+    """
+    ad = acesso_dados
+    consultas = [
+        ("Registos diários de um funcionário no mês", ad.get_registos_diarios, (inicio, fim, funcionario_id), False),
+        ("Registos diários de todos no mês", ad.get_registos_diarios, (inicio, fim), False),
+        ("Registos diários de um departamento no mês", ad.get_registos_diarios, (inicio, fim, None, departamento), False),
+        ("Totais de um período", ad.get_totais_registos_diarios, (inicio, fim), False),
+        ("Totais do mês (dashboard)", ad.get_totais_registos_mensais, (inicio.year, inicio.month), False),
+        ("Resumo mensal de um funcionário (recibo)", ad.get_registos_mensais, (inicio.year, inicio.month, funcionario_id), False),
+        ("Resumo mensal de todos (recibos em lote, análise por tipo)", ad.get_registos_mensais, (inicio.year, inicio.month), False),
+        # Percorre a chave primária por ordem inversa e pára ao fim de 10 linhas
+        ("Últimos registos (dashboard)", ad.get_ultimos_registos_diarios, (10,), True),
+        ("Faltas de um funcionário no mês", ad.get_faltas, (inicio, fim, funcionario_id), False),
+        ("Faltas de todos no mês", ad.get_faltas, (inicio, fim), False),
+        ("Férias de um funcionário no mês", ad.get_ferias, (inicio, fim, funcionario_id), False),
+        ("Férias de todos no mês", ad.get_ferias, (inicio, fim), False),
+        ("Próximas férias (dashboard)", ad.get_proximas_ferias, (inicio, 5), False),
+        ("Licenças de um funcionário no mês", ad.get_licencas, (inicio, fim, funcionario_id), False),
+        ("Licenças de todos no mês", ad.get_licencas, (inicio, fim), False),
+        ("Próximas licenças (dashboard)", ad.get_proximas_licencas, (inicio, 5), False),
+        # Listagens paginadas do separador de registos: a primeira página percorre o índice por ordem
+        # inversa e pára ao fim de uma página; as seguintes (keyset) e as filtradas fazem seek
+        ("Página de registos diários", ad.get_pagina_listagem, ('RegistosDiarios',), True),
+        ("Página seguinte de registos diários", ad.get_pagina_listagem,
+         ('RegistosDiarios', None, None, None, None, 50, 0, (fim, 2 ** 31 - 1)), False),
+        ("Página de registos diários de um funcionário", ad.get_pagina_listagem, ('RegistosDiarios', inicio, fim, funcionario_id), False),
+        ("Contagem de registos diários de um funcionário", ad.contar_listagem, ('RegistosDiarios', None, None, funcionario_id), False),
+        ("Página seguinte de faltas", ad.get_pagina_listagem, ('Faltas', None, None, None, None, 50, 0, (fim, 2 ** 31 - 1)), False),
+        ("Página seguinte de férias", ad.get_pagina_listagem, ('Ferias', None, None, None, None, 50, 0, (fim, 2 ** 31 - 1)), False),
+        ("Página seguinte de licenças", ad.get_pagina_listagem, ('Licencas', None, None, None, None, 50, 0, (fim, 2 ** 31 - 1)), False),
+        ("Acertos semestrais do ano", ad.get_acertos_semestrais, (inicio.year,), False),
+        ("Cálculo do fecho de semestre", ad.get_acertos_calculados, (inicio.year, 1 if inicio.month <= 6 else 2), False),
+    ]
+    resultado = []
+    for descricao, loader, args, scan_aceitavel in consultas:
+        query, params = _consulta_do_loader(loader, *args)
+        resultado.append((descricao, query, params, scan_aceitavel))
+    return resultado
+
+
+def acessos_plano(plano_xml):
+    """Lista (operador, objeto) dos acessos a tabelas/índices num plano SHOWPLAN_XML."""
+    acessos = []
+    for relop in ET.fromstring(plano_xml).iter(f'{NS_SHOWPLAN}RelOp'):
+        operador = relop.get('PhysicalOp')
+        if operador not in OPERADORES_SEEK | OPERADORES_SCAN | OPERADORES_LOOKUP:
+            continue
+        objeto = relop.find(f'./*/{NS_SHOWPLAN}Object')
+        nome = ''
+        if objeto is not None:
+            nome = f"{objeto.get('Table', '')}.{objeto.get('Index', '')}".strip('.')
+        acessos.append((operador, nome))
+    return acessos
+
+
+def acessos_plano_sqlite(cursor, query, params):
+    """
+    Lista (operador, objeto) dos acessos a tabelas num plano EXPLAIN QUERY PLAN do SQLite, com
+    os operadores do SQL Server: SEARCH passa a 'Index Seek' e SCAN a 'Index Scan'/'Table Scan'.
+    """
+    cursor.execute(f"EXPLAIN QUERY PLAN {query}", params)
+    acessos = []
+    for linha in cursor.fetchall():
+        m = re.match(r"(SEARCH|SCAN) (\S+)(?: AS \w+)?(?: USING (?:COVERING )?INDEX (\w+)| USING INTEGER PRIMARY KEY)?",
+                     linha[-1])
+        if not m:
+            continue
+        operacao, tabela, indice = m.groups()
+        if operacao == 'SEARCH':
+            operador = 'Index Seek'
+        else:
+            operador = 'Index Scan' if indice else 'Table Scan'
+        acessos.append((operador, f"{tabela}.{indice or ''}".strip('.')))
+    return acessos
+
+
+def verificar_planos(cnxn, funcionario_id=None, departamento=None, referencia=None):
+    """
+    Pede ao SQL Server o plano estimado (SHOWPLAN_XML, sem executar) de cada consulta da aplicação
+    (em SQLite, o EXPLAIN QUERY PLAN) e mostra se acede às tabelas por seek ou por scan. Devolve o
+    número de scans inesperados.
+    """
+    cursor = cnxn.cursor()
+    if funcionario_id is None:
+        cursor.execute("SELECT TOP 1 FuncionarioID FROM dbo.Funcionarios ORDER BY FuncionarioID")
+        row = cursor.fetchone()
+        funcionario_id = row[0] if row else 1
+    if departamento is None:
+        cursor.execute("SELECT TOP 1 Departamento FROM dbo.Funcionarios WHERE Departamento IS NOT NULL")
+        row = cursor.fetchone()
+        departamento = row[0] if row else 'Geral'
+    referencia = referencia or date.today()
+    inicio = referencia.replace(day=1)
+    fim = (pd.Timestamp(inicio) + pd.offsets.MonthEnd(0)).date()
+
+    problemas = 0
+    sqlite = dialeto(cnxn) == 'sqlite'
+    if not sqlite:
+        cursor.execute("SET SHOWPLAN_XML ON")
+    try:
+        for descricao, query, params, scan_aceitavel in consultas_aplicacao(funcionario_id, departamento, inicio, fim):
+            if sqlite:
+                acessos = acessos_plano_sqlite(cursor, query, params)
+            else:
+                cursor.execute(query, params)
+                acessos = acessos_plano(cursor.fetchone()[0])
+                while cursor.nextset():
+                    pass
+            tem_scan = any(operador in OPERADORES_SCAN for operador, _ in acessos)
+            if not tem_scan:
+                estado = "SEEK"
+            elif scan_aceitavel:
+                estado = "SCAN (esperado)"
+            else:
+                estado = "SCAN"
+                problemas += 1
+            print(f"[{estado}] {descricao}")
+            for operador, objeto in acessos:
+                print(f"    {operador}: {objeto}")
+    finally:
+        if not sqlite:
+            cursor.execute("SET SHOWPLAN_XML OFF")
+    return problemas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cria o esquema da base de dados GestaoHoras e verifica os planos das consultas.")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+    parser_criar = subparsers.add_parser('criar', help="Cria as tabelas e os índices em falta.")
+    parser_criar.add_argument('--mostrar', action='store_true', help="Só mostra o script SQL do backend configurado, sem ligar à base de dados.")
+    parser_verificar = subparsers.add_parser('verificar', help="Mostra se cada consulta da aplicação faz seek ou scan.")
+    parser_verificar.add_argument('--funcionario', type=int, help="FuncionarioID usado nas consultas (por omissão, o primeiro).")
+    parser_verificar.add_argument('--departamento', help="Departamento usado nas consultas (por omissão, o primeiro).")
+    parser_verificar.add_argument('--data', type=date.fromisoformat, help="Dia de referência AAAA-MM-DD (por omissão, hoje).")
+    parser_reconstruir = subparsers.add_parser('reconstruir-mensais', help="Refaz RegistosMensais a partir de RegistosDiarios.")
+    parser_reconstruir.add_argument('--ano', type=int, help="Só este ano (por omissão, todos).")
+    args = parser.parse_args(argv)
+
+    if args.comando == 'criar' and args.mostrar:
+        print(script_esquema(base_dados.BACKEND == 'sqlite'))
+        return 0
+
+    try:
+        cnxn = conectar()
+    except base_dados.ERROS_BASE_DADOS as ex:
+        print(f"Erro de conexão à base de dados: {ex}")
+        return 1
+    try:
+        if args.comando == 'criar':
+            falhas = criar_esquema(cnxn)
+            print(f"\nEsquema verificado: {len(TABELAS)} tabelas, {len(INDICES)} índices, {falhas} erro(s).")
+            return 1 if falhas else 0
+        if args.comando == 'reconstruir-mensais':
+            linhas = reconstruir_registos_mensais(cnxn.cursor(), args.ano)
+            cnxn.commit()
+            print(f"RegistosMensais reconstruída{f' para {args.ano}' if args.ano else ''}: {linhas} linhas.")
+            return 0
+        problemas = verificar_planos(cnxn, args.funcionario, args.departamento, args.data)
+        print(f"\n{problemas} consulta(s) com scan inesperado.")
+        return 1 if problemas else 0
+    finally:
+        cnxn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,299 @@
+"""
+Diagnóstico de desempenho da aplicação Streamlit.
+
+Com GESTAO_HORAS_DIAGNOSTICO=1, cada execução do script (e cada execução isolada de um
+fragmento) regista:
+  - as consultas de fetch_data, ler_em_lotes e execute_query: tempo total, tempo passado na
+    base de dados, linhas devolvidas e se a resposta veio da cache;
+  - o tempo das fases (carregamento inicial e separador ativo) e das secções nomeadas de cada
+    separador (grelha do quadro mensal, cálculo dos saldos, PDFs dos recibos, exportações, ...).
+
+No fim de cada execução o resumo é acrescentado ao ficheiro GESTAO_HORAS_DIAGNOSTICO_LOG (por
+omissão diagnostico_desempenho.log) e mostrado num painel na barra lateral, com as consultas
+mais lentas e os respetivos parâmetros. Os parâmetros das escritas não são registados, por
+conterem dados dos funcionários. Sem a variável de ambiente nada é medido nem mostrado.
+"""
+import functools
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+ATIVO = os.environ.get("GESTAO_HORAS_DIAGNOSTICO", "").lower() in ("1", "true", "sim")
+FICHEIRO_LOG = os.environ.get("GESTAO_HORAS_DIAGNOSTICO_LOG", "diagnostico_desempenho.log")
+
+# Consultas mais lentas mostradas no painel e gravadas no log, por execução
+CONSULTAS_MAIS_LENTAS = 10
+# Execuções anteriores da sessão mostradas no painel
+EXECUCOES_NA_SESSAO = 20
+# Comprimento máximo do texto dos parâmetros de uma consulta
+TAMANHO_PARAMETROS = 200
+
+CHAVE_EXECUCAO = '_diagnostico_execucao'
+CHAVE_HISTORICO = '_diagnostico_historico'
+
+_RE_ESPACOS = re.compile(r"\s+")
+_local = threading.local()
+_log_lock = threading.Lock()
+
+
+class Execucao:
+    """Medições de uma execução do script ou de um fragmento."""
+
+    def __init__(self, nome=None):
+        self._nome = nome
+        self.data = datetime.now()
+        self.inicio = time.perf_counter()
+        self.ultima_medicao = self.inicio
+        self.segundos = None
+        self.interrompida = False
+        self.consultas = []
+        self.secoes = []
+        self.pilha_secoes = []
+        self.fase = None
+
+    @property
+    def nome(self):
+        # As execuções do script tomam o nome da última fase (o separador ativo)
+        if self._nome:
+            return self._nome
+        fases = [s['secao'] for s in self.secoes if s['fase']]
+        return fases[-1] if fases else "execução"
+
+    def secao_atual(self):
+        if self.pilha_secoes:
+            return self.pilha_secoes[-1][0]
+        return self.fase[0] if self.fase else None
+
+    def resumo(self):
+        return {
+            'Hora': self.data.strftime('%H:%M:%S'),
+            'Execução': self.nome + (' (interrompida)' if self.interrompida else ''),
+            'Segundos': round(self.segundos, 3),
+            'Consultas': len(self.consultas),
+            'Da cache': sum(c['cache'] == 'acerto' for c in self.consultas),
+            'Segundos na BD': round(sum(c['segundos_bd'] for c in self.consultas), 3),
+        }
+
+
+def _execucao_atual():
+    if not ATIVO:
+        return None
+    return st.session_state.get(CHAVE_EXECUCAO)
+
+
+def _texto_parametros(params):
+    if not params:
+        return ''
+    texto = repr(tuple(params))
+    return texto if len(texto) <= TAMANHO_PARAMETROS else texto[:TAMANHO_PARAMETROS - 3] + '...'
+
+
+def iniciar_execucao(nome=None):
+    """
+    Começa a medir uma execução (no início do script). Uma execução anterior que não chegou ao
+    fim (st.rerun, st.stop) é fechada como interrompida, com o tempo até à sua última medição.
+    """
+    if not ATIVO:
+        return
+    anterior = st.session_state.get(CHAVE_EXECUCAO)
+    if anterior is not None:
+        _concluir(anterior, interrompida=True)
+    st.session_state[CHAVE_EXECUCAO] = Execucao(nome)
+
+
+def terminar_execucao():
+    """Fecha a execução em curso (no fim do script): grava-a no log e mostra o painel na barra lateral."""
+    execucao = _execucao_atual()
+    if execucao is None:
+        return
+    _concluir(execucao)
+    mostrar_painel(execucao)
+
+
+def _fechar_fase(execucao, fim):
+    if execucao.fase is None:
+        return
+    nome, inicio, consultas_antes = execucao.fase
+    consultas = execucao.consultas[consultas_antes:]
+    execucao.secoes.append({'secao': nome, 'nivel': 0, 'fase': True, 'inicio': inicio, 'segundos': fim - inicio,
+                            'consultas': len(consultas), 'segundos_bd': sum(c['segundos_bd'] for c in consultas)})
+    execucao.fase = None
+
+
+def fase(nome):
+    """Fecha a fase anterior da execução e começa outra (ex.: o separador ativo), sem precisar de um bloco `with`."""
+    execucao = _execucao_atual()
+    if execucao is None:
+        return
+    agora = time.perf_counter()
+    _fechar_fase(execucao, agora)
+    execucao.fase = (nome, agora, len(execucao.consultas))
+
+
+@contextmanager
+def secao(nome):
+    """Mede um bloco com nome (ex.: a construção da grelha do quadro mensal); as secções podem ser encaixadas."""
+    execucao = _execucao_atual()
+    if execucao is None:
+        yield
+        return
+    nivel = len(execucao.pilha_secoes) + (execucao.fase is not None)
+    execucao.pilha_secoes.append((nome, nivel))
+    consultas_antes = len(execucao.consultas)
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        fim = time.perf_counter()
+        execucao.pilha_secoes.pop()
+        consultas = execucao.consultas[consultas_antes:]
+        execucao.secoes.append({'secao': nome, 'nivel': nivel, 'fase': False, 'inicio': inicio, 'segundos': fim - inicio,
+                                'consultas': len(consultas), 'segundos_bd': sum(c['segundos_bd'] for c in consultas)})
+        execucao.ultima_medicao = fim
+
+
+@contextmanager
+def consulta(query, params=None, escrita=False):
+    """
+    Mede uma consulta de fetch_data, ler_em_lotes ou execute_query. O bloco recebe um
+    dicionário onde indica as linhas devolvidas ('linhas'); uma leitura conta como vinda da
+    cache, exceto se o bloco passar por acesso_base_dados().
+    """
+    execucao = _execucao_atual()
+    if execucao is None:
+        yield {}
+        return
+    medicao = {
+        'consulta': _RE_ESPACOS.sub(' ', query).strip(),
+        'parametros': '(omitidos)' if escrita and params else _texto_parametros(params),
+        'linhas': None,
+        'cache': '-' if escrita else 'acerto',
+        'segundos_bd': 0.0,
+        'secao': execucao.secao_atual(),
+    }
+    anterior = getattr(_local, 'consulta', None)
+    _local.consulta = medicao
+    inicio = time.perf_counter()
+    try:
+        yield medicao
+    finally:
+        fim = time.perf_counter()
+        _local.consulta = anterior
+        medicao['segundos'] = fim - inicio
+        if escrita:
+            medicao['segundos_bd'] = medicao['segundos']
+        execucao.consultas.append(medicao)
+        execucao.ultima_medicao = fim
+
+
+@contextmanager
+def acesso_base_dados():
+    """Marca a consulta em curso como lida da base de dados (falha da cache) e mede o tempo do bloco."""
+    medicao = getattr(_local, 'consulta', None)
+    if medicao is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicao['cache'] = 'falha'
+        medicao['segundos_bd'] += time.perf_counter() - inicio
+
+
+def fragmento(funcao):
+    """
+    Para funções @st.fragment (aplicado por baixo de @st.fragment). Quando o fragmento corre
+    sozinho, as suas medições formam uma execução própria, gravada no log e no histórico da
+    sessão; dentro de uma execução completa do script contam para essa execução.
+    """
+    @functools.wraps(funcao)
+    def envolvida(*args, **kwargs):
+        if not ATIVO or _execucao_atual() is not None:
+            return funcao(*args, **kwargs)
+        iniciar_execucao(f"{funcao.__name__} (fragmento)")
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            execucao = _execucao_atual()
+            if execucao is not None:
+                _concluir(execucao)
+    return envolvida
+
+
+def _concluir(execucao, interrompida=False):
+    fim = execucao.ultima_medicao if interrompida else time.perf_counter()
+    _fechar_fase(execucao, fim)
+    execucao.segundos = fim - execucao.inicio
+    execucao.interrompida = interrompida
+    if st.session_state.get(CHAVE_EXECUCAO) is execucao:
+        del st.session_state[CHAVE_EXECUCAO]
+    historico = st.session_state.setdefault(CHAVE_HISTORICO, [])
+    historico.append(execucao.resumo())
+    del historico[:-EXECUCOES_NA_SESSAO]
+    _gravar_log(execucao)
+
+
+def consultas_mais_lentas(execucao, quantidade=CONSULTAS_MAIS_LENTAS):
+    return sorted(execucao.consultas, key=lambda c: c['segundos'], reverse=True)[:quantidade]
+
+
+def _descricao_consultas(consultas):
+    da_cache = sum(c['cache'] == 'acerto' for c in consultas)
+    segundos_bd = sum(c['segundos_bd'] for c in consultas)
+    return f"{len(consultas)} consultas ({len(consultas) - da_cache} à base de dados, {da_cache} da cache), {segundos_bd:.3f} s na base de dados"
+
+
+def _gravar_log(execucao):
+    linhas = [f"{execucao.data:%Y-%m-%d %H:%M:%S} {execucao.nome}{' (interrompida)' if execucao.interrompida else ''}: "
+              f"{execucao.segundos:.3f} s | {_descricao_consultas(execucao.consultas)}"]
+    for s in sorted(execucao.secoes, key=lambda s: s['inicio']):
+        linhas.append(f"    {'  ' * s['nivel']}{s['secao']}: {s['segundos']:.3f} s "
+                      f"({s['consultas']} consultas, {s['segundos_bd']:.3f} s na base de dados)")
+    for c in consultas_mais_lentas(execucao):
+        linhas.append(f"    consulta {c['segundos']:.3f} s (base de dados {c['segundos_bd']:.3f} s, {c['linhas']} linhas, "
+                      f"cache: {c['cache']}) [{c['secao'] or '-'}] {c['consulta']}"
+                      + (f" | parâmetros: {c['parametros']}" if c['parametros'] else ''))
+    try:
+        with _log_lock, open(FICHEIRO_LOG, 'a', encoding='utf-8') as f:
+            f.write("\n".join(linhas) + "\n")
+    except OSError:
+        # O diagnóstico nunca deve interromper a aplicação
+        pass
+
+
+def mostrar_painel(execucao):
+    """Painel na barra lateral com o resumo da execução, as secções, as consultas mais lentas e o histórico da sessão."""
+    with st.sidebar.expander("⏱️ Diagnóstico de desempenho"):
+        st.caption(f"{execucao.nome}: {execucao.segundos:.3f} s | {_descricao_consultas(execucao.consultas)}")
+        if execucao.secoes:
+            secoes_df = pd.DataFrame(sorted(execucao.secoes, key=lambda s: s['inicio']))
+            st.markdown("**Secções**")
+            st.dataframe(pd.DataFrame({
+                'Secção': ['\u2003' * n + s for n, s in zip(secoes_df['nivel'], secoes_df['secao'])],
+                'Segundos': secoes_df['segundos'].round(3),
+                'Consultas': secoes_df['consultas'],
+                'Segundos na BD': secoes_df['segundos_bd'].round(3),
+            }), hide_index=True)
+        if execucao.consultas:
+            st.markdown("**Consultas mais lentas**")
+            st.dataframe(pd.DataFrame([{
+                'Segundos': round(c['segundos'], 3),
+                'Segundos na BD': round(c['segundos_bd'], 3),
+                'Linhas': c['linhas'],
+                'Cache': c['cache'],
+                'Secção': c['secao'],
+                'Consulta': c['consulta'],
+                'Parâmetros': c['parametros'],
+            } for c in consultas_mais_lentas(execucao)]), hide_index=True)
+        historico = st.session_state.get(CHAVE_HISTORICO, [])
+        if len(historico) > 1:
+            st.markdown("**Execuções anteriores da sessão**")
+            st.dataframe(pd.DataFrame(historico[-2::-1]), hide_index=True)
+        st.caption(f"Registado em {os.path.abspath(FICHEIRO_LOG)}")
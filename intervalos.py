@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+# Deslocamento que torna positivos os dias antes de 1970, para compor a chave (funcionário, dia)
+_DESLOCAMENTO_DIAS = 1 << 31
+
+
+def _em_dias(datas):
+    """Converte datas (date, datetime, texto) em dias inteiros desde 1970-01-01; NaT fica como NaT."""
+    return pd.to_datetime(pd.Series(datas)).dt.normalize().to_numpy().astype('datetime64[D]')
+
+
+class IndiceIntervalos:
+    """
+    Índice de intervalos [DataInicio, DataFim] (Férias, Licenças) por funcionário.
+
+    Os intervalos são ordenados uma vez por (funcionário, início), com o maior fim acumulado
+    de cada funcionário, para responder em bloco, sem percorrer a tabela por cada dia:
+      - cobre(funcionarios, datas): se cada par (funcionário, dia) está coberto por algum intervalo;
+      - dias_sobrepostos(inicio, fim): dias de cada funcionário dentro de um período;
+      - expandir(inicio, fim): os pares (funcionário, dia) cobertos num período, para preencher grelhas.
+    Linhas sem funcionário ou com datas em falta são ignoradas.
+    """
+
+    def __init__(self, df, coluna_inicio='DataInicio', coluna_fim='DataFim'):
+        if df.empty:
+            self.funcionarios = pd.Index([])
+            self._codigos = np.empty(0, dtype=np.int64)
+            self._inicio = np.empty(0, dtype=np.int64)
+            self._fim = np.empty(0, dtype=np.int64)
+            self._fim_acumulado = np.empty(0, dtype=np.int64)
+            self._chaves = np.empty(0, dtype=np.int64)
+            return
+
+        inicio = _em_dias(df[coluna_inicio])
+        fim = _em_dias(df[coluna_fim])
+        funcionarios = df['FuncionarioID'].to_numpy()
+        validos = ~np.isnat(inicio) & ~np.isnat(fim) & pd.notna(funcionarios)
+
+        self.funcionarios = pd.Index(pd.unique(funcionarios[validos])).sort_values()
+        codigos = self.funcionarios.get_indexer(funcionarios[validos]).astype(np.int64)
+        inicio = inicio[validos].astype(np.int64)
+        fim = fim[validos].astype(np.int64)
+
+        ordem = np.lexsort((inicio, codigos))
+        self._codigos, self._inicio, self._fim = codigos[ordem], inicio[ordem], fim[ordem]
+        # Maior fim entre os intervalos do funcionário que começam até cada posição
+        self._fim_acumulado = pd.Series(self._fim).groupby(self._codigos).cummax().to_numpy(dtype=np.int64)
+        self._chaves = self._chave(self._codigos, self._inicio)
+
+    @staticmethod
+    def _chave(codigos, dias):
+        return (codigos.astype(np.int64) << 32) + (dias.astype(np.int64) + _DESLOCAMENTO_DIAS)
+
+    def __len__(self):
+        return len(self._inicio)
+
+    def cobre(self, funcionarios, datas):
+        """Para cada par (funcionário, data), True se algum intervalo desse funcionário contém a data."""
+        codigos = self.funcionarios.get_indexer(pd.Index(funcionarios)).astype(np.int64)
+        dias = _em_dias(datas)
+        resultado = (codigos >= 0) & ~np.isnat(dias)
+        if not len(self) or not resultado.any():
+            return np.zeros(len(codigos), dtype=bool)
+
+        dias = dias.astype(np.int64)
+        # Último intervalo do funcionário que começa até ao dia; o fim acumulado diz se algum o cobre
+        posicoes = np.searchsorted(self._chaves, self._chave(codigos, dias), side='right') - 1
+        posicoes_validas = np.clip(posicoes, 0, None)
+        resultado &= posicoes >= 0
+        resultado &= self._codigos[posicoes_validas] == codigos
+        resultado &= self._fim_acumulado[posicoes_validas] >= dias
+        return resultado
+
+    def _recortar(self, inicio, fim):
+        inicio_periodo, fim_periodo = (_em_dias([inicio, fim]).astype(np.int64))
+        return np.maximum(self._inicio, inicio_periodo), np.minimum(self._fim, fim_periodo), inicio_periodo
+
+    def dias_sobrepostos(self, inicio, fim):
+        """
+        Dias (inclusive) de cada funcionário dentro de [inicio, fim], somando os seus intervalos
+        recortados ao período. Devolve uma Series indexada por FuncionarioID.
+        """
+        if not len(self):
+            return pd.Series(dtype=int)
+        inicio_recortado, fim_recortado, _ = self._recortar(inicio, fim)
+        dias = np.clip(fim_recortado - inicio_recortado + 1, 0, None)
+        return pd.Series(np.bincount(self._codigos, weights=dias, minlength=len(self.funcionarios)).astype(int),
+                         index=self.funcionarios)
+
+    def duracao_iniciados(self, inicio, fim):
+        """
+        Duração total (inclusive, sem recorte) dos intervalos de cada funcionário que começam em
+        [inicio, fim]. Devolve uma Series indexada por FuncionarioID.
+        """
+        if not len(self):
+            return pd.Series(dtype=float)
+        inicio_periodo, fim_periodo = _em_dias([inicio, fim]).astype(np.int64)
+        iniciados = (self._inicio >= inicio_periodo) & (self._inicio <= fim_periodo)
+        duracoes = np.where(iniciados, self._fim - self._inicio + 1, 0)
+        return pd.Series(np.bincount(self._codigos, weights=duracoes, minlength=len(self.funcionarios)),
+                         index=self.funcionarios)
+
+    def expandir(self, inicio, fim):
+        """
+        Pares (FuncionarioID, dia) cobertos em [inicio, fim], com o dia como deslocamento desde
+        `inicio` (0, 1, ...). Cada intervalo é recortado ao período e expandido sem iterar dia a dia.
+        """
+        if not len(self):
+            return self.funcionarios[[]].to_numpy(), np.empty(0, dtype=np.intp)
+        inicio_recortado, fim_recortado, inicio_periodo = self._recortar(inicio, fim)
+        validos = inicio_recortado <= fim_recortado
+        codigos = self._codigos[validos]
+        inicio_recortado = inicio_recortado[validos] - inicio_periodo
+        duracoes = (fim_recortado[validos] - inicio_periodo - inicio_recortado + 1).astype(np.intp)
+
+        codigos_exp = np.repeat(codigos, duracoes)
+        # Deslocamento de cada dia dentro do seu intervalo: 0, 1, ..., duracao-1
+        deslocamentos = np.arange(duracoes.sum()) - np.repeat(np.cumsum(duracoes) - duracoes, duracoes)
+        dias_exp = np.repeat(inicio_recortado, duracoes) + deslocamentos
+        return self.funcionarios[codigos_exp].to_numpy(), dias_exp.astype(np.intp)
@@ -0,0 +1,96 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PoolEsgotadoError(Exception):
+    """Nenhuma conexão ficou livre dentro do tempo de espera."""
+
+
+class PoolConexoes:
+    """
+    Pool limitado de conexões à base de dados.
+
+    Cada pedido obtém uma conexão só para si (checkout) e devolve-a no fim, pelo que
+    sessões diferentes nunca partilham cursores nem transações. As conexões são
+    criadas a pedido até ao tamanho máximo; as que estiveram paradas mais do que
+    `verificar_apos` segundos são testadas antes de serem entregues e substituídas
+    se já não responderem.
+    """
+
+    def __init__(self, criar_conexao, tamanho=10, tempo_espera=30, verificar_apos=60,
+                 consulta_verificacao="SELECT 1"):
+        self._criar_conexao = criar_conexao
+        self.tamanho = tamanho
+        self._tempo_espera = tempo_espera
+        self._verificar_apos = verificar_apos
+        self._consulta_verificacao = consulta_verificacao
+        self._livres = queue.LifoQueue()
+        self._vagas = threading.BoundedSemaphore(tamanho)
+
+    def _conexao_valida(self, conn):
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self._consulta_verificacao)
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _fechar(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _obter(self):
+        while True:
+            try:
+                conn, devolvida_em = self._livres.get_nowait()
+            except queue.Empty:
+                return self._criar_conexao()
+            if time.monotonic() - devolvida_em < self._verificar_apos or self._conexao_valida(conn):
+                return conn
+            self._fechar(conn)
+
+    @contextmanager
+    def conexao(self):
+        """Empresta uma conexão durante o bloco `with` e devolve-a ao pool no fim."""
+        if not self._vagas.acquire(timeout=self._tempo_espera):
+            raise PoolEsgotadoError(
+                f"Todas as {self.tamanho} conexões estão ocupadas há mais de {self._tempo_espera} s."
+            )
+        try:
+            conn = self._obter()
+            try:
+                yield conn
+            except BaseException:
+                # Uma conexão que já nem consegue fazer rollback está morta: descarta-se
+                try:
+                    conn.rollback()
+                except Exception:
+                    self._fechar(conn)
+                    raise
+                self._livres.put((conn, time.monotonic()))
+                raise
+            else:
+                try:
+                    # Não deixa transações pendentes para o próximo pedido
+                    conn.rollback()
+                except Exception:
+                    self._fechar(conn)
+                else:
+                    self._livres.put((conn, time.monotonic()))
+        finally:
+            self._vagas.release()
+
+    def fechar(self):
+        while True:
+            try:
+                conn, _ = self._livres.get_nowait()
+            except queue.Empty:
+                return
+            self._fechar(conn)
@@ -1,359 +1,782 @@
-import pyodbc
 import pandas as pd
 import os
-from datetime import datetime, date
-import sys
-
-DB_SERVER = '.\\SQLEXPRESS'
-DB_DATABASE = 'GestaoHoras'
-DB_DRIVER = '{ODBC Driver 17 for SQL Server}'
-
-conn_str = (
-    f"DRIVER={DB_DRIVER};"
-    f"SERVER={DB_SERVER};"
-    f"DATABASE={DB_DATABASE};"
-    "Trusted_Connection=yes;"
-    "TrustServerCertificate=yes;"
-)
-
-def get_next_funcionario_number(cursor):
+import re
+import json
+import hashlib
+import argparse
+import numbers
+from datetime import date, datetime
+
+import numpy as np
+import openpyxl
+
+import base_dados
+from base_dados import dialeto
+from registos_mensais import meses_afetados, recalcular_meses
+
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:  # Leitor rápido opcional; sem ele usa-se o openpyxl em modo read_only
+    CalamineWorkbook = None
+
+# Máximo de linhas por INSERT/UPDATE com VALUES (limite de 2100 parâmetros do SQL Server)
+TAMANHO_LOTE_FUNCIONARIOS = 500
+
+# Códigos com horas fixas, independentemente de TiposOcorrencia.HorasPadrao
+CODIGOS_TURNO_12H = ['N', 'D']
+CODIGOS_SEM_HORAS = ['F', 'L', 'B']
+
+COLUNAS_REGISTOS_DIARIOS = ['FuncionarioID', 'DataRegisto', 'TipoOcorrenciaID', 'HorasTrabalhadas',
+                            'HorasExtraDiarias', 'HorasAusencia', 'Observacoes']
+
+# Máximo de blocos por MERGE/INSERT do estado da importação (6 parâmetros por bloco)
+TAMANHO_LOTE_ESTADO = 300
+
+# Prefixos usados para encontrar a folha de um mês pelo nome (Jan, Janeiro, 01_Jan, ...)
+MESES_FOLHAS = ['jan', 'fev', 'mar', 'abr', 'mai', 'jun', 'jul', 'ago', 'set', 'out', 'nov', 'dez']
+
+def get_max_funcionario_number(numeros_funcionario):
     """
-    Obtém o próximo número de funcionário sequencial (F001, F002, etc.).
-    Considera os números existentes para encontrar o próximo disponível.
+    Devolve o maior número sequencial já atribuído (F001, F002, ...), ou 0 se não houver.
     """
-    try:
-        # Tenta encontrar o maior número existente no formato FXXX
-        cursor.execute("SELECT MAX(CAST(SUBSTRING(NumeroFuncionario, 2, LEN(NumeroFuncionario)) AS INT)) FROM Funcionarios WHERE NumeroFuncionario LIKE 'F%' AND ISNUMERIC(SUBSTRING(NumeroFuncionario, 2, LEN(NumeroFuncionario))) = 1")
-        max_num = cursor.fetchone()[0]
-        
-        if max_num is None:
-            next_num = 1
+    max_num = 0
+    for numero in numeros_funcionario:
+        if numero and re.fullmatch(r'F\d+', numero.strip()):
+            max_num = max(max_num, int(numero.strip()[1:]))
+    return max_num
+
+def provisionar_funcionarios(cnxn, nomes):
+    """
+    Garante que todos os nomes da folha existem em Funcionarios, com poucas idas à base de dados.
+
+    Lê todos os funcionários uma única vez para um índice nome -> (FuncionarioID, NumeroFuncionario),
+    atribui os números sequenciais FXXX a todos os nomes novos e aos que ainda têm um número
+    PENDENTE_ (pela ordem em que aparecem na folha), insere os novos num só lote com
+    OUTPUT INSERTED.FuncionarioID e renumera os pendentes com um único UPDATE. Faz um só commit.
+
+    Devolve (func_info, novos_funcionarios_inseridos, funcionarios_atualizados_com_id), em que
+    func_info mapeia cada nome para { 'FuncionarioID': ID, 'NumeroFuncionario': 'FXXX' }.
+    """
+    cursor = cnxn.cursor()
+    sqlite = dialeto(cnxn) == 'sqlite'
+    cursor.execute("SELECT FuncionarioID, NomeCompleto, NumeroFuncionario FROM Funcionarios")
+    # Chave sem distinção de maiúsculas, como a comparação NomeCompleto = ? no SQL Server
+    indice_por_nome = {}
+    numeros_existentes = []
+    for row in cursor.fetchall():
+        numeros_existentes.append(row.NumeroFuncionario)
+        if row.NomeCompleto is not None:
+            indice_por_nome.setdefault(row.NomeCompleto.strip().casefold(),
+                                       {'FuncionarioID': row.FuncionarioID, 'NumeroFuncionario': row.NumeroFuncionario})
+
+    proximo_num = get_max_funcionario_number(numeros_existentes) + 1
+    func_info = {}
+    a_inserir = []
+    a_renumerar = []
+    novos_funcionarios_inseridos = []
+    funcionarios_atualizados_com_id = []
+
+    for nome in dict.fromkeys(nomes):
+        existente = indice_por_nome.get(nome.casefold())
+        if existente is None:
+            novo_num = f"F{proximo_num:03d}"
+            proximo_num += 1
+            print(f"  INFO: Inserindo novo funcionário '{nome}' com NumeroFuncionario: '{novo_num}'")
+            # O FuncionarioID é preenchido a partir do OUTPUT do INSERT
+            indice_por_nome[nome.casefold()] = {'FuncionarioID': None, 'NumeroFuncionario': novo_num}
+            a_inserir.append((nome, novo_num))
+            novos_funcionarios_inseridos.append(f"{nome} (ID: {novo_num})")
+        elif existente['NumeroFuncionario'] and existente['NumeroFuncionario'].startswith('PENDENTE_'):
+            novo_num = f"F{proximo_num:03d}"
+            proximo_num += 1
+            print(f"  INFO: Atualizando NumeroFuncionario para '{nome}' de '{existente['NumeroFuncionario']}' para '{novo_num}'")
+            a_renumerar.append((existente['FuncionarioID'], novo_num))
+            funcionarios_atualizados_com_id.append(f"{nome} (ID Antigo: {existente['NumeroFuncionario']}, Novo ID: {novo_num})")
+            existente['NumeroFuncionario'] = novo_num
+        func_info[nome] = indice_por_nome[nome.casefold()]
+
+    for inicio in range(0, len(a_inserir), TAMANHO_LOTE_FUNCIONARIOS):
+        lote = a_inserir[inicio:inicio + TAMANHO_LOTE_FUNCIONARIOS]
+        valores = ", ".join(["(?, ?)"] * len(lote))
+        if sqlite:
+            consulta = (f"INSERT INTO Funcionarios (NomeCompleto, NumeroFuncionario) VALUES {valores} "
+                        f"RETURNING FuncionarioID, NomeCompleto")
+        else:
+            consulta = (f"INSERT INTO Funcionarios (NomeCompleto, NumeroFuncionario) "
+                        f"OUTPUT INSERTED.FuncionarioID, INSERTED.NomeCompleto "
+                        f"VALUES {valores}")
+        cursor.execute(consulta, [valor for linha in lote for valor in linha])
+        for row in cursor.fetchall():
+            func_info[row.NomeCompleto]['FuncionarioID'] = row.FuncionarioID
+
+    for inicio in range(0, len(a_renumerar), TAMANHO_LOTE_FUNCIONARIOS):
+        lote = a_renumerar[inicio:inicio + TAMANHO_LOTE_FUNCIONARIOS]
+        valores = ", ".join(["(?, ?)"] * len(lote))
+        if sqlite:
+            consulta = (f"WITH v(FuncionarioID, NumeroFuncionario) AS (VALUES {valores}) "
+                        f"UPDATE Funcionarios SET NumeroFuncionario = v.NumeroFuncionario "
+                        f"FROM v WHERE Funcionarios.FuncionarioID = v.FuncionarioID")
         else:
-            next_num = max_num + 1
-        
-        return f"F{next_num:03d}" # Formata para F001, F002, etc.
-    except Exception as e:
-        print(f"Erro ao obter o próximo número de funcionário: {e}")
-        # Retorna um número temporário em caso de erro grave, para não impedir a inserção
-        return f"ERROR_{datetime.now().strftime('%H%M%S')}"
+            consulta = (f"UPDATE f SET NumeroFuncionario = v.NumeroFuncionario "
+                        f"FROM Funcionarios f JOIN (VALUES {valores}) AS v(FuncionarioID, NumeroFuncionario) "
+                        f"ON f.FuncionarioID = v.FuncionarioID")
+        cursor.execute(consulta, [valor for linha in lote for valor in linha])
 
-try:
-    cnxn = pyodbc.connect(conn_str)
+    if a_inserir or a_renumerar:
+        cnxn.commit()
+
+    return func_info, novos_funcionarios_inseridos, funcionarios_atualizados_com_id
+
+def merge_registos_diarios(cnxn, registos_df):
+    """
+    Grava os registos diários em massa e devolve (inseridos, atualizados).
+
+    Os registos (um DataFrame com as COLUNAS_REGISTOS_DIARIOS) são copiados para uma tabela
+    temporária com fast_executemany e depois aplicados à RegistosDiarios com um único MERGE
+    pela chave (FuncionarioID, DataRegisto). Se a mesma chave aparecer mais do que uma vez,
+    prevalece a última ocorrência, tal como no antigo UPDATE/INSERT linha a linha.
+    """
+    registos_df = registos_df.drop_duplicates(subset=['FuncionarioID', 'DataRegisto'], keep='last')
+    # astype(object) entrega tipos Python nativos ao pyodbc (numpy.int64 não é aceite)
+    linhas = list(registos_df[COLUNAS_REGISTOS_DIARIOS].astype(object).itertuples(index=False, name=None))
+    if not linhas:
+        return 0, 0
+
+    if dialeto(cnxn) == 'sqlite':
+        return _merge_registos_diarios_sqlite(cnxn, linhas)
+
+    cursor = cnxn.cursor()
+    # A tabela temporária herda os tipos das colunas de RegistosDiarios
+    cursor.execute("""
+        SELECT TOP 0 FuncionarioID, DataRegisto, TipoOcorrenciaID, HorasTrabalhadas, HorasExtraDiarias, HorasAusencia, Observacoes
+        INTO #RegistosDiariosStaging
+        FROM RegistosDiarios
+    """)
+    try:
+        cursor.fast_executemany = True
+        cursor.executemany("""
+            INSERT INTO #RegistosDiariosStaging
+                (FuncionarioID, DataRegisto, TipoOcorrenciaID, HorasTrabalhadas, HorasExtraDiarias, HorasAusencia, Observacoes)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, linhas)
+
+        cursor.execute("""
+            SET NOCOUNT ON;
+            DECLARE @acoes TABLE (Acao NVARCHAR(10));
+
+            MERGE RegistosDiarios WITH (HOLDLOCK) AS destino
+            USING #RegistosDiariosStaging AS origem
+                ON destino.FuncionarioID = origem.FuncionarioID AND destino.DataRegisto = origem.DataRegisto
+            WHEN MATCHED THEN
+                UPDATE SET
+                    TipoOcorrenciaID = origem.TipoOcorrenciaID,
+                    HorasTrabalhadas = origem.HorasTrabalhadas,
+                    HorasExtraDiarias = origem.HorasExtraDiarias,
+                    HorasAusencia = origem.HorasAusencia,
+                    Observacoes = origem.Observacoes
+            WHEN NOT MATCHED BY TARGET THEN
+                INSERT (FuncionarioID, DataRegisto, TipoOcorrenciaID, HorasTrabalhadas, HorasExtraDiarias, HorasAusencia, Observacoes)
+                VALUES (origem.FuncionarioID, origem.DataRegisto, origem.TipoOcorrenciaID, origem.HorasTrabalhadas,
+                        origem.HorasExtraDiarias, origem.HorasAusencia, origem.Observacoes)
+            OUTPUT $action INTO @acoes;
+
+            SELECT
+                COALESCE(SUM(CASE WHEN Acao = 'INSERT' THEN 1 ELSE 0 END), 0) AS Inseridos,
+                COALESCE(SUM(CASE WHEN Acao = 'UPDATE' THEN 1 ELSE 0 END), 0) AS Atualizados
+            FROM @acoes;
+        """)
+        inseridos, atualizados = cursor.fetchone()
+    finally:
+        cursor.execute("DROP TABLE #RegistosDiariosStaging")
+    return inseridos, atualizados
+
+def _merge_registos_diarios_sqlite(cnxn, linhas):
+    # Equivalente ao MERGE com um upsert pelo índice único (FuncionarioID, DataRegisto); as contagens
+    # são feitas contra a tabela de passagem antes de a aplicar
     cursor = cnxn.cursor()
-    print("Conexão à base de dados SQL Server estabelecida com sucesso!")
+    cursor.execute("DROP TABLE IF EXISTS temp.RegistosDiariosStaging")
+    cursor.execute("""
+        CREATE TEMP TABLE RegistosDiariosStaging (FuncionarioID INT, DataRegisto DATE, TipoOcorrenciaID INT,
+            HorasTrabalhadas NUMERIC, HorasExtraDiarias NUMERIC, HorasAusencia NUMERIC, Observacoes TEXT)
+    """)
+    try:
+        cursor.executemany("""
+            INSERT INTO temp.RegistosDiariosStaging
+                (FuncionarioID, DataRegisto, TipoOcorrenciaID, HorasTrabalhadas, HorasExtraDiarias, HorasAusencia, Observacoes)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, linhas)
+        cursor.execute("""
+            SELECT COUNT(*) FROM temp.RegistosDiariosStaging origem
+            JOIN RegistosDiarios destino
+                ON destino.FuncionarioID = origem.FuncionarioID AND destino.DataRegisto = origem.DataRegisto
+        """)
+        atualizados = cursor.fetchone()[0]
+        cursor.execute("""
+            INSERT INTO RegistosDiarios
+                (FuncionarioID, DataRegisto, TipoOcorrenciaID, HorasTrabalhadas, HorasExtraDiarias, HorasAusencia, Observacoes)
+            SELECT FuncionarioID, DataRegisto, TipoOcorrenciaID, HorasTrabalhadas, HorasExtraDiarias, HorasAusencia, Observacoes
+            FROM temp.RegistosDiariosStaging WHERE true
+            ON CONFLICT (FuncionarioID, DataRegisto) DO UPDATE SET
+                TipoOcorrenciaID = excluded.TipoOcorrenciaID,
+                HorasTrabalhadas = excluded.HorasTrabalhadas,
+                HorasExtraDiarias = excluded.HorasExtraDiarias,
+                HorasAusencia = excluded.HorasAusencia,
+                Observacoes = excluded.Observacoes
+        """)
+    finally:
+        cursor.execute("DROP TABLE temp.RegistosDiariosStaging")
+    return len(linhas) - atualizados, atualizados
+
+def _mascaras_cabecalho(valores):
+    """Devolve (é data/hora, valor numérico ou NaN) para cada célula do cabeçalho."""
+    valores = pd.Series(list(valores), dtype=object)
+    e_datahora = valores.map(lambda v: isinstance(v, datetime)).to_numpy(dtype=bool)
+    e_numero = valores.map(lambda v: isinstance(v, numbers.Real) and not isinstance(v, bool)).to_numpy(dtype=bool)
+    numeros = pd.to_numeric(valores.where(e_numero & ~e_datahora), errors='coerce').to_numpy(dtype=float)
+    return e_datahora, numeros
+
+def _linha_e_cabecalho(valores, data_start_col_index=3, num_colunas=7):
+    """
+    Indica se as `num_colunas` células a partir de `data_start_col_index` são datas ou dias
+    consecutivos (cada dia é o anterior + 1, ou volta a 1 na mudança de mês).
+    """
+    celulas = list(valores)[data_start_col_index:data_start_col_index + num_colunas]
+    if len(celulas) < num_colunas:
+        return False
+    e_datahora, numeros = _mascaras_cabecalho(celulas)
+    e_dia = (numeros >= 1) & (numeros <= 31) & (numeros == np.floor(numeros))
+    seguidos = (numeros[1:] == numeros[:-1] + 1) | (numeros[1:] == 1) | e_datahora[1:] | e_datahora[:-1]
+    return bool((e_datahora | e_dia).all() and seguidos.all())
+
+def _linha_tem_codigos(valores, data_start_col_index=3, num_colunas=31):
+    """Indica se a linha tem algum código de ocorrência (texto) nos primeiros dias da escala."""
+    celulas = list(valores)[data_start_col_index:data_start_col_index + num_colunas]
+    return any(isinstance(v, str) and v.strip() for v in celulas)
+
+def detectar_linha_datas(df, data_start_col_index=3, max_linhas=50):
+    """
+    Procura a linha do cabeçalho de datas: a primeira linha de dias consecutivos seguida de
+    uma linha com códigos de ocorrência. Os quadros-resumo de turnos por cima da escala
+    também começam com uma linha de dias, mas seguida de contagens numéricas.
+    Devolve None se não houver.
+    """
+    linhas = df.iloc[:max_linhas + 1].to_numpy(dtype=object)
+    for row_idx in range(min(max_linhas, len(linhas) - 1)):
+        if _linha_e_cabecalho(linhas[row_idx], data_start_col_index) and \
+                _linha_tem_codigos(linhas[row_idx + 1], data_start_col_index):
+            return row_idx
+    return None
+
+def parse_datas_escala(linha_datas, ano, data_start_col_index=0, mes_inicial=1):
+    """
+    Converte a linha do cabeçalho de datas numa Series índice da coluna -> data.
 
-    # Carrega TiposOcorrencia com TipoID, Codigo, HorasPadrao
-    cursor.execute("SELECT TipoID, Codigo, HorasPadrao FROM TiposOcorrencia")
-    tipos_ocorrencia_data = {}
-    for row in cursor.fetchall():
-        tipos_ocorrencia_data[row.Codigo] = {
-            'TipoID': row.TipoID,
-            'HorasPadrao': row.HorasPadrao
-        }
-    print("\nTipos de Ocorrência carregados para mapeamento:")
-    for codigo, data in tipos_ocorrencia_data.items():
-        print(f"  {codigo}: TipoID={data['TipoID']}, HorasPadrao={data['HorasPadrao']}")
-
-    excel_file_path = '01Jan_12Dez_Escala_Geral_2025_AHD.xlsx'
-    
-    print(f"\nVerificando ficheiro Excel: '{excel_file_path}'")
-    current_working_directory = os.getcwd()
-    print(f"Diretório de trabalho atual do Python: {current_working_directory}")
-    
-    files_in_directory = os.listdir(current_working_directory)
-    print(f"Ficheiros encontrados no diretório de trabalho: {files_in_directory}")
-    
-    is_file_present = os.path.exists(os.path.join(current_working_directory, excel_file_path))
-    print(f"Os.path.exists('{excel_file_path}'): {is_file_present}")
-
-    dates_row_index = 11      # Linha 12 do Excel
-    employees_col_index = 1   # Coluna B do Excel
-    data_start_col_index = 3  # Coluna D do Excel
-    data_start_row_index = 12 # Linha 13 do Excel
-
-    if os.path.exists(excel_file_path):
-        try:
-            df = pd.read_excel(excel_file_path, header=None)
-
-            print(f"\nConteúdo da célula da primeira data (D12 no Excel, [11,3] no Pandas): '{df.iloc[dates_row_index, data_start_col_index]}'")
-            print(f"Tipo da célula da primeira data: <class '{type(df.iloc[dates_row_index, data_start_col_index]).__name__}'>")
-            
-            print(f"Conteúdo da célula do primeiro funcionário (B13 no Excel, [12,1] no Pandas): '{df.iloc[data_start_row_index, employees_col_index]}'")
-            print(f"Tipo da célula do primeiro funcionário: <class '{type(df.iloc[data_start_row_index, employees_col_index]).__name__}'>")
-            
-
-            dates = []
-            fixed_year = 2025      # Ano fixo
-            current_month = 1      # Começamos com Janeiro
-            last_day_value = 0     # Para detetar a mudança de mês
-
-            for col_idx in range(data_start_col_index, df.shape[1]):
-                cell_value = df.iloc[dates_row_index, col_idx]
-                
-                if not isinstance(cell_value, (int, float, datetime)):
-                    print(f"INFO: Parando a leitura de datas na coluna {col_idx} (valor: '{cell_value}', tipo: <class '{type(cell_value).__name__}'>), pois não é um número ou data.")
-                    break 
-
-                if pd.isna(cell_value):
-                    print(f"INFO: Parando a leitura de datas na coluna {col_idx} (valor: {cell_value}), pois está vazia.")
-                    break
+    A leitura pára na primeira célula vazia ou que não seja número/data. Os números são dias
+    do mês, a começar em `mes_inicial`: o mês avança quando o dia volta a ser menor (p.ex. 31 -> 1);
+    uma célula com data completa fixa o mês das seguintes. Um dia que não existe no mês corrente passa para o mês
+    seguinte, como na leitura coluna a coluna.
+    """
+    e_datahora, numeros = _mascaras_cabecalho(linha_datas)
+    validos = e_datahora | ~np.isnan(numeros)
+    fim = len(validos) if validos.all() else int(np.argmin(validos))
+    if fim < len(validos):
+        print(f"INFO: Parando a leitura de datas na coluna {data_start_col_index + fim}, pois não é um número ou data.")
+    e_datahora, numeros = e_datahora[:fim], numeros[:fim]
+    colunas = np.arange(data_start_col_index, data_start_col_index + fim)
+
+    datahoras = pd.to_datetime(pd.Series(list(linha_datas)[:fim], dtype=object).where(e_datahora))
+    dias = np.where(e_datahora, datahoras.dt.day.fillna(0), np.nan_to_num(numeros)).astype(int)
+    dia_anterior = np.concatenate(([0], dias[:-1]))
+    viradas = ~e_datahora & (dias <= dia_anterior) & (dia_anterior > 0) & (dias < 10)
+
+    # Cada célula com data completa abre um troço cujo mês de partida é o dela
+    troco = np.cumsum(e_datahora)
+    mes_base = pd.Series(np.where(e_datahora, datahoras.dt.month.fillna(0), np.nan)).groupby(troco).transform('first').fillna(mes_inicial).to_numpy()
+    viradas_no_troco = pd.Series(viradas).groupby(troco).cumsum().to_numpy()
+
+    ajuste = np.zeros(fim, dtype=int)
+    ajustadas = np.zeros(fim, dtype=bool)
+    while True:
+        meses = ((mes_base + viradas_no_troco + ajuste - 1) % 12 + 1).astype(int)
+        datas = pd.to_datetime(pd.DataFrame({'year': ano, 'month': meses, 'day': dias}), errors='coerce')
+        datas = datas.where(~e_datahora, datahoras.dt.normalize())
+        falhas = np.flatnonzero(datas.isna().to_numpy() & ~ajustadas)
+        if not len(falhas):
+            break
+        # Dia fora do mês: esta coluna e as seguintes do mesmo troço passam para o mês seguinte
+        primeira = falhas[0]
+        ajuste[primeira:][troco[primeira:] == troco[primeira]] += 1
+        ajustadas[primeira] = True
+
+    invalidas = datas.isna().to_numpy()
+    for col_idx, dia, mes in zip(colunas[invalidas], dias[invalidas], meses[invalidas]):
+        print(f"AVISO: Data inválida (dia {dia}, mês {mes}, ano {ano}). Coluna {col_idx}. Ignorando.")
+    return pd.Series(datas.dt.date.to_numpy()[~invalidas], index=colunas[~invalidas])
+
+def nomes_funcionarios_escala(df, data_start_row_index, employees_col_index=1):
+    """Nomes da coluna de funcionários, da primeira linha de dados até ao primeiro nome em branco."""
+    nomes = df.iloc[data_start_row_index:, employees_col_index]
+    nomes = nomes.where(nomes.notna(), '').astype(str).str.strip()
+    vazios = (nomes == '').to_numpy()
+    fim = int(np.argmax(vazios)) if vazios.any() else len(nomes)
+    return nomes.iloc[:fim].reset_index(drop=True)
+
+def parse_escala(df, tipos_ocorrencia_data, ano, dates_row_index=None, employees_col_index=1,
+                 data_start_col_index=3, data_start_row_index=None, mes_inicial=1):
+    """
+    Converte a folha da escala (lida com header=None) nos registos diários a gravar.
+
+    A matriz funcionário × dia é desdobrada numa tabela longa de uma só vez e os códigos
+    são cruzados com TiposOcorrencia (`tipos_ocorrencia_data`: Codigo -> {'TipoID', 'HorasPadrao'})
+    por junção. N/D contam 12h e F/L/B contam 0h; os restantes usam HorasPadrao.
+    Se `dates_row_index` não for indicado, a linha das datas é detetada; os dados começam
+    por omissão na linha seguinte. Numa folha de um só mês, `mes_inicial` indica esse mês.
+
+    Devolve um DataFrame com NomeCompleto, Codigo e as COLUNAS_REGISTOS_DIARIOS exceto
+    FuncionarioID, pela ordem da folha (funcionário a funcionário).
+    """
+    if dates_row_index is None:
+        dates_row_index = detectar_linha_datas(df, data_start_col_index)
+        if dates_row_index is None:
+            raise ValueError("Não foi encontrada a linha das datas na folha da escala.")
+    if data_start_row_index is None:
+        data_start_row_index = dates_row_index + 1
+
+    datas = parse_datas_escala(df.iloc[dates_row_index, data_start_col_index:], ano, data_start_col_index, mes_inicial)
+    nomes = nomes_funcionarios_escala(df, data_start_row_index, employees_col_index)
+
+    bloco = df.iloc[data_start_row_index:data_start_row_index + len(nomes), datas.index].to_numpy(dtype=object)
+    registos = pd.DataFrame({
+        'NomeCompleto': np.repeat(nomes.to_numpy(), len(datas)),
+        'DataRegisto': np.tile(datas.to_numpy(), len(nomes)),
+        'Codigo': bloco.ravel(),
+    })
+    registos = registos[registos['Codigo'].notna()]
+    registos['Codigo'] = registos['Codigo'].astype(str).str.strip().str.upper()
+    registos = registos[registos['Codigo'] != '']
+
+    tipos = pd.DataFrame(
+        [(codigo, info['TipoID'], info['HorasPadrao']) for codigo, info in tipos_ocorrencia_data.items()],
+        columns=['Codigo', 'TipoOcorrenciaID', 'HorasPadrao'],
+    )
+    registos = registos.merge(tipos, on='Codigo', how='left')
+
+    nao_mapeados = registos['TipoOcorrenciaID'].isna()
+    for codigo, grupo in registos[nao_mapeados].groupby('Codigo', sort=False):
+        primeiro = grupo.iloc[0]
+        print(f"    AVISO: Código de ocorrência '{codigo}' não mapeado/encontrado em TiposOcorrencia "
+              f"({len(grupo)} células, p.ex. {primeiro['NomeCompleto']} em {primeiro['DataRegisto']}).")
+    registos = registos[~nao_mapeados].reset_index(drop=True)
+    registos['TipoOcorrenciaID'] = registos['TipoOcorrenciaID'].astype(tipos['TipoOcorrenciaID'].dtype)
+
+    horas = registos['HorasPadrao'].astype(float).fillna(0.0)
+    horas = horas.mask(registos['Codigo'].isin(CODIGOS_TURNO_12H), 12.0)
+    horas = horas.mask(registos['Codigo'].isin(CODIGOS_SEM_HORAS), 0.0)
+
+    return pd.DataFrame({
+        'NomeCompleto': registos['NomeCompleto'],
+        'Codigo': registos['Codigo'],
+        'DataRegisto': registos['DataRegisto'],
+        'TipoOcorrenciaID': registos['TipoOcorrenciaID'],
+        'HorasTrabalhadas': horas,
+        'HorasExtraDiarias': 0.0,
+        'HorasAusencia': 0.0,
+        'Observacoes': "",
+    })
+
+def mes_da_folha(folha):
+    """
+    Devolve o mês (1 a 12) de uma folha, indicada pelo número do mês ou pelo nome
+    (abreviatura do mês no início, p.ex. 'Jan', 'FEV_SVC2025', ou número, p.ex. '01 Jan'), ou None.
+    """
+    if isinstance(folha, numbers.Integral):
+        return int(folha) if 1 <= folha <= 12 else None
+    normalizado = str(folha).strip().casefold()
+    numero = re.match(r'\d+', normalizado)
+    if numero:
+        return int(numero.group()) if 1 <= int(numero.group()) <= 12 else None
+    for mes, prefixo in enumerate(MESES_FOLHAS, start=1):
+        if normalizado.startswith(prefixo):
+            return mes
+    return None
+
+def escolher_folha(nomes_folhas, folha=None):
+    """
+    Devolve o nome da folha a ler. `folha` pode ser o nome da folha, o número do mês (1 a 12)
+    ou None para a primeira folha. Para um mês, escolhe a primeira folha cujo nome corresponde
+    a esse mês (ver mes_da_folha).
+    """
+    if folha is None:
+        return nomes_folhas[0]
+    if isinstance(folha, str) and not folha.strip().isdigit():
+        if folha not in nomes_folhas:
+            raise ValueError(f"A folha '{folha}' não existe no ficheiro. Folhas disponíveis: {nomes_folhas}")
+        return folha
+
+    mes = int(folha)
+    if not 1 <= mes <= 12:
+        raise ValueError(f"Mês inválido: {folha}. Indique um número de 1 a 12.")
+    for nome in nomes_folhas:
+        if mes_da_folha(nome) == mes:
+            return nome
+    raise ValueError(f"Não foi encontrada nenhuma folha para o mês {mes}. Folhas disponíveis: {nomes_folhas}")
+
+def _linhas_openpyxl(caminho, folha):
+    wb = openpyxl.load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        ws = wb[escolher_folha(wb.sheetnames, folha)]
+        for valores in ws.iter_rows(values_only=True):
+            yield valores
+    finally:
+        wb.close()
+
+def _linhas_calamine(caminho, folha):
+    wb = CalamineWorkbook.from_path(caminho)
+    sheet = wb.get_sheet_by_name(escolher_folha(wb.sheet_names, folha))
+    if sheet.start is None:
+        return
+    # O calamine começa na primeira célula preenchida; repõem-se as posições absolutas
+    linha_inicial, coluna_inicial = sheet.start
+    for _ in range(linha_inicial):
+        yield ()
+    for valores in sheet.iter_rows():
+        yield [None] * coluna_inicial + [
+            None if v == '' else datetime.combine(v, datetime.min.time())
+            if isinstance(v, date) and not isinstance(v, datetime) else v
+            for v in valores
+        ]
+
+def ler_folha_escala(caminho, folha=None, dates_row_index=None, employees_col_index=1,
+                     data_start_col_index=3, data_start_row_index=None, motor=None, max_linhas_cabecalho=50):
+    """
+    Lê a folha da escala em modo streaming, sem carregar o livro inteiro para memória.
 
-                try:
-                    date_obj = None
-                    if isinstance(cell_value, (int, float)): 
-                        day = int(cell_value)
-                        
-                        # Lógica para detetar mudança de mês, considerando anos bissextos e fim de mês
-                        if day <= last_day_value and last_day_value > 0 and day < 10: 
-                            current_month += 1
-                            if current_month > 12:
-                                current_month = 1 
-                        
-                        try:
-                            date_obj = date(fixed_year, current_month, day)
-                        except ValueError as ve:
-                            if "day is out of range for month" in str(ve):
-                                current_month += 1
-                                if current_month > 12:
-                                    current_month = 1
-                                try:
-                                    date_obj = date(fixed_year, current_month, day)
-                                except ValueError:
-                                    print(f"AVISO: Data inválida mesmo após tentar próximo mês (dia {day}, mês {current_month}, ano {fixed_year}). Coluna {col_idx}. Ignorando.")
-                                    continue
-                            else:
-                                print(f"AVISO: Erro de valor ao criar data (dia {day}, mês {current_month}, ano {fixed_year}). Coluna {col_idx}. Erro: {ve}. Ignorando.")
-                                continue
-                        
-                        last_day_value = day
-                    
-                    elif isinstance(cell_value, datetime):
-                        date_obj = cell_value.date()
-                        current_month = date_obj.month
-                        last_day_value = date_obj.day
-                    
-                    elif isinstance(cell_value, str):
-                        try:
-                            day_str, month_str = map(int, cell_value.split('/'))
-                            date_obj = date(fixed_year, month_str, day_str)
-                            current_month = date_obj.month
-                            last_day_value = date_obj.day
-                        except ValueError:
-                            try:
-                                date_obj = datetime.strptime(cell_value.split(' ')[0], '%d/%m/%Y').date()
-                                current_month = date_obj.month
-                                last_day_value = date_obj.day
-                            except ValueError:
-                                print(f"AVISO: Não foi possível parsear a string da data '{cell_value}'. Coluna {col_idx}. Ignorando.")
-                                continue
-                    
-                    if date_obj:
-                        dates.append((col_idx, date_obj))
-
-                except Exception as e:
-                    print(f"AVISO: Erro inesperado ao processar célula de data na coluna {col_idx} (valor: '{cell_value}', tipo: <class '{type(cell_value).__name__}'>). Erro: {e}")
-                    continue
-            
-            print(f"\nDatas extraídas (ano ajustado para {fixed_year}):")
-            if not dates:
-                print("  Nenhuma data foi extraída. Verifique a linha das datas no Excel.")
+    Só são guardadas a linha das datas e o bloco de funcionários, desde `data_start_row_index`
+    até ao primeiro nome em branco; a leitura termina aí. As restantes linhas ficam vazias para
+    manter as posições de pd.read_excel(header=None), pelo que o resultado pode ser passado
+    diretamente a parse_escala. `motor` é 'calamine' ou 'openpyxl' (None = calamine se estiver
+    instalado). A folha escolhe-se pelo nome ou pelo número do mês (ver escolher_folha).
+    """
+    if motor is None:
+        motor = 'calamine' if CalamineWorkbook is not None else 'openpyxl'
+    if motor == 'calamine':
+        if CalamineWorkbook is None:
+            raise ValueError("O motor 'calamine' requer o pacote python-calamine.")
+        linhas = _linhas_calamine(caminho, folha)
+    elif motor == 'openpyxl':
+        linhas = _linhas_openpyxl(caminho, folha)
+    else:
+        raise ValueError(f"Motor de leitura desconhecido: '{motor}'.")
+
+    materializadas = []
+    anterior = []
+    try:
+        for row_idx, valores in enumerate(linhas):
+            valores = list(valores)
+            # Formatação sem conteúdo alarga as linhas com células vazias à direita
+            while valores and valores[-1] is None:
+                valores.pop()
+
+            if dates_row_index is None:
+                if row_idx > max_linhas_cabecalho:
+                    break
+                # Mesmo critério de detectar_linha_datas, aplicado à medida que as linhas chegam
+                if _linha_e_cabecalho(anterior, data_start_col_index) and _linha_tem_codigos(valores, data_start_col_index):
+                    dates_row_index = row_idx - 1
+                    materializadas[dates_row_index] = anterior
+                anterior = valores
+            inicio_dados = data_start_row_index
+            if inicio_dados is None and dates_row_index is not None:
+                inicio_dados = dates_row_index + 1
+
+            if row_idx == dates_row_index:
+                materializadas.append(valores)
+            elif inicio_dados is not None and row_idx >= inicio_dados:
+                nome = valores[employees_col_index] if len(valores) > employees_col_index else None
+                if nome is None or str(nome).strip() == '':
+                    break
+                materializadas.append(valores)
             else:
-                for col_idx, d_date in dates:
-                    print(f"  Coluna {col_idx}, Data: {d_date}")
+                materializadas.append([])
+    finally:
+        # Fecha o livro sem ler o resto da folha
+        linhas.close()
 
-            print("\nProcessando registos de funcionários:")
-            registos_para_processar = []
-            novos_funcionarios_inseridos = []
-            funcionarios_atualizados_com_id = []
+    if dates_row_index is None:
+        raise ValueError("Não foi encontrada a linha das datas na folha da escala.")
+    return pd.DataFrame(materializadas)
 
-            # Mapeamento de nome de funcionário para FuncionarioID para evitar consultas repetidas
-            func_info_cache = {} # Agora vai guardar { 'FuncionarioID': ID, 'NumeroFuncionario': 'FXXX' }
+def _hash_celulas(celulas):
+    return hashlib.sha256("\n".join(f"{data}={codigo}" for data, codigo in sorted(celulas.items())).encode('utf-8')).hexdigest()
 
-            for row_idx in range(data_start_row_index, df.shape[0]):
-                employee_name = df.iloc[row_idx, employees_col_index]
+def hash_tipos_ocorrencia(tipos_ocorrencia_data):
+    """Hash do mapeamento de códigos: se TiposOcorrencia mudar, todos os blocos voltam a ser gravados."""
+    return _hash_celulas({codigo: f"{info['TipoID']}/{info['HorasPadrao']}" for codigo, info in tipos_ocorrencia_data.items()})
 
-                if pd.isna(employee_name) or str(employee_name).strip() == '':
-                    break
+def _datas_iso(registos_df):
+    return pd.to_datetime(registos_df['DataRegisto']).dt.strftime('%Y-%m-%d').to_numpy(dtype=object)
 
-                employee_name = str(employee_name).strip()
-                print(f"  Funcionário: {employee_name}")
-
-                # Tenta obter FuncionarioID e NumeroFuncionario do cache primeiro
-                func_data = func_info_cache.get(employee_name)
-
-                if func_data is None: # Se não está no cache, consulta a DB
-                    cursor.execute("SELECT FuncionarioID, NumeroFuncionario FROM Funcionarios WHERE NomeCompleto = ?", employee_name)
-                    result = cursor.fetchone()
-                    
-                    if result:
-                        func_id = result.FuncionarioID
-                        num_func_existente = result.NumeroFuncionario
-                        
-                        # Se existe mas o NumeroFuncionario é PENDENTE, atualiza
-                        if num_func_existente and num_func_existente.startswith('PENDENTE_'):
-                            new_num_func = get_next_funcionario_number(cursor)
-                            print(f"  INFO: Atualizando NumeroFuncionario para '{employee_name}' de '{num_func_existente}' para '{new_num_func}'")
-                            cursor.execute(
-                                "UPDATE Funcionarios SET NumeroFuncionario = ? WHERE FuncionarioID = ?", 
-                                new_num_func, func_id
-                            )
-                            cnxn.commit() # Comita a atualização do funcionário imediatamente
-                            funcionarios_atualizados_com_id.append(f"{employee_name} (ID Antigo: {num_func_existente}, Novo ID: {new_num_func})")
-                            func_data = {'FuncionarioID': func_id, 'NumeroFuncionario': new_num_func}
-                        else:
-                            func_data = {'FuncionarioID': func_id, 'NumeroFuncionario': num_func_existente}
-                            
-                    else:
-                        # Se o funcionário não existe, gera um novo NumeroFuncionario e insere-o
-                        new_num_func = get_next_funcionario_number(cursor)
-                        print(f"  INFO: Inserindo novo funcionário '{employee_name}' com NumeroFuncionario: '{new_num_func}'")
-                        cursor.execute(
-                            "INSERT INTO Funcionarios (NomeCompleto, NumeroFuncionario) VALUES (?, ?)", 
-                            employee_name, new_num_func
-                        )
-                        cnxn.commit() # Comita a inserção do funcionário imediatamente
-                        cursor.execute("SELECT FuncionarioID FROM Funcionarios WHERE NomeCompleto = ?", employee_name)
-                        func_id = cursor.fetchone().FuncionarioID
-                        novos_funcionarios_inseridos.append(f"{employee_name} (ID: {new_num_func})")
-                        func_data = {'FuncionarioID': func_id, 'NumeroFuncionario': new_num_func}
-                    
-                    func_info_cache[employee_name] = func_data # Adiciona ao cache
-
-
-                for col_idx, current_date in dates:
-                    ocorrencia_code = df.iloc[row_idx, col_idx]
-
-                    if pd.notna(ocorrencia_code) and str(ocorrencia_code).strip() != '':
-                        ocorrencia_code_str = str(ocorrencia_code).strip().upper()
-
-                        if ocorrencia_code_str in tipos_ocorrencia_data:
-                            ocorrencia_info = tipos_ocorrencia_data[ocorrencia_code_str]
-                            
-                            horas_trabalhadas = float(ocorrencia_info['HorasPadrao']) if ocorrencia_info['HorasPadrao'] is not None else 0.00
-                            horas_extra_diarias = 0.00 
-                            horas_ausencia = 0.00 
-                            observacoes = "" 
-
-                            if ocorrencia_code_str in ['N', 'D']:
-                                horas_trabalhadas = 12.00
-                                horas_ausencia = 0.00 
-                            elif ocorrencia_code_str in ['F', 'L', 'B']:
-                                horas_trabalhadas = 0.00 
-                                horas_ausencia = 0.00 
-
-                            registos_para_processar.append({
-                                'FuncionarioID': func_data['FuncionarioID'], 
-                                'DataRegisto': current_date,
-                                'TipoOcorrenciaID': ocorrencia_info['TipoID'],
-                                'HorasTrabalhadas': horas_trabalhadas,
-                                'HorasExtraDiarias': horas_extra_diarias,
-                                'HorasAusencia': horas_ausencia,
-                                'Observacoes': observacoes
-                            })
-                        else:
-                            print(f"    AVISO: Código de ocorrência '{ocorrencia_code_str}' não mapeado/encontrado em TiposOcorrencia para {employee_name} em {current_date}.")
-
-            if registos_para_processar:
-                print(f"\nTotal de {len(registos_para_processar)} registos prontos para processamento (UPSERT).")
-                
-                total_inseridos = 0
-                total_atualizados = 0
-                
-                for reg in registos_para_processar:
-                    func_id = reg['FuncionarioID'] 
-                    data_registo = reg['DataRegisto']
-                    tipo_ocorrencia_id = reg['TipoOcorrenciaID']
-                    horas_trabalhadas = reg['HorasTrabalhadas']
-                    horas_extra_diarias = reg['HorasExtraDiarias']
-                    horas_ausencia = reg['HorasAusencia']
-                    observacoes = reg['Observacoes']
-
-                    # Tenta atualizar primeiro
-                    update_sql = """
-                    UPDATE RegistosDiarios
-                    SET 
-                        TipoOcorrenciaID = ?,
-                        HorasTrabalhadas = ?,
-                        HorasExtraDiarias = ?,
-                        HorasAusencia = ?,
-                        Observacoes = ?
-                    WHERE FuncionarioID = ? AND DataRegisto = ?
-                    """
-                    cursor.execute(update_sql, 
-                                   tipo_ocorrencia_id, 
-                                   horas_trabalhadas, 
-                                   horas_extra_diarias, 
-                                   horas_ausencia, 
-                                   observacoes,
-                                   func_id, 
-                                   data_registo)
-                    
-                    if cursor.rowcount == 0:
-                        # Se nenhuma linha foi atualizada, significa que o registo não existe, então insere
-                        insert_sql = """
-                        INSERT INTO RegistosDiarios (
-                            FuncionarioID,
-                            DataRegisto,
-                            TipoOcorrenciaID,
-                            HorasTrabalhadas,
-                            HorasExtraDiarias,
-                            HorasAusencia,
-                            Observacoes
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?)
-                        """
-                        cursor.execute(insert_sql, 
-                                       func_id, 
-                                       data_registo, 
-                                       tipo_ocorrencia_id, 
-                                       horas_trabalhadas, 
-                                       horas_extra_diarias, 
-                                       horas_ausencia, 
-                                       observacoes)
-                        total_inseridos += 1
-                    else:
-                        total_atualizados += 1
-                
-                cnxn.commit()
-                print(f"SUCESSO: Processamento de registos concluído. {total_inseridos} inseridos, {total_atualizados} atualizados na base de dados 'RegistosDiarios'.")
-            else:
-                print("\nNenhum registo encontrado para inserir/atualizar na base de dados.")
-
-            if novos_funcionarios_inseridos or funcionarios_atualizados_com_id:
-                print("\n--- RESUMO DE ATRIBUIÇÃO DE NÚMERO DE FUNCIONÁRIO ---")
-                if novos_funcionarios_inseridos:
-                    print("Os seguintes funcionários foram INSERIDOS com um novo número de funcionário sequencial:")
-                    for func_info in novos_funcionarios_inseridos:
-                        print(f"- {func_info}")
-                if funcionarios_atualizados_com_id:
-                    print("Os seguintes funcionários tiveram o seu NumeroFuncionario ATUALIZADO para um sequencial:")
-                    for func_info in funcionarios_atualizados_com_id:
-                        print(f"- {func_info}")
-                print("---------------------------------------------------------------")
-
-        except FileNotFoundError:
-            print(f"Erro: O ficheiro Excel '{excel_file_path}' NÃO foi encontrado. Verifique novamente a pasta e o nome.")
-        except Exception as e:
-            print(f"Erro ao ler ou processar o ficheiro Excel: {e}")
-            import traceback
-            traceback.print_exc()
+def blocos_escala(registos_df):
+    """
+    Agrupa os registos da escala em blocos (funcionário, mês).
+    Devolve { 'Nome|AAAA-MM': { 'hash': ..., 'celulas': { 'AAAA-MM-DD': 'CODIGO' } } }.
+    """
+    if registos_df.empty:
+        return {}
+    datas = _datas_iso(registos_df)
+    chaves = (registos_df['NomeCompleto'] + '|' + pd.Series(datas, index=registos_df.index).str[:7]).to_numpy(dtype=object)
+    codigos = registos_df['Codigo'].to_numpy(dtype=object)
+
+    ordem = np.argsort(chaves, kind='stable')
+    chaves, datas, codigos = chaves[ordem], datas[ordem], codigos[ordem]
+    limites = np.flatnonzero(chaves[1:] != chaves[:-1]) + 1
+    blocos = {}
+    for chave, datas_bloco, codigos_bloco in zip(chaves[np.concatenate(([0], limites))],
+                                                 np.split(datas, limites), np.split(codigos, limites)):
+        conteudo = dict(zip(datas_bloco.tolist(), codigos_bloco.tolist()))
+        blocos[chave] = {'hash': _hash_celulas(conteudo), 'celulas': conteudo}
+    return blocos
+
+def _chave_bloco_bd(chave, ids_por_nome):
+    nome, mes = chave.rsplit('|', 1)
+    return ids_por_nome[nome], int(mes[:4]), int(mes[5:7])
+
+def carregar_blocos_importados(cnxn, blocos, ids_por_nome, hash_tipos):
+    """
+    Estado da última importação dos blocos da folha, lido da tabela ImportacaoEscalaBlocos da
+    base de dados de destino, no formato de blocos_escala. Blocos gravados com outro mapeamento
+    de TiposOcorrencia contam como não importados.
+    """
+    chaves = {_chave_bloco_bd(chave, ids_por_nome): chave for chave in blocos}
+    cursor = cnxn.cursor()
+    anteriores = {}
+    for ano, mes in sorted({(ano, mes) for _, ano, mes in chaves}):
+        cursor.execute("SELECT FuncionarioID, Hash, HashTipos, Celulas FROM ImportacaoEscalaBlocos "
+                       "WHERE Ano = ? AND Mes = ?", (ano, mes))
+        for row in cursor.fetchall():
+            chave = chaves.get((row.FuncionarioID, ano, mes))
+            if chave is not None and row.HashTipos == hash_tipos:
+                anteriores[chave] = {'hash': row.Hash, 'celulas': json.loads(row.Celulas)}
+    return anteriores
+
+def gravar_blocos_importados(cnxn, blocos, ids_por_nome, hash_tipos):
+    """
+    Grava em ImportacaoEscalaBlocos o estado dos blocos indicados, sem fazer commit: o importador
+    grava-o na transação do MERGE, pelo que o estado corresponde sempre ao que está nesta base de dados.
+    """
+    linhas = {}
+    for chave, bloco in blocos.items():
+        linhas[_chave_bloco_bd(chave, ids_por_nome)] = (
+            bloco['hash'], hash_tipos, json.dumps(bloco['celulas'], ensure_ascii=False, separators=(',', ':')))
+    linhas = [chave + valores for chave, valores in linhas.items()]
+    cursor = cnxn.cursor()
+    sqlite = dialeto(cnxn) == 'sqlite'
+    for inicio in range(0, len(linhas), TAMANHO_LOTE_ESTADO):
+        lote = linhas[inicio:inicio + TAMANHO_LOTE_ESTADO]
+        valores = ", ".join(["(?, ?, ?, ?, ?, ?)"] * len(lote))
+        if sqlite:
+            consulta = (f"INSERT INTO ImportacaoEscalaBlocos (FuncionarioID, Ano, Mes, Hash, HashTipos, Celulas) "
+                        f"VALUES {valores} "
+                        f"ON CONFLICT (FuncionarioID, Ano, Mes) DO UPDATE SET "
+                        f"Hash = excluded.Hash, HashTipos = excluded.HashTipos, Celulas = excluded.Celulas")
+        else:
+            consulta = (f"MERGE ImportacaoEscalaBlocos WITH (HOLDLOCK) AS destino "
+                        f"USING (VALUES {valores}) AS origem (FuncionarioID, Ano, Mes, Hash, HashTipos, Celulas) "
+                        f"ON destino.FuncionarioID = origem.FuncionarioID AND destino.Ano = origem.Ano AND destino.Mes = origem.Mes "
+                        f"WHEN MATCHED THEN UPDATE SET Hash = origem.Hash, HashTipos = origem.HashTipos, Celulas = origem.Celulas "
+                        f"WHEN NOT MATCHED THEN INSERT (FuncionarioID, Ano, Mes, Hash, HashTipos, Celulas) "
+                        f"VALUES (origem.FuncionarioID, origem.Ano, origem.Mes, origem.Hash, origem.HashTipos, origem.Celulas);")
+        cursor.execute(consulta, [valor for linha in lote for valor in linha])
+
+def filtrar_alteracoes(registos_df, blocos, blocos_anteriores):
+    """
+    Compara os blocos da folha com os da última importação e devolve (registos a gravar, resumo).
 
-    else:
-        print(f"Erro: O ficheiro Excel '{excel_file_path}' NÃO foi encontrado pelo os.path.exists. Verifique a pasta e o nome.")
-
-    cursor.close()
-    cnxn.close()
-    print("\nConexão à base de dados fechada.")
-
-except pyodbc.Error as ex:
-    sqlstate = ex.args[0]
-    if sqlstate == '08001':
-        print("Erro de conexão (08001): O servidor ou instância não foi encontrado ou não está acessível.")
-    elif sqlstate == '28000':
-        print("Erro de autenticação (28000): Credenciais incorretas ou acesso negado.")
-    else:
-        print(f"Ocorreu um erro na base de dados: {ex}")
-    import traceback
-    traceback.print_exc()
+    Blocos com o mesmo hash são ignorados; nos restantes só seguem as células novas ou com
+    outro código. Células que desapareceram da folha são contadas no resumo mas não são
+    apagadas da base de dados, tal como numa importação completa.
+    """
+    resumo = {'iguais': 0, 'novos': 0, 'alterados': [], 'celulas_novas': 0, 'celulas_alteradas': 0, 'celulas_removidas': 0}
+    a_gravar = set()
+    for chave, bloco in blocos.items():
+        anterior = blocos_anteriores.get(chave)
+        if anterior is not None and anterior['hash'] == bloco['hash']:
+            resumo['iguais'] += 1
+            continue
+        celulas_anteriores = anterior['celulas'] if anterior is not None else {}
+        novas = [d for d in bloco['celulas'] if d not in celulas_anteriores]
+        alteradas = [d for d, c in bloco['celulas'].items() if d in celulas_anteriores and celulas_anteriores[d] != c]
+        removidas = [d for d in celulas_anteriores if d not in bloco['celulas']]
+        if anterior is None:
+            resumo['novos'] += 1
+        else:
+            resumo['alterados'].append((chave, len(novas), len(alteradas), len(removidas)))
+        resumo['celulas_novas'] += len(novas)
+        resumo['celulas_alteradas'] += len(alteradas)
+        resumo['celulas_removidas'] += len(removidas)
+        nome = chave.rsplit('|', 1)[0]
+        a_gravar.update((nome, d) for d in novas + alteradas)
+
+    if not a_gravar:
+        return registos_df.iloc[0:0], resumo
+    chaves = zip(registos_df['NomeCompleto'], _datas_iso(registos_df))
+    return registos_df[[chave in a_gravar for chave in chaves]], resumo
+
+def imprimir_resumo_alteracoes(resumo):
+    print("\n--- RESUMO DA IMPORTAÇÃO INCREMENTAL ---")
+    print(f"Blocos (funcionário, mês) sem alterações: {resumo['iguais']}")
+    print(f"Blocos novos: {resumo['novos']}")
+    print(f"Blocos alterados: {len(resumo['alterados'])}")
+    for chave, novas, alteradas, removidas in resumo['alterados']:
+        nome, mes = chave.rsplit('|', 1)
+        print(f"- {nome} ({mes}): {novas} novas, {alteradas} alteradas, {removidas} removidas na folha")
+    print(f"Células a gravar: {resumo['celulas_novas']} novas, {resumo['celulas_alteradas']} alteradas.")
+    if resumo['celulas_removidas']:
+        print(f"AVISO: {resumo['celulas_removidas']} células foram apagadas na folha; os registos correspondentes "
+              f"não são removidos da base de dados.")
+    print("---------------------------------------------------------------")
+
+def main(excel_file_path='01Jan_12Dez_Escala_Geral_2025_AHD.xlsx', folha=None, motor=None, completo=False):
+    try:
+        cnxn = base_dados.conectar()
+        cursor = cnxn.cursor()
+        print(f"Conexão à base de dados {base_dados.descricao()} estabelecida com sucesso!")
+
+        # Carrega TiposOcorrencia com TipoID, Codigo, HorasPadrao
+        cursor.execute("SELECT TipoID, Codigo, HorasPadrao FROM TiposOcorrencia")
+        tipos_ocorrencia_data = {}
+        for row in cursor.fetchall():
+            tipos_ocorrencia_data[row.Codigo] = {
+                'TipoID': row.TipoID,
+                'HorasPadrao': row.HorasPadrao
+            }
+        print("\nTipos de Ocorrência carregados para mapeamento:")
+        for codigo, data in tipos_ocorrencia_data.items():
+            print(f"  {codigo}: TipoID={data['TipoID']}, HorasPadrao={data['HorasPadrao']}")
+
+        print(f"\nVerificando ficheiro Excel: '{excel_file_path}'")
+        current_working_directory = os.getcwd()
+        print(f"Diretório de trabalho atual do Python: {current_working_directory}")
+
+        files_in_directory = os.listdir(current_working_directory)
+        print(f"Ficheiros encontrados no diretório de trabalho: {files_in_directory}")
+
+        is_file_present = os.path.exists(os.path.join(current_working_directory, excel_file_path))
+        print(f"Os.path.exists('{excel_file_path}'): {is_file_present}")
+
+        dates_row_index = 11      # Linha 12 do Excel
+        employees_col_index = 1   # Coluna B do Excel
+        data_start_col_index = 3  # Coluna D do Excel
+        data_start_row_index = 12 # Linha 13 do Excel
+        fixed_year = 2025         # Ano fixo
+
+        if os.path.exists(excel_file_path):
+            try:
+                df = ler_folha_escala(excel_file_path, folha, dates_row_index, employees_col_index,
+                                      data_start_col_index, data_start_row_index, motor)
+
+                print(f"\nConteúdo da célula da primeira data (D12 no Excel, [11,3] no Pandas): '{df.iloc[dates_row_index, data_start_col_index]}'")
+                if len(df) > data_start_row_index:
+                    print(f"Conteúdo da célula do primeiro funcionário (B13 no Excel, [12,1] no Pandas): '{df.iloc[data_start_row_index, employees_col_index]}'")
+
+                # Numa folha mensal os dias só têm o número; o mês vem do nome da folha
+                mes_inicial = (mes_da_folha(folha) if folha is not None else None) or 1
+                registos_df = parse_escala(df, tipos_ocorrencia_data, fixed_year, dates_row_index,
+                                           employees_col_index, data_start_col_index, data_start_row_index, mes_inicial)
+                if registos_df.empty:
+                    print("  Nenhum registo foi extraído. Verifique a linha das datas no Excel.")
+                else:
+                    print(f"\nDatas extraídas (ano ajustado para {fixed_year}): "
+                          f"{registos_df['DataRegisto'].min()} a {registos_df['DataRegisto'].max()}")
+
+                print("\nProcessando registos de funcionários:")
+                nomes = nomes_funcionarios_escala(df, data_start_row_index, employees_col_index)
+                for employee_name in nomes:
+                    print(f"  Funcionário: {employee_name}")
+
+                # Mapeamento de nome de funcionário para { 'FuncionarioID': ID, 'NumeroFuncionario': 'FXXX' }
+                func_info_cache, novos_funcionarios_inseridos, funcionarios_atualizados_com_id = \
+                    provisionar_funcionarios(cnxn, list(nomes))
+                ids_por_nome = {nome: info['FuncionarioID'] for nome, info in func_info_cache.items()}
+                registos_df['FuncionarioID'] = registos_df['NomeCompleto'].map(ids_por_nome)
+
+                # Só seguem para o MERGE as células dos blocos (funcionário, mês) que mudaram desde a
+                # última importação para esta base de dados
+                hash_tipos = hash_tipos_ocorrencia(tipos_ocorrencia_data)
+                blocos = blocos_escala(registos_df)
+                blocos_anteriores = {} if completo else carregar_blocos_importados(cnxn, blocos, ids_por_nome, hash_tipos)
+                registos_alterados_df, resumo = filtrar_alteracoes(registos_df, blocos, blocos_anteriores)
+                imprimir_resumo_alteracoes(resumo)
+
+                if not registos_alterados_df.empty:
+                    print(f"\nTotal de {len(registos_alterados_df)} registos prontos para processamento (MERGE em massa).")
+
+                    total_inseridos, total_atualizados = merge_registos_diarios(cnxn, registos_alterados_df)
+                    # O resumo mensal dos meses tocados é atualizado na mesma transação do MERGE
+                    meses_recalculados = recalcular_meses(cnxn.cursor(), meses_afetados(
+                        zip(registos_alterados_df['FuncionarioID'], registos_alterados_df['DataRegisto'])))
+                else:
+                    print("\nNenhum registo encontrado para inserir/atualizar na base de dados.")
+
+                # O estado dos blocos também entra na transação do MERGE: uma importação falhada não o
+                # grava e é repetida por inteiro
+                blocos_alterados = {chave: bloco for chave, bloco in blocos.items()
+                                    if blocos_anteriores.get(chave, {}).get('hash') != bloco['hash']}
+                gravar_blocos_importados(cnxn, blocos_alterados, ids_por_nome, hash_tipos)
+                cnxn.commit()
+                if not registos_alterados_df.empty:
+                    print(f"RegistosMensais: {meses_recalculados} meses (funcionário/mês) recalculados.")
+                    print(f"SUCESSO: Processamento de registos concluído. {total_inseridos} inseridos, {total_atualizados} atualizados na base de dados 'RegistosDiarios'.")
+
+                if novos_funcionarios_inseridos or funcionarios_atualizados_com_id:
+                    print("\n--- RESUMO DE ATRIBUIÇÃO DE NÚMERO DE FUNCIONÁRIO ---")
+                    if novos_funcionarios_inseridos:
+                        print("Os seguintes funcionários foram INSERIDOS com um novo número de funcionário sequencial:")
+                        for func_info in novos_funcionarios_inseridos:
+                            print(f"- {func_info}")
+                    if funcionarios_atualizados_com_id:
+                        print("Os seguintes funcionários tiveram o seu NumeroFuncionario ATUALIZADO para um sequencial:")
+                        for func_info in funcionarios_atualizados_com_id:
+                            print(f"- {func_info}")
+                    print("---------------------------------------------------------------")
+
+            except FileNotFoundError:
+                print(f"Erro: O ficheiro Excel '{excel_file_path}' NÃO foi encontrado. Verifique novamente a pasta e o nome.")
+            except Exception as e:
+                print(f"Erro ao ler ou processar o ficheiro Excel: {e}")
+                import traceback
+                traceback.print_exc()
 
-print("\n--- Processamento concluído. Pressione Enter para sair... ---")
-input("Pressione Enter para sair...")
\ No newline at end of file
+        else:
+            print(f"Erro: O ficheiro Excel '{excel_file_path}' NÃO foi encontrado pelo os.path.exists. Verifique a pasta e o nome.")
+
+        cursor.close()
+        cnxn.close()
+        print("\nConexão à base de dados fechada.")
+
+    except base_dados.ERROS_BASE_DADOS as ex:
+        sqlstate = ex.args[0] if base_dados.BACKEND == 'sqlserver' else None
+        if sqlstate == '08001':
+            print("Erro de conexão (08001): O servidor ou instância não foi encontrado ou não está acessível.")
+        elif sqlstate == '28000':
+            print("Erro de autenticação (28000): Credenciais incorretas ou acesso negado.")
+        else:
+            print(f"Ocorreu um erro na base de dados: {ex}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importa a escala (Excel) para RegistosDiarios.")
+    parser.add_argument('ficheiro', nargs='?', default='01Jan_12Dez_Escala_Geral_2025_AHD.xlsx',
+                        help="Ficheiro Excel da escala.")
+    parser.add_argument('--folha', help="Nome da folha ou número do mês (1 a 12). Por omissão, a primeira folha.")
+    parser.add_argument('--motor', choices=['calamine', 'openpyxl'],
+                        help="Leitor do Excel. Por omissão, calamine se estiver instalado.")
+    parser.add_argument('--completo', action='store_true',
+                        help="Grava todas as células, ignorando o estado da última importação. Necessário para "
+                             "repor registos alterados ou apagados na base de dados (ex.: na aplicação) desde a "
+                             "última importação, que uma importação normal não volta a verificar.")
+    args = parser.parse_args()
+    main(args.ficheiro, args.folha, args.motor, args.completo)
+    print("\n--- Processamento concluído. Pressione Enter para sair... ---")
+    input("Pressione Enter para sair...")
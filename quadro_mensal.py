@@ -0,0 +1,98 @@
+import calendar
+
+import numpy as np
+import pandas as pd
+
+from intervalos import IndiceIntervalos
+
+# Níveis de precedência de cada célula do quadro (o maior prevalece)
+NIVEL_VAZIO = 0
+NIVEL_REGISTO = 1
+NIVEL_FALTA = 2
+NIVEL_LICENCA = 3
+NIVEL_FERIAS = 4
+
+
+def _dias_desde_inicio(datas, inicio_mes):
+    """Converte uma coluna de datas em deslocamentos (em dias) desde o início do mês."""
+    return (pd.to_datetime(datas).dt.normalize() - inicio_mes).dt.days.to_numpy()
+
+
+def _aprovados(df):
+    if 'Aprovado' not in df.columns:
+        return df.iloc[0:0]
+    return df[df['Aprovado'].eq(True)]
+
+
+def _eventos_diarios(df, coluna_data, ids_funcionarios, inicio_mes, num_dias):
+    """
+    Posiciona eventos de um único dia no quadro, mantendo apenas o primeiro evento
+    de cada (funcionário, dia), tal como acontecia na leitura dia a dia.
+    """
+    df = df.drop_duplicates(subset=['FuncionarioID', coluna_data], keep='first')
+    linhas = ids_funcionarios.get_indexer(df['FuncionarioID'])
+    dias = _dias_desde_inicio(df[coluna_data], inicio_mes)
+    validos = (linhas >= 0) & (dias >= 0) & (dias < num_dias)
+    return df[validos], linhas[validos], dias[validos].astype(np.intp)
+
+
+def build_quadro_mensal(funcionarios_df, tipos_ocorrencia_df, registos_diarios_df,
+                        faltas_df, ferias_df, licencas_df, ano, mes):
+    """
+    Constrói o Quadro Mensal de Ocorrências para todos os funcionários de uma só vez.
+
+    Os eventos do mês (já carregados em lote) são colocados numa matriz funcionário × dia
+    com a precedência F (férias) > L (licença) > FI/FJ (falta) > sigla do registo diário.
+    As horas normais e extra só contam nos dias em que o registo diário prevalece.
+    """
+    num_dias = calendar.monthrange(ano, mes)[1]
+    inicio_mes = pd.Timestamp(ano, mes, 1)
+
+    ids_funcionarios = pd.Index(funcionarios_df['FuncionarioID']) if not funcionarios_df.empty else pd.Index([])
+    num_funcionarios = len(ids_funcionarios)
+
+    siglas = np.full((num_funcionarios, num_dias), '-', dtype=object)
+    niveis = np.full((num_funcionarios, num_dias), NIVEL_VAZIO, dtype=np.int8)
+    horas_normais = np.zeros((num_funcionarios, num_dias))
+    horas_extra = np.zeros((num_funcionarios, num_dias))
+
+    if num_funcionarios and not registos_diarios_df.empty:
+        registos, linhas, dias = _eventos_diarios(registos_diarios_df, 'DataRegisto', ids_funcionarios, inicio_mes, num_dias)
+        sigla_por_tipo = pd.Series(dtype=object)
+        if not tipos_ocorrencia_df.empty:
+            sigla_por_tipo = pd.Series(tipos_ocorrencia_df['Sigla'].to_numpy(), index=tipos_ocorrencia_df['TipoOcorrenciaID'])
+        tipo_conhecido = registos['TipoOcorrenciaID'].isin(sigla_por_tipo.index).to_numpy()
+        siglas[linhas, dias] = np.where(tipo_conhecido, registos['TipoOcorrenciaID'].map(sigla_por_tipo).to_numpy(), '-')
+        niveis[linhas, dias] = NIVEL_REGISTO
+        horas_normais[linhas, dias] = registos['HorasTrabalhadas'].fillna(0).to_numpy(dtype=float)
+        horas_extra[linhas, dias] = registos['HorasExtraDiarias'].fillna(0).to_numpy(dtype=float)
+
+    if num_funcionarios and not faltas_df.empty:
+        faltas, linhas, dias = _eventos_diarios(_aprovados(faltas_df), 'DataFalta', ids_funcionarios, inicio_mes, num_dias)
+        justificadas = faltas['Justificada'].fillna(False).astype(bool).to_numpy()
+        siglas[linhas, dias] = np.where(justificadas, 'FJ', 'FI')
+        niveis[linhas, dias] = NIVEL_FALTA
+
+    fim_mes = inicio_mes + pd.Timedelta(days=num_dias - 1)
+    for eventos_df, sigla, nivel in ((licencas_df, 'L', NIVEL_LICENCA), (ferias_df, 'F', NIVEL_FERIAS)):
+        if num_funcionarios and not eventos_df.empty:
+            funcionarios, dias = IndiceIntervalos(_aprovados(eventos_df)).expandir(inicio_mes, fim_mes)
+            linhas = ids_funcionarios.get_indexer(funcionarios)
+            linhas, dias = linhas[linhas >= 0], dias[linhas >= 0]
+            siglas[linhas, dias] = sigla
+            niveis[linhas, dias] = nivel
+
+    conta_registo = niveis == NIVEL_REGISTO
+    total_horas_normais = np.where(conta_registo, horas_normais, 0.0).sum(axis=1)
+    total_horas_extra = np.where(conta_registo, horas_extra, 0.0).sum(axis=1)
+
+    colunas = {'Funcionário': funcionarios_df['NomeCompleto'].to_numpy() if num_funcionarios else []}
+    for dia in range(num_dias):
+        colunas[f'Dia {dia + 1}'] = siglas[:, dia]
+    colunas['Total Horas Normais'] = [f"{v:.2f}" for v in total_horas_normais]
+    colunas['Total Horas Extra'] = [f"{v:.2f}" for v in total_horas_extra]
+    colunas['Total Dias Férias'] = (niveis == NIVEL_FERIAS).sum(axis=1)
+    colunas['Total Dias Faltas'] = (niveis == NIVEL_FALTA).sum(axis=1)
+    colunas['Total Dias Licença'] = (niveis == NIVEL_LICENCA).sum(axis=1)
+
+    return pd.DataFrame(colunas)
@@ -0,0 +1,273 @@
+import calendar
+from datetime import datetime
+from io import BytesIO
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+from reportlab.platypus.flowables import CallerMacro
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+from reportlab.lib import colors
+
+
+def novo_documento(buffer):
+    return SimpleDocTemplate(buffer, pagesize=A4, rightMargin=1.0*cm, leftMargin=1.0*cm, topMargin=1.0*cm, bottomMargin=1.0*cm)
+
+def estilos_recibo():
+    styles = getSampleStyleSheet()
+
+    styles.add(ParagraphStyle(name='HeaderTitle', fontSize=20, leading=24, alignment=TA_CENTER, fontName='Helvetica-Bold', textColor=colors.HexColor('#5A7C93')))
+    styles.add(ParagraphStyle(name='HeaderSubtitle', fontSize=11, leading=13, alignment=TA_CENTER, fontName='Helvetica-Bold', textColor=colors.HexColor('#88A0B2'), spaceAfter=0.3*cm))
+    styles.add(ParagraphStyle(name='CompanyInfo', fontSize=6, leading=8, alignment=TA_CENTER, fontName='Helvetica', textColor=colors.HexColor('#666666')))
+
+    styles.add(ParagraphStyle(name='SectionHeading', fontSize=10, leading=13, alignment=TA_LEFT, fontName='Helvetica-Bold', textColor=colors.HexColor('#5A7C93'), spaceBefore=0.6*cm, spaceAfter=0.2*cm))
+    styles.add(ParagraphStyle(name='EmployeeDetail', fontSize=7, leading=9, alignment=TA_LEFT, fontName='Helvetica', textColor=colors.HexColor('#333333')))
+    styles.add(ParagraphStyle(name='EmployeeDetailBold', fontSize=7, leading=9, alignment=TA_LEFT, fontName='Helvetica-Bold', textColor=colors.HexColor('#333333')))
+
+    styles.add(ParagraphStyle(name='TableCaption', fontSize=8, leading=10, alignment=TA_LEFT, fontName='Helvetica-Bold', textColor=colors.HexColor('#5A7C93'), spaceBefore=0.3*cm, spaceAfter=0.1*cm))
+    styles.add(ParagraphStyle(name='TableColHeader', fontSize=8, leading=10, alignment=TA_CENTER, fontName='Helvetica-Bold', textColor=colors.HexColor('#333333')))
+    styles.add(ParagraphStyle(name='TableTextLeft', fontSize=7, leading=9, alignment=TA_LEFT, fontName='Helvetica', textColor=colors.HexColor('#333333')))
+    styles.add(ParagraphStyle(name='TableTextRight', fontSize=7, leading=9, alignment=TA_RIGHT, fontName='Helvetica', textColor=colors.HexColor('#333333')))
+    styles.add(ParagraphStyle(name='TableTotalText', fontSize=8, leading=10, alignment=TA_RIGHT, fontName='Helvetica-Bold', textColor=colors.HexColor('#5A7C93')))
+    styles.add(ParagraphStyle(name='TableTotalValue', fontSize=8, leading=10, alignment=TA_RIGHT, fontName='Helvetica-Bold', textColor=colors.HexColor('#333333')))
+
+    styles.add(ParagraphStyle(name='FinalTotalLabel', fontSize=13, leading=15, alignment=TA_RIGHT, fontName='Helvetica-Bold', textColor=colors.HexColor('#5A7C93'), spaceBefore=0.6*cm))
+    styles.add(ParagraphStyle(name='FinalTotalValue', fontSize=15, leading=17, alignment=TA_RIGHT, fontName='Helvetica-Bold', textColor=colors.HexColor('#006600')))
+
+    styles.add(ParagraphStyle(name='FooterText', fontSize=5, leading=7, alignment=TA_CENTER, fontName='Helvetica', textColor=colors.HexColor('#888888'), spaceBefore=0.7*cm))
+    return styles
+
+
+class RenderizadorRecibos:
+    """
+    Gera recibos de vencimento em PDF reaproveitando o que não depende do funcionário.
+
+    Os estilos de parágrafo e os estilos das tabelas são construídos uma única vez, na criação do
+    objeto, e nunca são alterados depois. Os parágrafos (incluindo os textos fixos) são criados de
+    novo em cada recibo: o ReportLab guarda no próprio Paragraph o resultado do wrap/split, pelo
+    que um parágrafo partilhado entre documentos gerados ao mesmo tempo por sessões diferentes,
+    ou usado em dois sítios do mesmo documento, ficaria com a paginação de outro.
+    """
+
+    # Tabelas de dados do funcionário e do resumo de férias/licenças
+    ESTILO_TABELA_FICHA = TableStyle([
+        ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+        ('BOTTOMPADDING', (0,0), (-1,-1), 0),
+        ('TOPPADDING', (0,0), (-1,-1), 0),
+        ('GRID', (0,0), (-1,-1), 0.25, colors.HexColor('#E0E0E0')),
+        ('BOX', (0,0), (-1,-1), 0.5, colors.HexColor('#C3D9E8')),
+    ])
+    # Tabelas de rendimentos e de descontos
+    ESTILO_TABELA_VALORES = TableStyle([
+        ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#C3D9E8')),
+        ('TEXTCOLOR', (0,0), (-1,0), colors.HexColor('#333333')),
+        ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+        ('ALIGN', (1,1), (-1,-1), 'RIGHT'),
+        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+        ('BOTTOMPADDING', (0,0), (-1,0), 3),
+        ('TOPPADDING', (0,0), (-1,0), 3),
+        ('GRID', (0,0), (-1,-1), 0.5, colors.HexColor('#E0E0E0')),
+        ('BOX', (0,0), (-1,-1), 1, colors.HexColor('#E0E0E0')),
+        ('BACKGROUND', (0,-1), (-1,-1), colors.HexColor('#E0E0E0')),
+        ('LEFTPADDING', (0,0), (-1,-1), 2),
+        ('RIGHTPADDING', (0,0), (-1,-1), 2),
+    ])
+
+    def __init__(self):
+        self.styles = estilos_recibo()
+
+    def _rotulo(self, texto, estilo):
+        """Parágrafo de texto fixo, com um dos estilos do renderizador."""
+        return Paragraph(texto, self.styles[estilo])
+
+    def _cabecalho(self):
+        rotulo = self._rotulo
+        return [
+            rotulo("NOME DA EMPRESA", 'HeaderTitle'),
+            rotulo("Rua Fictícia, 123, 4700-000 Braga - Portugal", 'CompanyInfo'),
+            rotulo("NIF: 987654321", 'CompanyInfo'),
+            Spacer(1, 0.2*cm),
+        ]
+
+    def story(self, funcionario_info, mes_recibo, ano_recibo,
+              total_horas_trabalhadas_mes, total_horas_extra_mes,
+              salario_base_mensal, valor_horas_extra,
+              subsidio_alimentacao, vencimento_bruto,
+              desconto_irs, taxa_irs, desconto_ss, taxa_seguranca_social_funcionario,
+              total_horas_ausencia_geral, desconto_ausencia, salario_liquido,
+              dias_ferias_mes, dias_licencas_mes, impresso_em=None):
+        """Devolve os elementos (flowables) de um recibo, com os mesmos argumentos de generate_payslip_pdf."""
+        styles = self.styles
+        rotulo = self._rotulo
+        if impresso_em is None:
+            impresso_em = datetime.now()
+
+        story = self._cabecalho()
+        story.append(Paragraph(f"RECIBO DE VENCIMENTO - {calendar.month_name[mes_recibo].upper()} / {ano_recibo}", styles['HeaderSubtitle']))
+        story.append(Spacer(1, 0.4*cm))
+
+        story.append(rotulo("Informações do Funcionário:", 'SectionHeading'))
+        # Departamento em falta chega como None ou, numa coluna categórica, como NaN
+        departamento = funcionario_info['Departamento']
+        employee_data = [
+            [rotulo("Nome:", 'EmployeeDetailBold'), Paragraph(funcionario_info['NomeCompleto'], styles['EmployeeDetail']),
+             rotulo("Categoria:", 'EmployeeDetailBold'), Paragraph(funcionario_info['CategoriaProfissional'], styles['EmployeeDetail'])],
+            [rotulo("Nº Funcionário:", 'EmployeeDetailBold'), Paragraph(funcionario_info['NumeroFuncionario'], styles['EmployeeDetail']),
+             rotulo("Salário Base:", 'EmployeeDetailBold'), Paragraph(f"{salario_base_mensal:.2f} €", styles['EmployeeDetail'])],
+            [rotulo("NIF:", 'EmployeeDetailBold'), Paragraph(funcionario_info['NIF'], styles['EmployeeDetail']),
+             rotulo("IRS (%):", 'EmployeeDetailBold'), Paragraph(f"{taxa_irs*100:.2f} %", styles['EmployeeDetail'])],
+            [rotulo("NISS:", 'EmployeeDetailBold'), Paragraph(funcionario_info['NISS'], styles['EmployeeDetail']),
+             rotulo("Seg. Social (%):", 'EmployeeDetailBold'), Paragraph(f"{taxa_seguranca_social_funcionario*100:.2f} %", styles['EmployeeDetail'])],
+            # As duas células vazias ficam em colunas de larguras diferentes, por isso não partilham o parágrafo
+            [rotulo("Departamento:", 'EmployeeDetailBold'), Paragraph(departamento if isinstance(departamento, str) and departamento else 'N/A', styles['EmployeeDetail']),
+             Paragraph("", styles['EmployeeDetailBold']), Paragraph("", styles['EmployeeDetail'])],
+        ]
+        employee_table = Table(employee_data, colWidths=[3.5*cm, 6.5*cm, 3.5*cm, 5.5*cm])
+        employee_table.setStyle(self.ESTILO_TABELA_FICHA)
+        story.append(employee_table)
+        story.append(Spacer(1, 0.4*cm))
+
+        story.append(rotulo("Rendimentos:", 'SectionHeading'))
+        data_rendimentos = [
+            [rotulo("Descrição", 'TableColHeader'), rotulo("Valor (€)", 'TableColHeader')]
+        ]
+        data_rendimentos.append([rotulo("Salário Base Mensal", 'TableTextLeft'), Paragraph(f"{salario_base_mensal:.2f}", styles['TableTextRight'])])
+        if valor_horas_extra > 0:
+            data_rendimentos.append([Paragraph(f"Horas Extra ({total_horas_extra_mes:.2f}h)", styles['TableTextLeft']), Paragraph(f"{valor_horas_extra:.2f}", styles['TableTextRight'])])
+        data_rendimentos.append([rotulo("Subsídio de Alimentação", 'TableTextLeft'), Paragraph(f"{subsidio_alimentacao:.2f}", styles['TableTextRight'])])
+        data_rendimentos.append([
+            rotulo("<b>Vencimento Bruto</b>", 'TableTotalText'),
+            Paragraph(f"<b>{vencimento_bruto + subsidio_alimentacao:.2f}</b>", styles['TableTotalValue'])
+        ])
+        table_rendimentos = Table(data_rendimentos, colWidths=[13*cm, 5*cm])
+        table_rendimentos.setStyle(self.ESTILO_TABELA_VALORES)
+        story.append(table_rendimentos)
+        story.append(Spacer(1, 0.4*cm))
+
+        story.append(rotulo("Descontos:", 'SectionHeading'))
+        data_descontos = [
+            [rotulo("Descrição", 'TableColHeader'), rotulo("Valor (€)", 'TableColHeader')]
+        ]
+        data_descontos.append([Paragraph(f"IRS ({taxa_irs*100:.2f}%)", styles['TableTextLeft']), Paragraph(f"{desconto_irs:.2f}", styles['TableTextRight'])])
+        data_descontos.append([Paragraph(f"Segurança Social ({taxa_seguranca_social_funcionario*100:.2f}%)", styles['TableTextLeft']), Paragraph(f"{desconto_ss:.2f}", styles['TableTextRight'])])
+        if total_horas_ausencia_geral > 0:
+            data_descontos.append([Paragraph(f"Ausências ({total_horas_ausencia_geral:.2f}h)", styles['TableTextLeft']), Paragraph(f"{desconto_ausencia:.2f}", styles['TableTextRight'])])
+        data_descontos.append([
+            rotulo("<b>Total Descontos</b>", 'TableTotalText'),
+            Paragraph(f"<b>{(desconto_irs + desconto_ss + desconto_ausencia):.2f}</b>", styles['TableTotalValue'])
+        ])
+        table_descontos = Table(data_descontos, colWidths=[13*cm, 5*cm])
+        table_descontos.setStyle(self.ESTILO_TABELA_VALORES)
+        story.append(table_descontos)
+        story.append(Spacer(1, 0.6*cm))
+
+        story.append(rotulo("Salário Líquido a Receber:", 'FinalTotalLabel'))
+        story.append(Paragraph(f"{salario_liquido:.2f} €", styles['FinalTotalValue']))
+        story.append(Spacer(1, 0.6*cm))
+
+        story.append(rotulo("Resumo de Férias e Licenças no Mês:", 'SectionHeading'))
+        summary_data = [
+            [rotulo("Dias de Férias:", 'EmployeeDetailBold'), Paragraph(f"{dias_ferias_mes} dias", styles['EmployeeDetail'])],
+            [rotulo("Dias de Licença:", 'EmployeeDetailBold'), Paragraph(f"{dias_licencas_mes} dias", styles['EmployeeDetail'])],
+        ]
+        summary_table = Table(summary_data, colWidths=[5*cm, 13*cm])
+        summary_table.setStyle(self.ESTILO_TABELA_FICHA)
+        story.append(summary_table)
+        story.append(Spacer(1, 0.8*cm))
+
+        story.append(rotulo("Documento gerado pelo Sistema de Gestão de Horas", 'FooterText'))
+        story.append(Paragraph(f"Impresso em: {impresso_em.strftime('%d/%m/%Y %H:%M:%S')}", styles['FooterText']))
+        return story
+
+    def render(self, *argumentos):
+        """Gera o PDF de um recibo (mesmos argumentos de generate_payslip_pdf) e devolve os bytes."""
+        buffer = BytesIO()
+        novo_documento(buffer).build(self.story(*argumentos))
+        return buffer.getvalue()
+
+    def render_many(self, lista_argumentos, um_documento=False, progresso=None):
+        """
+        Gera vários recibos de uma vez e devolve (pdfs, erros).
+
+        Cada elemento de `lista_argumentos` é o tuplo de argumentos de generate_payslip_pdf.
+        Com um_documento=True, `pdfs` são os bytes de um só PDF com um recibo por página
+        (None se nenhum recibo for gerado); caso contrário é uma lista de (posição, bytes),
+        um PDF por recibo. `erros` é uma lista de (posição, mensagem): um recibo que falha
+        não impede os restantes. `progresso(feitos, total)` é chamado a cada recibo terminado
+        (no documento único, quando a sua página é desenhada).
+        """
+        impresso_em = datetime.now()
+        total = len(lista_argumentos)
+        erros = []
+        feitos = 0
+
+        def recibo_feito(*_):
+            nonlocal feitos
+            feitos += 1
+            if progresso:
+                progresso(feitos, total)
+
+        if not um_documento:
+            pdfs = []
+            for posicao, argumentos in enumerate(lista_argumentos):
+                try:
+                    buffer = BytesIO()
+                    novo_documento(buffer).build(self.story(*argumentos, impresso_em=impresso_em))
+                    pdfs.append((posicao, buffer.getvalue()))
+                except Exception as e:
+                    erros.append((posicao, f"{type(e).__name__}: {e}"))
+                recibo_feito()
+            return pdfs, erros
+
+        story = []
+        for posicao, argumentos in enumerate(lista_argumentos):
+            try:
+                story_recibo = self.story(*argumentos, impresso_em=impresso_em)
+            except Exception as e:
+                erros.append((posicao, f"{type(e).__name__}: {e}"))
+                recibo_feito()
+                continue
+            if story:
+                story.append(PageBreak())
+            story.extend(story_recibo)
+            # Marca sem tamanho no fim do recibo: o build demora, e o progresso avança à medida que as páginas são desenhadas
+            story.append(CallerMacro(recibo_feito))
+        if not story:
+            return None, erros
+        buffer = BytesIO()
+        novo_documento(buffer).build(story)
+        return buffer.getvalue(), erros
+
+
+_renderizador = None
+
+def obter_renderizador():
+    """
+    Renderizador partilhado pelo processo (criado no primeiro uso). Pode ser usado por várias
+    sessões ao mesmo tempo: só guarda estilos, que não mudam depois de criados.
+    """
+    global _renderizador
+    if _renderizador is None:
+        _renderizador = RenderizadorRecibos()
+    return _renderizador
+
+def generate_payslip_pdf(funcionario_info, mes_recibo, ano_recibo,
+                          total_horas_trabalhadas_mes, total_horas_extra_mes,
+                          salario_base_mensal, valor_horas_extra,
+                          subsidio_alimentacao, vencimento_bruto,
+                          desconto_irs, taxa_irs, desconto_ss, taxa_seguranca_social_funcionario,
+                          total_horas_ausencia_geral, desconto_ausencia, salario_liquido,
+                          dias_ferias_mes, dias_licencas_mes):
+
+    return obter_renderizador().render(
+        funcionario_info, mes_recibo, ano_recibo,
+        total_horas_trabalhadas_mes, total_horas_extra_mes,
+        salario_base_mensal, valor_horas_extra,
+        subsidio_alimentacao, vencimento_bruto,
+        desconto_irs, taxa_irs, desconto_ss, taxa_seguranca_social_funcionario,
+        total_horas_ausencia_geral, desconto_ausencia, salario_liquido,
+        dias_ferias_mes, dias_licencas_mes
+    )
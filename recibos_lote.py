@@ -0,0 +1,143 @@
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+from recibo_pdf import generate_payslip_pdf, obter_renderizador
+
+# Recibos enviados de cada vez a um processo (menos trocas entre processos, progresso ainda fluido)
+RECIBOS_POR_TAREFA = 10
+
+
+def nome_ficheiro_recibo(nome_completo, ano, mes):
+    return f"recibo_vencimento_{nome_completo.replace(' ', '_')}_{ano}_{mes:02d}.pdf"
+
+
+def _argumentos_recibo(recibo, ano, mes):
+    """Argumentos de generate_payslip_pdf/RenderizadorRecibos a partir de uma linha de calculo_salarios.calcular_salarios."""
+    if recibo['Erro']:
+        raise ValueError(recibo['Erro'])
+    return (
+        recibo, mes, ano,
+        recibo['total_horas_trabalhadas_mes'], recibo['total_horas_extra_mes'],
+        recibo['salario_base_mensal'], recibo['valor_horas_extra'],
+        recibo['subsidio_alimentacao'], recibo['vencimento_bruto'],
+        recibo['desconto_irs'], recibo['taxa_irs'], recibo['desconto_ss'], recibo['taxa_seguranca_social_funcionario'],
+        recibo['total_horas_ausencia_geral'], recibo['desconto_ausencia'], recibo['salario_liquido'],
+        recibo['dias_ferias_mes'], recibo['dias_licencas_mes'],
+    )
+
+
+def gerar_pdf_recibo(recibo, ano, mes):
+    """Gera o PDF de um recibo calculado; levanta ValueError se o cálculo assinalou um erro."""
+    return generate_payslip_pdf(*_argumentos_recibo(recibo, ano, mes))
+
+
+def _lista_argumentos(recibos, ano, mes):
+    """Separa os recibos com argumentos válidos dos que já vêm com erro do cálculo."""
+    argumentos, posicoes, erros = [], [], {}
+    for posicao, recibo in enumerate(recibos):
+        try:
+            argumentos.append(_argumentos_recibo(recibo, ano, mes))
+            posicoes.append(posicao)
+        except Exception as e:
+            erros[posicao] = f"{type(e).__name__}: {e}"
+    return argumentos, posicoes, erros
+
+
+def _gerar_pdfs_tarefa(recibos, ano, mes):
+    """Trabalho de cada processo: gera um grupo de recibos, isolando as falhas de cada um."""
+    argumentos, posicoes, erros = _lista_argumentos(recibos, ano, mes)
+    pdfs, erros_render = obter_renderizador().render_many(argumentos)
+    gerados = {posicoes[i]: pdf for i, pdf in pdfs}
+    erros.update((posicoes[i], erro) for i, erro in erros_render)
+    return [
+        (recibo['FuncionarioID'], recibo['NomeCompleto'], gerados.get(posicao), erros.get(posicao))
+        for posicao, recibo in enumerate(recibos)
+    ]
+
+
+def gerar_pdfs_recibos(recibos_df, ano, mes, max_processos=None, progresso=None):
+    """
+    Gera o PDF de cada recibo num conjunto de processos e devolve (pdfs, erros).
+
+    `pdfs` é uma lista de (FuncionarioID, NomeCompleto, bytes do PDF) pela ordem de recibos_df;
+    `erros` é uma lista de (FuncionarioID, NomeCompleto, mensagem). Uma falha num recibo não
+    interrompe os restantes. `progresso(feitos, total)` é chamado à medida que os recibos ficam prontos.
+    """
+    recibos = recibos_df.to_dict('records')
+    total = len(recibos)
+    if max_processos is None:
+        max_processos = min(os.cpu_count() or 1, 8)
+
+    resultados = [None] * total
+    feitos = 0
+    with ProcessPoolExecutor(max_workers=max_processos) as executor:
+        futuros = {
+            executor.submit(_gerar_pdfs_tarefa, recibos[inicio:inicio + RECIBOS_POR_TAREFA], ano, mes): inicio
+            for inicio in range(0, total, RECIBOS_POR_TAREFA)
+        }
+        for futuro in as_completed(futuros):
+            inicio = futuros[futuro]
+            grupo = recibos[inicio:inicio + RECIBOS_POR_TAREFA]
+            try:
+                resultados[inicio:inicio + len(grupo)] = futuro.result()
+            except BrokenProcessPool as e:
+                # Um processo que morre (p.ex. sem memória) só invalida os recibos que ainda estavam pendentes
+                resultados[inicio:inicio + len(grupo)] = [
+                    (recibo['FuncionarioID'], recibo['NomeCompleto'], None, f"Processo interrompido: {e}")
+                    for recibo in grupo
+                ]
+            feitos += len(grupo)
+            if progresso:
+                progresso(feitos, total)
+
+    pdfs, erros = [], []
+    for funcionario_id, nome, pdf, erro in resultados:
+        if erro is None:
+            pdfs.append((funcionario_id, nome, pdf))
+        else:
+            erros.append((funcionario_id, nome, erro))
+    return pdfs, erros
+
+
+def empacotar_zip(pdfs, ano, mes):
+    """Junta os PDFs num ZIP com um ficheiro por funcionário."""
+    buffer = BytesIO()
+    nomes_usados = set()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for funcionario_id, nome, pdf in pdfs:
+            nome_ficheiro = nome_ficheiro_recibo(nome, ano, mes)
+            if nome_ficheiro in nomes_usados:
+                nome_ficheiro = nome_ficheiro.replace('.pdf', f"_{int(funcionario_id)}.pdf")
+            nomes_usados.add(nome_ficheiro)
+            zf.writestr(nome_ficheiro, pdf)
+    return buffer.getvalue()
+
+
+def gerar_pdf_unico(recibos_df, ano, mes, progresso=None):
+    """
+    Gera um só PDF com todos os recibos, um por página, e devolve (pdf, erros).
+
+    O documento é montado num único processo (o ReportLab não junta PDFs já gerados); os
+    recibos que falham são deixados de fora e devolvidos em `erros`, como em gerar_pdfs_recibos.
+    `progresso(feitos, total)` é chamado à medida que as páginas dos recibos são desenhadas.
+    """
+    recibos = recibos_df.to_dict('records')
+    argumentos, posicoes, erros = _lista_argumentos(recibos, ano, mes)
+    # Os recibos que já vêm com erro do cálculo contam como feitos desde o início
+    com_erro = len(erros)
+
+    def progresso_render(feitos, _):
+        progresso(com_erro + feitos, len(recibos))
+
+    if progresso and com_erro:
+        progresso(com_erro, len(recibos))
+    pdf, erros_render = obter_renderizador().render_many(argumentos, um_documento=True,
+                                                         progresso=progresso_render if progresso else None)
+    erros.update((posicoes[i], erro) for i, erro in erros_render)
+    return pdf, [
+        (recibos[posicao]['FuncionarioID'], recibos[posicao]['NomeCompleto'], erro)
+        for posicao, erro in sorted(erros.items())
+    ]
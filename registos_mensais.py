@@ -0,0 +1,88 @@
+"""
+Manutenção da tabela de resumo RegistosMensais.
+
+Cada linha guarda os totais de RegistosDiarios de um funcionário num mês e para um tipo de
+ocorrência: número de registos (dias, dado o índice único por funcionário e dia) e soma das
+horas trabalhadas, extra e de ausência. Quem escreve em RegistosDiarios chama recalcular_meses
+na mesma transação com os meses que tocou; reconstruir_registos_mensais refaz a tabela a partir
+dos registos diários (carga inicial ou correção).
+"""
+import pandas as pd
+
+from base_dados import dialeto
+
+COLUNAS_REGISTOS_MENSAIS = "FuncionarioID, Ano, Mes, TipoOcorrenciaID, NumRegistos, HorasTrabalhadas, HorasExtraDiarias, HorasAusencia"
+
+# Máximo de meses por instrução (3 parâmetros por mês; limite de 2100 parâmetros do SQL Server)
+MESES_POR_LOTE = 600
+
+_AGREGADOS = """COUNT(*), COALESCE(SUM(r.HorasTrabalhadas), 0), COALESCE(SUM(r.HorasExtraDiarias), 0),
+           COALESCE(SUM(r.HorasAusencia), 0)"""
+
+
+def meses_afetados(registos):
+    """Converte pares (FuncionarioID, DataRegisto) no conjunto ordenado de (FuncionarioID, Ano, Mes) a recalcular."""
+    meses = set()
+    for funcionario_id, data_registo in registos:
+        if funcionario_id is None or pd.isna(funcionario_id) or data_registo is None:
+            continue
+        data_registo = pd.Timestamp(data_registo)
+        meses.add((int(funcionario_id), data_registo.year, data_registo.month))
+    return sorted(meses)
+
+
+def recalcular_meses(cursor, meses):
+    """
+    Recalcula as linhas de RegistosMensais dos (FuncionarioID, Ano, Mes) indicados a partir de
+    RegistosDiarios. Não faz commit: deve correr na transação da escrita que alterou os registos.
+    Devolve o número de meses recalculados.
+    """
+    meses = sorted(set(meses))
+    for inicio in range(0, len(meses), MESES_POR_LOTE):
+        lote = meses[inicio:inicio + MESES_POR_LOTE]
+        valores = ", ".join(["(?, ?, ?)"] * len(lote))
+        params = [valor for mes in lote for valor in mes]
+        if dialeto(cursor) == 'sqlite':
+            # O SQLite não aceita DELETE com JOIN nem nomes de colunas em (VALUES ...) AS m(...)
+            prefixo, meses_sql = f"WITH m(FuncionarioID, Ano, Mes) AS (VALUES {valores}) ", "m"
+            cursor.execute(prefixo + "DELETE FROM dbo.RegistosMensais "
+                                     "WHERE (FuncionarioID, Ano, Mes) IN (SELECT FuncionarioID, Ano, Mes FROM m)", params)
+        else:
+            prefixo, meses_sql = "", f"(VALUES {valores}) AS m(FuncionarioID, Ano, Mes)"
+            cursor.execute(f"""
+                DELETE rm FROM dbo.RegistosMensais rm
+                JOIN {meses_sql}
+                    ON rm.FuncionarioID = m.FuncionarioID AND rm.Ano = m.Ano AND rm.Mes = m.Mes
+            """, params)
+        # Intervalo de datas por mês (e não YEAR()/MONTH()) para usar o índice (FuncionarioID, DataRegisto)
+        cursor.execute(f"""
+            {prefixo}INSERT INTO dbo.RegistosMensais ({COLUNAS_REGISTOS_MENSAIS})
+            SELECT m.FuncionarioID, m.Ano, m.Mes, r.TipoOcorrenciaID, {_AGREGADOS}
+            FROM {meses_sql}
+            JOIN dbo.RegistosDiarios r
+                ON r.FuncionarioID = m.FuncionarioID
+               AND r.DataRegisto >= DATEFROMPARTS(m.Ano, m.Mes, 1)
+               AND r.DataRegisto < DATEADD(MONTH, 1, DATEFROMPARTS(m.Ano, m.Mes, 1))
+            GROUP BY m.FuncionarioID, m.Ano, m.Mes, r.TipoOcorrenciaID
+        """, params)
+    return len(meses)
+
+
+def reconstruir_registos_mensais(cursor, ano=None):
+    """
+    Refaz RegistosMensais a partir de RegistosDiarios, para todos os anos ou só para `ano`.
+    Não faz commit. Devolve o número de linhas criadas.
+    """
+    if ano is None:
+        cursor.execute("DELETE FROM dbo.RegistosMensais")
+        where, params = "", ()
+    else:
+        cursor.execute("DELETE FROM dbo.RegistosMensais WHERE Ano = ?", (ano,))
+        where, params = " WHERE r.DataRegisto >= DATEFROMPARTS(?, 1, 1) AND r.DataRegisto < DATEFROMPARTS(?, 1, 1)", (ano, ano + 1)
+    cursor.execute(f"""
+        INSERT INTO dbo.RegistosMensais ({COLUNAS_REGISTOS_MENSAIS})
+        SELECT r.FuncionarioID, YEAR(r.DataRegisto), MONTH(r.DataRegisto), r.TipoOcorrenciaID, {_AGREGADOS}
+        FROM dbo.RegistosDiarios r{where}
+        GROUP BY r.FuncionarioID, YEAR(r.DataRegisto), MONTH(r.DataRegisto), r.TipoOcorrenciaID
+    """, params)
+    return cursor.rowcount
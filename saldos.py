@@ -0,0 +1,59 @@
+import pandas as pd
+
+from intervalos import IndiceIntervalos
+
+DIAS_FERIAS_ANUAIS_PADRAO = 22
+
+
+def _soma_por_funcionario(df, coluna):
+    return df.groupby('FuncionarioID')[coluna].sum()
+
+
+def _dias_intervalos_iniciados_no_ano(df, ano):
+    """
+    Soma, por funcionário, a duração (em dias, inclusive) dos intervalos
+    [DataInicio, DataFim] que começam no ano indicado.
+    """
+    return IndiceIntervalos(df).duracao_iniciados(pd.Timestamp(ano, 1, 1), pd.Timestamp(ano, 12, 31))
+
+
+def compute_saldos(funcionarios_df, acertos_semestrais_df, ferias_df, faltas_df, licencas_df, ano):
+    """
+    Calcula os Saldos de Horas e Dias de todos os funcionários de uma só vez.
+
+    Cada tabela de eventos é filtrada pelo ano uma única vez e agregada por
+    FuncionarioID; os totais são depois alinhados com a lista de funcionários
+    (pela mesma ordem), devolvendo as mesmas colunas do relatório.
+    """
+    ids_funcionarios = funcionarios_df['FuncionarioID']
+
+    horas_extra_acumuladas = pd.Series(dtype=float)
+    if not acertos_semestrais_df.empty:
+        acertos_do_ano = acertos_semestrais_df[acertos_semestrais_df['Ano'] == ano]
+        horas_extra_acumuladas = _soma_por_funcionario(acertos_do_ano, 'TotalHorasExtraAcumuladas')
+
+    dias_faltas = pd.Series(dtype=float)
+    if not faltas_df.empty:
+        data_falta = pd.to_datetime(faltas_df['DataFalta'])
+        faltas_do_ano = faltas_df[data_falta.dt.year == ano]
+        dias_faltas = faltas_do_ano.groupby('FuncionarioID')['DataFalta'].nunique()
+
+    dias_ferias_tirados = _dias_intervalos_iniciados_no_ano(ferias_df, ano)
+    dias_licencas = _dias_intervalos_iniciados_no_ano(licencas_df, ano)
+
+    def alinhar(totais):
+        return totais.reindex(ids_funcionarios).fillna(0).to_numpy()
+
+    dias_ferias_anuais = funcionarios_df['DiasFeriasAnuais'].fillna(DIAS_FERIAS_ANUAIS_PADRAO).astype(int).to_numpy()
+    dias_ferias_tirados = alinhar(dias_ferias_tirados).astype(int)
+
+    return pd.DataFrame({
+        'Funcionário': funcionarios_df['NomeCompleto'].to_numpy(),
+        'Departamento': funcionarios_df['Departamento'].to_numpy(),
+        'Horas Extra Acumuladas': [f"{v:.2f}h" for v in alinhar(horas_extra_acumuladas)],
+        'Dias Férias Anuais (Direito)': dias_ferias_anuais,
+        'Dias Férias Tirados': dias_ferias_tirados,
+        'Dias Férias Disponíveis': dias_ferias_anuais - dias_ferias_tirados,
+        'Dias Faltas (Ano)': alinhar(dias_faltas).astype(int),
+        'Dias Licença (Ano)': alinhar(dias_licencas).astype(int),
+    })